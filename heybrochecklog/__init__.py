@@ -3,17 +3,49 @@ class UnrecognizedException(Exception):
 
 
 import argparse  # noqa: E402
-from pathlib import Path  # noqa: E402
-
-from heybrochecklog.score import score_log  # noqa: E402
-from heybrochecklog.translate import translate_log  # noqa: E402
+import functools  # noqa: E402
+import importlib  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+
+from heybrochecklog.markup import ANSI  # noqa: E402
+from heybrochecklog.score import score_logs  # noqa: E402
+from heybrochecklog.shared import find_logs, in_order  # noqa: E402
+from heybrochecklog.translate import translate_logs  # noqa: E402
+
+
+# The modes run instead of scoring when they are the first argument, with the
+# module which runs them and their summary.
+MODES = {
+    'serve': (
+        'heybrochecklog.serve',
+        'score logs sent over stdin/stdout or a socket, keeping the checkers loaded',
+    ),
+    'verify': (
+        'heybrochecklog.verify',
+        'only check the signatures of EAC and XLD logs',
+    ),
+}
 
 
 def parse_args():
     """Parse arguments."""
     description = 'Tool to analyze, translate, and score a CD Rip Log.'
+    epilog = '\n'.join(
+        ['modes:']
+        + ['  {:<8}{}'.format(mode, summary) for mode, (_, summary) in MODES.items()]
+        + [
+            '',
+            'Run `heybrochecklog MODE -h` for the options of a mode. A log file',
+            'named like a mode is checked when given as ./serve or after --.',
+        ]
+    )
 
-    parser = argparse.ArgumentParser(description=description)
+    parser = argparse.ArgumentParser(
+        description=description,
+        epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
     parser.add_argument('log', help='log file to check.', nargs='+')
     parser.add_argument(
         '-t',
@@ -27,6 +59,13 @@ def parse_args():
         help='print the marked up version of the log after analyzing',
         action='store_true',
     )
+    parser.add_argument(
+        '--color',
+        help='color the marked up log for the terminal instead of printing HTML '
+        '(auto: when printing to a terminal)',
+        choices=['auto', 'always', 'never'],
+        default='auto',
+    )
     parser.add_argument(
         '-s',
         '--score-only',
@@ -39,25 +78,104 @@ def parse_args():
         help='Enable Log Integrity Checking (Experimental, EAC & XLD only)',
         action='store_true'
     )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of logs to check at once (0 for one per CPU)',
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '-r',
+        '--recursive',
+        help='check every .log file inside directories given as log',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--cache',
+        help='cache scores in an SQLite database at this path',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '-f',
+        '--format',
+        help='output format; ndjson prints each result as one line of JSON',
+        choices=['text', 'ndjson'],
+        default='text',
+    )
+    parser.add_argument(
+        '--no-contents',
+        help='leave the log contents out of ndjson results',
+        action='store_true',
+    )
 
     return parser.parse_args()
 
 
 def runner():
     """Main function to handle command line usage of the heybrochecklog package."""
+    # A mode is only the first argument, so `-- serve` or `./serve` checks a
+    # log named serve. The modes (and the cache) are imported only when they
+    # are used, so importing the package for scoring doesn't load them.
+    if len(sys.argv) > 1 and sys.argv[1] in MODES:
+        module, _ = MODES[sys.argv[1]]
+        return importlib.import_module(module).main(sys.argv[2:])
+
     args = parse_args()
-    for log_path in args.log:
-        log_file = Path(log_path)
-        if not log_file.is_file():
-            print('{} does not exist.'.format(log_path))
-        elif args.translate:
-            translate_(args, log_file, log_path)
-        elif args.log:
-            score_(args, log_file, log_path)
-
-
-def score_(args, log_file, log_path):
-    log = score_log(log_file, args.markup, args.experimental_integrity)
+
+    # Log paths are found lazily, so remember them only until they are printed.
+    log_paths = {}
+
+    # Keep stdout to one JSON object per line when printing ndjson.
+    errors = sys.stderr if args.format == 'ndjson' else sys.stdout
+
+    def track_paths():
+        for i, log_path in enumerate(find_logs(args.log, args.recursive, errors)):
+            log_paths[i] = log_path
+            yield log_path
+
+    if args.translate:
+        results = translate_logs(track_paths(), args.jobs)
+        output = translate_
+    else:
+        cache = None
+        if args.cache:
+            from heybrochecklog.cache import ResultCache
+
+            cache = ResultCache(args.cache)
+        results = score_logs(
+            track_paths(),
+            args.jobs,
+            markup_target(args),
+            args.experimental_integrity,
+            cache,
+        )
+        output = functools.partial(score_, args)
+
+    if args.format == 'ndjson':
+        # Every line carries its path, so each result is printed once it is ready.
+        output = functools.partial(ndjson_, not args.no_contents)
+    else:
+        results = in_order(results)
+
+    for i, log in results:
+        output(log_paths.pop(i), log)
+
+
+def markup_target(args):
+    """Mark up logs as ANSI-colored text when it is printed to a terminal,
+    and as HTML otherwise.
+    """
+    if not args.markup:
+        return False
+    if args.format == 'text' and (
+        args.color == 'always' or args.color == 'auto' and sys.stdout.isatty()
+    ):
+        return ANSI
+    return True
+
+
+def score_(args, log_path, log):
     if args.score_only:
         if not log['unrecognized']:
             print(log['score'])
@@ -70,14 +188,17 @@ def score_(args, log_file, log_path):
             print('Cannot encode logpath: {}'.format(error))
 
 
-def translate_(args, log_file, log_path):
-    log = translate_log(log_file)
+def translate_(log_path, log):
     try:
         print(format_translation(log_path, log))
     except UnicodeEncodeError as error:
         print('Cannot encode logpath: {}'.format(error))
 
 
+def ndjson_(contents, log_path, log):
+    print(format_ndjson(log_path, log, contents), flush=True)
+
+
 def format_score(logpath, log, markup):
     """Turn a log file JSON into a pretty string."""
     output = []
@@ -116,3 +237,12 @@ def format_translation(logpath, log):
         output.append('\n' + log['log'])
 
     return '\n'.join(output)
+
+
+def format_ndjson(logpath, log, contents=True):
+    """Turn a log file or translation JSON into a single line of JSON."""
+    log = dict(log, path=str(logpath))
+    if not contents:
+        log.pop('contents', None)
+        log.pop('log', None)
+    return json.dumps(log)
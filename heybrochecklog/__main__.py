@@ -1,4 +1,6 @@
+import sys
+
 from heybrochecklog import runner
 
 if __name__ == '__main__':
-    runner()
+    sys.exit(runner())
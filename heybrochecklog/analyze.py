@@ -42,10 +42,8 @@ def determine_language(log):
     if log.ripper == 'XLD':
         return 'english'
 
-    useful_contents = [
-        re.sub(r'\s+', ' ', l.rstrip()) for l in log.contents if l.strip()
-    ]
-    for line in useful_contents[:2]:
+    # The non-blank lines are already normalized by the LogFile.
+    for line in log.concat_contents[:2]:
         for language, line_starter in EAC_RIPLINES.items():
             if re.match(line_starter, line):
                 return language
@@ -0,0 +1,173 @@
+"""This module contains the SQLite-backed cache of log scores, so identical logs
+are only ever scored once.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from heybrochecklog.resources import DEDUCTIONS, VERSIONS
+from heybrochecklog.shared import get_path
+
+# Bump when a change to the checkers changes the results they produce.
+CACHE_VERSION = 1
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# Results are ordered by a use counter rather than a clock, so ties can't happen.
+# The counter and the total size of the results are kept in meta, and bumping
+# the counter is the first write of a transaction, so it takes the write lock.
+COUNT_USE = "UPDATE meta SET value = value + 1 WHERE key = 'uses'"
+LAST_USE = "(SELECT value FROM meta WHERE key = 'uses')"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+class ResultCache:
+    """A size-bounded, least recently used cache of log scores.
+
+    Results are keyed by a hash of the raw bytes of a log and the flags it was
+    scored with. Every entry is dropped when the scoring rules (the deductions,
+    the recognized versions or the bundled resources) change.
+
+    The cache holds no connection itself (each process and thread opens its own
+    the first time it is used), so it can be handed to worker processes.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = str(path)
+        self.max_size = max_size
+
+    @property
+    def conn(self):
+        return connect(self.path, os.getpid(), threading.get_ident())
+
+    def get(self, raw, markup=False, integrity=False):
+        """Return the cached result of a log, or None on a miss."""
+        key = cache_key(raw, markup, integrity)
+        row = self.conn.execute(
+            'SELECT result FROM results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        with self.conn:
+            self.conn.execute(COUNT_USE)
+            self.conn.execute(
+                'UPDATE results SET last_used = {} WHERE key = ?'.format(LAST_USE),
+                (key,),
+            )
+        return json.loads(row[0])
+
+    def put(self, raw, result, markup=False, integrity=False):
+        """Store the result of a log, evicting the least recently used results
+        if the cache grows past its maximum size.
+        """
+        key = cache_key(raw, markup, integrity)
+        data = json.dumps(result)
+        with self.conn:
+            self.conn.execute(COUNT_USE)
+            row = self.conn.execute(
+                'SELECT size FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, {})'.format(LAST_USE),
+                (key, data, len(data)),
+            )
+            self.conn.execute(
+                "UPDATE meta SET value = value + ? WHERE key = 'size'",
+                (len(data) - (row[0] if row else 0),),
+            )
+            self.evict()
+
+    def evict(self):
+        """Delete the least recently used results until the cache fits."""
+        query = "SELECT value FROM meta WHERE key = 'size'"
+        total = int(self.conn.execute(query).fetchone()[0])
+        if total <= self.max_size:
+            return
+
+        expired = []
+        rows = self.conn.execute('SELECT key, size FROM results ORDER BY last_used')
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            expired.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM results WHERE key = ?', expired)
+        self.conn.execute("UPDATE meta SET value = ? WHERE key = 'size'", (total,))
+
+
+@functools.lru_cache(maxsize=None)
+def connect(path, pid, thread):
+    """Open a cache database once per process and thread (SQLite connections
+    can't be shared by either), purging it if the scoring rules changed.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+
+    fingerprint = rules_fingerprint()
+    with conn:
+        query = "SELECT value FROM meta WHERE key = 'fingerprint'"
+        row = conn.execute(query).fetchone()
+        if row is None or row[0] != fingerprint:
+            conn.execute('DELETE FROM results')
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)",
+                (fingerprint,),
+            )
+            conn.execute("DELETE FROM meta WHERE key IN ('size', 'uses')")
+        # Count the results of databases made before the counters were kept.
+        conn.execute(
+            "INSERT OR IGNORE INTO meta "
+            "SELECT 'size', COALESCE(SUM(size), 0) FROM results"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO meta "
+            "SELECT 'uses', COALESCE(MAX(last_used), 0) FROM results"
+        )
+    return conn
+
+
+def cache_key(raw, markup=False, integrity=False):
+    """Build the cache key of a log from its raw bytes and scoring flags."""
+    digest = hashlib.sha256(raw).hexdigest()
+    # Markup is a flag, or the name of a render target such as 'ansi'.
+    markup = markup if isinstance(markup, str) else '{:d}'.format(bool(markup))
+    return '{}:{}{:d}'.format(digest, markup, bool(integrity))
+
+
+@functools.lru_cache(maxsize=None)
+def rules_fingerprint():
+    """Hash everything the score of a log depends on besides its bytes."""
+    fingerprint = hashlib.sha256()
+    fingerprint.update(str(CACHE_VERSION).encode())
+    fingerprint.update(json.dumps(DEDUCTIONS, sort_keys=True).encode())
+    fingerprint.update(json.dumps(VERSIONS, sort_keys=True).encode())
+
+    resource_dir = os.path.join(get_path(), 'resources')
+    for root, dirs, files in os.walk(resource_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(('.json', '.db')):
+                path = os.path.join(root, filename)
+                fingerprint.update(os.path.relpath(path, resource_dir).encode())
+                with open(path, 'rb') as resource:
+                    fingerprint.update(hashlib.sha256(resource.read()).digest())
+
+    return fingerprint.hexdigest()
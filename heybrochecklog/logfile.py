@@ -1,25 +1,82 @@
 """This module contains the LogFile class, an encapsulation of log variables."""
 
-import re
+import itertools
+from collections.abc import Sequence
 
-from heybrochecklog.resources import DEDUCTIONS
+from heybrochecklog.parsed import PARSED_VERSION, Finding, ParsedLog, score_parsed
+
+
+# Full-width punctuation found in CJK logs.
+FULL_WIDTH = str.maketrans({'：': ':', '，': ', '})
+
+TRACK_ERRORS = (
+    'Aborted copy',
+    'Timing problem',
+    'Suspicious position',
+    'Missing samples',
+    'Read error',
+    'Damaged sector count',
+)
 
 
 class LogFile:
-    """A log file class containing variables, score, deductions, etc."""
+    """A log file class containing variables, score, deductions, etc.
+
+    The normalized (contents) and non-blank (concat_contents) views of the lines
+    are only built the first time they are used, from the lines the log was
+    created with.
+    """
+
+    __slots__ = (
+        'full_contents',
+        '_source',
+        '_contents',
+        '_concat_contents',
+        'ripper',
+        'language',
+        'drive',
+        'version',
+        'album',
+        'unrecognized',
+        'integrity',
+        'range',
+        'cdr',
+        'unindexed_drive',
+        'htoa',
+        'htoa_index',
+        'htoa_ripped',
+        'checksum',
+        'all_tracks',
+        'deductions',
+        'crc_mismatch',
+        'track_errors',
+        'lines',
+        'toc',
+        'accuraterip',
+        'track_indices',
+        'tracks',
+        'index_settings',
+        'index_toc',
+        'index_tracks',
+        'index_footer',
+        'flagged',
+        'blocks',
+    )
 
     def __init__(self, contents, ripper=None):
 
         self.full_contents = contents
-        self.contents = format_full_contents(contents)
-        self.concat_contents = [line for line in self.contents if line.strip()]
-        self.score = 100
+        self._source = contents
+        self._contents = None
+        self._concat_contents = None
         self.ripper = ripper
         self.language = None
         self.drive = None
         self.version = None
         self.album = None
         self.unrecognized = None
+        # LOG_OK, LOG_NOT_OK or LOG_CHECKSUM_NOT_PRESENT once verified.
+        self.integrity = None
 
         # Some other log settings
         self.range = False
@@ -34,16 +91,12 @@ class LogFile:
         self.all_tracks = None
         self.deductions = {}
         self.crc_mismatch = []
-        self.track_errors = {
-            "Aborted copy": [],
-            "Timing problem": [],
-            "Suspicious position": [],
-            "Missing samples": [],
-            "Read error": [],
-            "Damaged sector count": [],
-        }
+        # EAC logs keep a set of track numbers per error, XLD logs a dict of
+        # track number to error count.
+        self.track_errors = {error: set() for error in TRACK_ERRORS}
 
         # Lists of data for the log
+        self.lines = []
         self.toc = {}
         self.accuraterip = []
         self.track_indices = []
@@ -58,62 +111,76 @@ class LogFile:
         # Flagged = auto report log
         self.flagged = False
 
+        # The Blocks of each checked part of the log, before they were combined.
+        self.blocks = ()
+
+    @classmethod
+    def segment(cls, parent, start, end):
+        """Create the log of lines [start, end) of a parent log (a part of a
+        combined log), viewing the lines of the parent instead of copying them.
+        """
+        log = cls(LineView.of(parent.full_contents, start, end), parent.ripper)
+        log.language = parent.language
+        log._source = None
+        log._contents = LineView.of(parent.contents, start, end)
+        # The signature covers the whole log, so each part carries its status.
+        log.integrity = parent.integrity
+        return log
+
+    @property
+    def contents(self):
+        """The lines with whitespace collapsed and full-width punctuation replaced."""
+        if self._contents is None:
+            self._contents = format_full_contents(self._source)
+            self._source = None
+        return self._contents
+
+    @property
+    def concat_contents(self):
+        """The normalized lines which aren't blank."""
+        if self._concat_contents is None:
+            self._concat_contents = [line for line in self.contents if line.strip()]
+        return self._concat_contents
+
     def to_dict(self):
         """Return a dict of the log analysis."""
-        if self.unrecognized:
-            return {
-                'unrecognized': self.unrecognized,
-                'flagged': self.flagged,
-                'contents': ''.join(self.full_contents),
-            }
-
-        deductions = [deduction for deduction in self.deductions.values()]
-
-        return {
-            'deductions': deductions,
-            'flagged': self.flagged,
-            'name': self.album,
-            'ripper': self.ripper,
-            'score': self.score,
-            'version': self.version,
-            'unrecognized': False,
-            'contents': ''.join(self.full_contents),
-        }
+        return score_parsed(self.to_parsed())
+
+    def to_parsed(self):
+        """Return the serializable ParsedLog of the log analysis."""
+        return ParsedLog(
+            format=PARSED_VERSION,
+            unrecognized=self.unrecognized,
+            flagged=self.flagged,
+            ripper=self.ripper,
+            language=self.language,
+            version=self.version,
+            album=self.album,
+            drive=self.drive,
+            range=self.range,
+            cdr=self.cdr,
+            htoa=self.htoa,
+            checksum=self.checksum,
+            toc=dict(self.toc),
+            tracks=dict(self.tracks),
+            accuraterip=list(self.accuraterip),
+            track_errors={
+                error: list_track_errors(tracks)
+                for error, tracks in self.track_errors.items()
+            },
+            crc_mismatch=list(self.crc_mismatch),
+            findings=tuple(self.deductions.values()),
+            contents=''.join(self.full_contents),
+            blocks=tuple(self.blocks),
+        )
 
     def add_deduction(
         self, deduction, multiplier=1, track=None, extra_phrase=None, cap_10=False
     ):
-        """Add a deduction to the log file."""
-        name, score = self._get_deduction_from_dict(deduction)
-        if score:
-            score = score * multiplier if not cap_10 else score * min(10, multiplier)
-
-        if track:
-            name = 'Track {}: {}'.format(track, name)
-        if multiplier > 1:
-            name += ' ({} occurrences)'.format(multiplier)
-        if score:
-            name += ' (-{} points)'.format(score)
-        if extra_phrase:
-            name += ' ({})'.format(extra_phrase)
-
-        self.deductions[deduction] = [name, score]
-
-    def _get_deduction_from_dict(self, deduction):
-        """Get the deduction's name and score from the deductions dict."""
-        if deduction not in DEDUCTIONS:
-            return (deduction, None)
-
-        deduction_entry = DEDUCTIONS[deduction]
-        # Some deductions are different per-ripper and are represented
-        # with an extra embedded dictionary.
-        if isinstance(deduction_entry, dict):
-            if self.ripper in deduction_entry:
-                deduction_entry = deduction_entry[self.ripper]
-            else:
-                deduction_entry = deduction_entry['Default']
-
-        return (deduction_entry[0], deduction_entry[1])
+        """Add a deduction to the log file. It is weighed when the log is scored."""
+        self.deductions[deduction] = Finding(
+            deduction, multiplier, track, extra_phrase, cap_10
+        )
 
     def remove_deduction(self, deduction):
         """Remove a deduction from the log file."""
@@ -129,13 +196,94 @@ class LogFile:
         return all(de in self.deductions for de in deductions)
 
 
+class LineView(Sequence):
+    """A read-only view of lines [start, stop) of a list of lines. Slicing a
+    view returns a list, like slicing the list would.
+    """
+
+    __slots__ = ('lines', 'start', 'stop')
+
+    def __init__(self, lines, start, stop):
+        self.lines = lines
+        self.start = start
+        self.stop = stop
+
+    @classmethod
+    def of(cls, lines, start, stop):
+        """View lines [start, stop) of a list or view of lines; a range covering
+        a whole list is the list itself.
+        """
+        # Clamp the range like a slice would.
+        start, stop, _ = slice(start, stop).indices(len(lines))
+        stop = max(start, stop)
+        if isinstance(lines, LineView):
+            return cls(lines.lines, lines.start + start, lines.start + stop)
+        if start == 0 and stop == len(lines):
+            return lines
+        return cls(lines, start, stop)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indices = range(self.start, self.stop)[index]
+            if indices.step == 1:
+                return self.lines[indices.start : indices.stop]
+            return [self.lines[i] for i in indices]
+        if 0 <= index < self.stop - self.start:
+            return self.lines[self.start + index]
+        return self.lines[range(self.start, self.stop)[index]]
+
+    def __iter__(self):
+        return itertools.islice(self.lines, self.start, self.stop)
+
+    def __reduce__(self):
+        # Only the viewed lines are sent to other processes.
+        return list, (list(self),)
+
+
+def join_lines(parts):
+    """Join lists or views of lines back together. Views of consecutive lines
+    of one list are joined without copying.
+    """
+    first = parts[0]
+    if all(isinstance(part, LineView) for part in parts) and all(
+        part.lines is first.lines and part.start == previous.stop
+        for previous, part in zip(parts, parts[1:])
+    ):
+        return LineView.of(first.lines, first.start, parts[-1].stop)
+
+    lines = []
+    for part in parts:
+        lines += part
+    return lines
+
+
+def list_track_errors(tracks):
+    """List the tracks of an error in track order: track numbers for a set,
+    [track, count] pairs for a dict.
+    """
+    if isinstance(tracks, dict):
+        return [[track, count] for track, count in sorted(tracks.items())]
+    return sorted(tracks)
+
+
 def format_full_contents(full_contents):
     """
     Format raw contents by stripping spaces, blank lines, and filtering
     out unicode crap.
     """
-    contents = [re.sub(r'\s+', ' ', l.rstrip()) for l in full_contents]
-    contents = [re.sub('：', ':', l) for l in contents]
-    contents = [re.sub('，', ', ', l) for l in contents]
+    return [normalize_line(line) for line in full_contents]
+
 
-    return contents
+def normalize_line(line):
+    """Strip trailing whitespace, collapse the rest into single spaces, then
+    replace full-width colons and commas.
+    """
+    # str.split and the regex \s agree on what whitespace is, so this is the
+    # same as re.sub(r'\s+', ' ', line.rstrip()) without the regex engine.
+    collapsed = ' '.join(line.split())
+    if collapsed and line[0].isspace():
+        collapsed = ' ' + collapsed
+    return collapsed.translate(FULL_WIDTH)
@@ -1,7 +1,15 @@
-"""Mark up the log file with classes according to the regex."""
+"""Mark up the log file with classes according to the regex.
+
+A MarkupRenderer walks the blocks of a log (as indexed by the log checker, in the
+Blocks of each part of the log) once, testing each line against one compiled
+alternation of the patterns of its block,
+and returns a Markup: the lines of the log and the (line, start, end, class)
+spans over them. HTML, ANSI-colored text and JSON are serializations of the spans.
+"""
 
 import html
 import re
+from typing import NamedTuple
 
 from heybrochecklog.markup.matches import (
     eac_footer_matches,
@@ -10,7 +18,6 @@ from heybrochecklog.markup.matches import (
     xld_footer_matches,
     xld_track_matches,
 )
-from heybrochecklog.score.modules import parsers
 from heybrochecklog.shared import format_pattern as fmt_ptn
 
 VERSIONS = {
@@ -18,373 +25,642 @@ VERSIONS = {
     'XLD': r'X Lossless Decoder version ([0-9abc]+) \(([0-9\.]+)\)',
 }
 
+# Spans of this class are serialized as <strong> instead of a <span>.
+STRONG = 'strong'
+
+BEGIN_SIGNATURE = '-----BEGIN XLD SIGNATURE-----'
+END_SIGNATURE = '-----END XLD SIGNATURE-----'
+
+RE_LINE = re.compile('(.*)')
+RE_SETTING = re.compile(r'.+:.+')
+RE_CRC = re.compile('([0-9A-F]{8})')
+RE_RULE = re.compile('(-+)')
+RE_TOC_TITLE = re.compile(
+    r' +[^0-9]+ +\| +[^0-9]+ +\| +[^0-9]+ +\| +[^0-9]+ +\| +[^0-9]+ *$'
+)
+RE_TOC_RULE = re.compile(r'\s+-+\s*$')
+RE_TOC_ENTRY = re.compile(
+    r' +[0-9]+ +\| +([0-9:\.]+) +\| +([0-9:\.]+) +\| +([0-9]+) +\| +([0-9]+) *$'
+)
+RE_TOC_COLUMNS = re.compile(
+    r'([0-9]+) +(\|) +([0-9:\.]+) +(\|) +([0-9:\.]+) +(\|) +([0-9]+) +(\|) +([0-9]+)'
+)
+# The render target of ANSI-colored text, as opposed to HTML (markup=True).
+ANSI = 'ansi'
+ANSI_RESET = '\x1b[0m'
+# The SGR escape of each class. A span of several classes gets all of them.
+ANSI_STYLES = {
+    'good': '\x1b[1;32m',
+    'bad': '\x1b[1;31m',
+    'badish': '\x1b[1;33m',
+    'log1': '\x1b[36m',
+    'log2': '\x1b[35m',
+    'log3': '\x1b[34m',
+    'log4': '\x1b[1m',
+    'log5': '\x1b[4m',
+    STRONG: '\x1b[1m',
+}
 
-def markup(log, patterns, translation):
-    """Mark up log files with highlighting for proper/improper settings."""
-    log.full_contents = [html.escape(line) for line in log.full_contents]
+TOC_COLUMNS = ['log4', STRONG, 'log1', STRONG, 'log1', STRONG, 'log1', STRONG, 'log1']
+
+
+class Span(NamedTuple):
+    """A class applied to characters [start, end) of a line. The end of a span
+    may run past the end of its line, into the lines after it.
+    """
+
+    line: int
+    start: int
+    end: int
+    class_: str
+
+
+class Markup(NamedTuple):
+    """The lines of a marked up log and its spans, in document order (enclosing
+    spans before the spans inside them).
+    """
+
+    lines: list
+    spans: list
+
+    def to_html(self):
+        """Return the log as HTML."""
+        return ''.join(self.html_lines())
+
+    def html_lines(self):
+        """Yield the HTML of each line. An element is closed on the line where
+        its span ends, so joining the lines gives the HTML of the log.
+        """
+        spans = iter(self.spans)
+        span = next(spans, None)
+        # The offset (from the start of the log) and closing tag of each open
+        # element, innermost last.
+        opened = []
+        base = 0
+        for i, line in enumerate(self.lines):
+            parts = []
+            position = 0
+
+            def close_until(offset):
+                nonlocal position
+                while opened and opened[-1][0] <= offset:
+                    end, tag = opened.pop()
+                    parts.append(html.escape(line[position : end - base]))
+                    parts.append(tag)
+                    position = end - base
+
+            while span is not None and span.line == i:
+                close_until(base + span.start)
+                parts.append(html.escape(line[position : span.start]))
+                position = span.start
+                open_tag, close_tag = tags(span.class_)
+                parts.append(open_tag)
+                opened.append((base + span.end, close_tag))
+                span = next(spans, None)
+
+            close_until(base + len(line))
+            parts.append(html.escape(line[position:]))
+            yield ''.join(parts)
+            base += len(line)
+
+    def to_ansi(self):
+        """Return the log as text colored with ANSI escapes."""
+        return ''.join(self.ansi_lines())
+
+    def ansi_lines(self, styles=ANSI_STYLES):
+        """Yield each line colored with ANSI escapes. Escapes don't nest, so the
+        styles of every open span are applied again whenever one of them ends,
+        and every line is reset before its newline.
+        """
+        spans = iter(self.spans)
+        span = next(spans, None)
+        # The offset (from the start of the log) where each open span ends and
+        # the escapes of it and the spans around it, innermost last.
+        opened = []
+        escapes = {}
+        base = 0
+        for i, line in enumerate(self.lines):
+            text = line.rstrip('\r\n')
+            parts = []
+            position = 0
+            current = ''
+
+            def write(until):
+                nonlocal position, current
+                until = min(until, len(text))
+                if until <= position:
+                    return
+                style = opened[-1][1] if opened else ''
+                if style != current:
+                    # Opening an inner span only adds to the escapes in effect.
+                    if style.startswith(current):
+                        parts.append(style[len(current) :])
+                    else:
+                        parts.append(ANSI_RESET + style)
+                    current = style
+                parts.append(text[position:until])
+                position = until
+
+            def close_until(offset):
+                while opened and opened[-1][0] <= offset:
+                    write(opened[-1][0] - base)
+                    opened.pop()
+
+            while span is not None and span.line == i:
+                close_until(base + span.start)
+                write(span.start)
+                if span.class_ not in escapes:
+                    escapes[span.class_] = ''.join(
+                        styles.get(name, '') for name in span.class_.split()
+                    )
+                outer = opened[-1][1] if opened else ''
+                opened.append((base + span.end, outer + escapes[span.class_]))
+                span = next(spans, None)
+
+            close_until(base + len(text))
+            write(len(text))
+            if current:
+                parts.append(ANSI_RESET)
+            parts.append(line[len(text) :])
+            yield ''.join(parts)
+            base += len(line)
+
+    def to_json(self):
+        """Return the compact, JSON-serializable form of the markup: the lines
+        and a [line, start, end, class] list per span.
+        """
+        return {'lines': list(self.lines), 'spans': [list(span) for span in self.spans]}
+
+    @classmethod
+    def join(cls, parts):
+        """Join the markups of consecutive parts of a log into one."""
+        if len(parts) == 1:
+            return parts[0]
+
+        lines, spans = [], []
+        for part in parts:
+            spans += [span._replace(line=span.line + len(lines)) for span in part.spans]
+            lines += part.lines
+        return cls(lines, spans)
+
+    @classmethod
+    def from_json(cls, data):
+        """Rebuild the markup from the dict returned by to_json."""
+        return cls(list(data['lines']), [Span(*span) for span in data['spans']])
+
+
+def tags(class_):
+    """Return the opening and closing tags of the element of a class."""
+    if class_ == STRONG:
+        return '<strong>', '</strong>'
+    return '<span class="{}">'.format(class_), '</span>'
+
+
+class Alternation:
+    """A list of (value, pattern) pairs compiled into one regex, which returns
+    the value of the first pattern matching at the start of a line.
+    """
+
+    def __init__(self, items):
+        self.values = [value for value, _ in items]
+        self.regex = re.compile(
+            '|'.join(
+                '(?P<_{}>{})'.format(i, pattern) for i, (_, pattern) in enumerate(items)
+            )
+            or '(?!)'
+        )
 
-    header(log, translation)
-    settings(log, patterns)
-    toc(log)
-    tracks(log, patterns, translation)
-    footer(log, translation)
+    def match(self, line):
+        result = self.regex.match(line)
+        if result:
+            return self.values[int(result.lastgroup[1:])]
+        return None
+
+
+def last_match_first(matches, classes=None):
+    """Order the (class, element) pairs of a dict of matches so that the first
+    match of the alternation is the one the last class to match applies.
+    """
+    return [
+        (class_, element)
+        for class_ in reversed(classes or list(matches))
+        for element in matches[class_]
+    ]
+
+
+class MarkupRenderer:
+    """Render the markup of the logs of one ripper and language. The patterns
+    are compiled once, when the renderer is built.
+    """
+
+    def __init__(self, ripper, patterns, translation=None):
+        self.ripper = ripper
+        self.patterns = patterns
+        self.xld = ripper == 'XLD'
+
+        self.version = re.compile(VERSIONS[ripper]) if ripper in VERSIONS else None
+        time_line = 'XLD extraction logfile from' if self.xld else translation['1274']
+        self.time_value = re.compile('{} (.*)'.format(time_line))
+        self.time_line = re.compile('({}.*)'.format(time_line))
+
+        self.read_mode = re.compile(fmt_ptn(patterns['settings']['Read mode']))
+        self.settings = Alternation(
+            [(key, fmt_ptn(value)) for key, value in patterns['settings'].items()]
+        )
+        bad_settings = {} if self.xld else patterns['bad settings']
+        self.bad_settings = Alternation(
+            [(key, fmt_ptn(value)) for key, value in bad_settings.items()]
+        )
 
+        track_pattern = patterns['track']
+        self.track_number = re.compile(r'{} +(\d+)'.format(track_pattern))
+        self.track_line = re.compile('({}.+)'.format(track_pattern))
 
-def header(log, translation):
-    """Mark up the header of the log."""
-    # If first line is a version line, style it.
-    start_index = 0
-    if log.ripper in VERSIONS:
-        log.full_contents[0] = substitute(
-            log.full_contents[0], VERSIONS[log.ripper], 'log1'
+        if self.xld:
+            self.compile_xld()
+        else:
+            self.compile_eac(translation)
+
+    def compile_xld(self):
+        """Compile the XLD TOC, track and footer matches."""
+        ar_summary = xld_ar_summary()
+        # Every AR summary match is applied in turn, so the last one wins.
+        self.ar_summary = Alternation(
+            [
+                ((class_, re.compile('({})'.format(element))), element)
+                for class_, element in reversed(
+                    [(c, e) for c in ar_summary for e in ar_summary[c]]
+                )
+            ]
         )
-        start_index = 1  # No need to scan this line twice.
-
-    if log.ripper == 'EAC' or log.ripper == 'EAC95':
-        re_time_line = translation['1274']
-    else:  # XLD
-        re_time_line = 'XLD extraction logfile from'
-
-    count = 1
-    for i, line in enumerate(log.full_contents[start_index : log.index_settings]):
-        i += start_index
-        # Style the extraction time line.
-        if line.strip():
-            if count == 1:
-                line = substitute(line, '{} (.*)'.format(re_time_line), 'log5')
-                log.full_contents[i] = substitute(
-                    line, '({}.*)'.format(re_time_line), 'good'
+
+        matches = xld_track_matches()
+        self.full_line = Alternation(
+            [
+                ((class_, re.compile('({}.*)'.format(element))), element)
+                for class_, element in matches['full_line']
+            ]
+        )
+        self.crc = Alternation(
+            [
+                (re.compile(r' +({}.+ :)'.format(element)), element + ' +:')
+                for element in matches['crc']
+            ]
+        )
+        self.statistics = Alternation(
+            [
+                (class_, element)
+                for class_ in matches['statistics']
+                for element in matches['statistics'][class_]
+            ]
+        )
+        self.footer = self.compile_footer(xld_footer_matches())
+
+    def compile_eac(self, translation):
+        """Compile the EAC track and footer matches."""
+        matches = eac_track_matches(translation)
+        self.track_log4 = Alternation(
+            [
+                (
+                    (
+                        re.compile(' +{} +(.*)'.format(element)),
+                        re.compile(' +({}.+)'.format(element)),
+                    ),
+                    element,
                 )
-                count += 1
+                for element in matches['log4']
+            ]
+        )
+        # Every CRC match is applied in turn, so the last one wins.
+        self.crc = Alternation(
+            [
+                (re.compile(' +({}.+)'.format(element)), element)
+                for element in reversed(matches['crc'])
+            ]
+        )
+        self.track_classes = Alternation(
+            [
+                ((class_, re.compile(' *({}.*)'.format(element))), element)
+                for class_, element in last_match_first(
+                    matches, ['good', 'badish', 'bad', 'log3']
+                )
+            ]
+        )
+        self.footer = self.compile_footer(eac_footer_matches(translation))
+
+    def compile_footer(self, matches):
+        """Compile the footer matches, where the last class to match wins."""
+        return Alternation(
+            [
+                ((class_, re.compile('({})'.format(element))), element)
+                for class_, element in last_match_first(matches)
+            ]
+        )
+
+    def render_log(self, lines, blocks):
+        """Mark up the lines of a checked log from the Blocks of each of its
+        parts, returning its Markup.
+        """
+        parts = []
+        start = 0
+        for part in blocks:
+            parts.append(self.render(lines[start : start + part.lines], part))
+            start += part.lines
+        return Markup.join(parts)
+
+    def render(self, lines, blocks):
+        """Mark up the lines of a checked log (or part of a combined log) from
+        its Blocks, returning its Markup.
+        """
+        lines = list(lines)
+        spans = []
+        self.header(blocks, lines, spans)
+        self.settings_block(blocks, lines, spans)
+        self.toc(blocks, lines, spans)
+        if self.xld:
+            self.xld_tracks(blocks, lines, spans)
+        else:
+            self.eac_tracks(blocks, lines, spans)
+        self.footer_block(blocks, lines, spans)
+
+        spans.sort(key=document_order)
+        return Markup(lines, spans)
+
+    def header(self, blocks, lines, spans):
+        """Mark up the header of the blocks."""
+        # If first line is a version line, style it.
+        start = 0
+        if self.version is not None:
+            wrap_groups(spans, 0, lines[0], self.version.search(lines[0]), 'log1')
+            start = 1  # No need to scan this line twice.
+
+        count = 1
+        for i in block(lines, start, blocks.index_settings):
+            line = lines[i]
+            if not line.strip():
+                continue
+            # Style the extraction time line.
+            if count == 1:
+                wrap_groups(spans, i, line, self.time_value.search(line), 'log5')
+                wrap_groups(spans, i, line, self.time_line.search(line), 'good')
             # Style the Artist / Album string
             elif count == 2:
-                log.full_contents[i] = substitute(line, '(.*)', 'log4')
-                count += 1
+                wrap_groups(spans, i, line, RE_LINE.search(line), 'log4')
             # Style drive line
             elif count == 3:
-                log.full_contents[i] = drive(log, line)
-                count += 1
+                lines[i] = line = self.drive(blocks, line)
+                style_setting(spans, i, line, self.drive_class(blocks))
             # XLD CD Type line
             elif count == 4:
-                log.full_contents[i] = cd_type(log, line)
+                style_setting(spans, i, line, 'badish' if blocks.cdr else 'good')
                 break
-
-
-def drive(log, line):
-    """Mark up the drive line according to offset."""
-    if log.has_deduction('Virtual drive'):
-        return style_setting(line, 'bad')
-    elif log.unindexed_drive:
-        line = line.rstrip()
-        line += ' (not found in database)\n'
-        return style_setting(line, 'badish')
-    return style_setting(line, 'good')
-
-
-def cd_type(log, line):
-    """Style CD type line."""
-    if log.cdr:
-        return style_setting(line, 'badish')
-    return style_setting(line, 'good')
-
-
-def settings(log, patterns):
-    """Mark up the settings block."""
-    for i, line in enumerate(log.full_contents[log.index_settings : log.index_toc]):
-        i += log.index_settings
-        if (
-            re.match(fmt_ptn(patterns['settings']['Read mode']), line)
-            and log.ripper == 'EAC95'
-        ):
-            log.full_contents[i] = style_95_read_mode(line, patterns)
-            continue
-        for key, value in patterns['settings'].items():
-            if re.match(fmt_ptn(value), line.lstrip()):  # lstrip() for EAC95
-                class_ = 'bad' if log.has_deduction(key) else 'good'
-                log.full_contents[i] = style_setting(line, class_)
-                break
-        else:
-            if log.ripper in ['EAC', 'EAC95']:
-                for key, value in patterns['bad settings'].items():
-                    if re.match(fmt_ptn(value), line.lstrip()):
-                        log.full_contents[i] = style_setting(line, 'bad')
-                        break
-                else:
-                    log.full_contents[i] = style_setting(line, 'log4')
+            count += 1
+
+    def drive(self, blocks, line):
+        """Note an offset which isn't in the drive database on the drive line."""
+        if not blocks.has_deduction('Virtual drive') and blocks.unindexed_drive:
+            return line.rstrip() + ' (not found in database)\n'
+        return line
+
+    def drive_class(self, blocks):
+        """Class the drive line according to offset."""
+        if blocks.has_deduction('Virtual drive'):
+            return 'bad'
+        elif blocks.unindexed_drive:
+            return 'badish'
+        return 'good'
+
+    def settings_block(self, blocks, lines, spans):
+        """Mark up the settings block."""
+        for i in block(lines, blocks.index_settings, blocks.index_toc):
+            line = lines[i]
+            if self.ripper == 'EAC95' and self.read_mode.match(line):
+                style_95_read_mode(spans, i, line, self.patterns)
+                continue
+
+            # lstrip() for EAC95
+            key = self.settings.match(line.lstrip())
+            if key is not None:
+                class_ = 'bad' if blocks.has_deduction(key) else 'good'
+            elif self.bad_settings.match(line.lstrip()) is not None:
+                class_ = 'bad'
             else:
-                log.full_contents[i] = style_setting(line, 'log4')
-
-
-def toc(log):
-    """Mark up TOC block."""
-    # Mark up beginning of block
-    init_line = log.full_contents[log.index_toc]
-    log.full_contents[log.index_toc] = substitute(init_line, '(.*)', 'log4 log5')
-
-    # Adjust line for XLD All Tracks block
-    end_line = log.all_tracks if log.all_tracks else log.index_tracks
-    if log.ripper == 'XLD':  # XLD AR Summary block matches
-        matches = xld_ar_summary()
-
-    re_toc_title = re.compile(
-        r' +[^0-9]+ +\| +[^0-9]+ +\| +[^0-9]+ +\| +[^0-9]+ +\| +[^0-9]+ *$'
-    )
-    re_toc_entry = (
-        r' +[0-9]+ +\| +([0-9:\.]+) +\| +([0-9:\.]+) +\| +([0-9]+) +\| +([0-9]+) *$'
-    )
-    for i, line in enumerate(log.full_contents[log.index_toc : end_line]):
-        i += log.index_toc
-        if re_toc_title.match(line):
-            log.full_contents[i] = sub_strong(line, '(.*)')
-        elif re.match(r'\s+-+\s*$', line):
-            log.full_contents[i] = sub_strong(line, '(-+)')
-        elif re.match(re_toc_entry, line):
-            log.full_contents[i] = sub_toc(line)
-
-        # XLD also has an AR Summary block.
-        if log.ripper == 'XLD':
-            for class_ in matches:
-                for element in matches[class_]:
-                    if re.match(element, line.lstrip()):
-                        log.full_contents[i] = substitute(
-                            line, '({})'.format(element), class_
+                class_ = 'log4'
+            style_setting(spans, i, line, class_)
+
+    def toc(self, blocks, lines, spans):
+        """Mark up TOC block."""
+        first = lines[blocks.index_toc]
+        wrap_groups(spans, blocks.index_toc, first, RE_LINE.search(first), 'log4 log5')
+
+        # Adjust line for XLD All Tracks block
+        end = blocks.all_tracks if blocks.all_tracks else blocks.index_tracks
+        # The first line is already styled, so the TOC patterns can't match it.
+        for i in block(lines, blocks.index_toc + 1, end):
+            line = lines[i]
+            # XLD also has an AR Summary block, whose style replaces the TOC's.
+            if self.xld:
+                match = self.ar_summary.match(line.lstrip())
+                if match is not None:
+                    class_, regex = match
+                    wrap_groups(spans, i, line, regex.search(line), class_)
+                    continue
+
+            if RE_TOC_TITLE.match(line):
+                wrap_groups(spans, i, line, RE_LINE.search(line), STRONG)
+            elif RE_TOC_RULE.match(line):
+                wrap_groups(spans, i, line, RE_RULE.search(line), STRONG)
+            elif RE_TOC_ENTRY.match(line):
+                for result in RE_TOC_COLUMNS.finditer(line):
+                    for group, class_ in enumerate(TOC_COLUMNS, 1):
+                        spans.append(
+                            Span(i, result.start(group), result.end(group), class_)
                         )
 
-
-def tracks(log, patterns, translation):
-    """Mark up the tracks block."""
-    if log.ripper == 'XLD':
-        xld_tracks(log, patterns)
-    else:
-        eac_tracks(log, patterns, translation)
-
-
-def xld_tracks(log, patterns):
-    """XLD tracks."""
-    matches = xld_track_matches()
-    indices = (
-        [log.all_tracks] + log.track_indices if log.all_tracks else log.track_indices
-    )
-
-    for i, index in enumerate(indices):
-        track_num, log.full_contents[index] = track_number(
-            log, index, patterns['track']
+    def xld_tracks(self, blocks, lines, spans):
+        """XLD tracks."""
+        indices = (
+            [blocks.all_tracks] + blocks.track_indices
+            if blocks.all_tracks
+            else blocks.track_indices
         )
-        for j, line in enumerate(log.full_contents[indices[i] : indices[i + 1]]):
-            j += indices[i]
-            for match in matches['full_line']:
-                if re.match(match[1], line.lstrip()):
-                    log.full_contents[j] = substitute(
-                        line, '({}.*)'.format(match[1]), match[0]
-                    )
-                    break
-            else:
-                for match in matches['crc']:
-                    if re.match(match + ' +:', line.lstrip()) and track_num:
-                        track = log.tracks[track_num]
-                        log.full_contents[j] = sub_crc(
-                            track, match, line, xld_colon=True
-                        )
-                        break
+        last = max(indices)
+
+        for index, next_index in zip(indices, indices[1:]):
+            track, styled = self.track_header(blocks, lines, spans, index)
+            for i in range(index + styled, next_index):
+                line = lines[i]
+                stripped = line.lstrip()
+                match = self.full_line.match(stripped)
+                if match is not None:
+                    class_, regex = match
+                    wrap_groups(spans, i, line, regex.search(line), class_)
+                    continue
+
+                regex = self.crc.match(stripped) if track[0] else None
+                if regex is not None:
+                    sub_crc(spans, i, line, track, regex)
+                    continue
+
+                class_ = self.statistics.match(stripped)
+                if class_ is not None:
+                    style_statistic(spans, i, line, class_)
                 else:
-                    found = False
-                    for class_ in matches['statistics']:
-                        for element in matches['statistics'][class_]:
-                            if re.match(element, line.lstrip()):
-                                log.full_contents[j] = style_statistic(line, class_)
-                                found = True
-                                break
-                        if found:
-                            break
-                    else:
-                        log.full_contents[j] = style_setting(
-                            line, 'log3', first_class='log4', include_colon=True
-                        )
-
-        if indices[i + 1] == max(indices):
-            break
+                    style_setting(
+                        spans, i, line, 'log3', first_class='log4', include_colon=True
+                    )
 
+            if next_index == last:
+                break
 
-def eac_tracks(log, patterns, translation):
-    """EAC tracks."""
-    matches = eac_track_matches(translation)
+    def eac_tracks(self, blocks, lines, spans):
+        """EAC tracks."""
+        indices = blocks.track_indices
+        last = max(indices)
+
+        for index, next_index in zip(indices, indices[1:]):
+            track, styled = self.track_header(blocks, lines, spans, index)
+            for i in range(index + styled, next_index):
+                line = lines[i]
+                stripped = line.lstrip()
+                regexes = self.track_log4.match(stripped)
+                if regexes is not None:
+                    value, setting = regexes
+                    wrap_groups(spans, i, line, value.search(line), 'log3')
+                    wrap_groups(spans, i, line, setting.search(line), 'log4')
+                    continue
+
+                regex = self.crc.match(stripped)
+                if regex is not None:
+                    sub_crc(spans, i, line, track, regex)
+                    continue
+
+                match = self.track_classes.match(stripped)
+                if match is not None:
+                    class_, regex = match
+                    wrap_groups(spans, i, line, regex.search(line), class_)
+
+            if next_index == last:
+                break
 
-    for i, index in enumerate(log.track_indices):
-        track_num, log.full_contents[index] = track_number(
-            log, index, patterns['track']
-        )
-        for j, line in enumerate(
-            log.full_contents[log.track_indices[i] : log.track_indices[i + 1]]
-        ):
-            j += log.track_indices[i]
-            for element in matches['log4']:
-                if re.match(element, line.lstrip()):
-                    line = substitute(line, ' +{} +(.*)'.format(element), 'log3')
-                    log.full_contents[j] = substitute(
-                        line, ' +({}.+)'.format(element), 'log4'
-                    )
-                    break
-            for class_ in ['good', 'badish', 'bad', 'log3']:
-                for element in matches[class_]:
-                    if re.match(element, line.lstrip()):
-                        log.full_contents[j] = substitute(
-                            line, ' *({}.*)'.format(element), class_
-                        )
-                        break
-            for element in matches['crc']:
-                if re.match(element, line.lstrip()):
-                    track = log.tracks[track_num]
-                    log.full_contents[j] = sub_crc(track, element, line)
-        if log.track_indices[i + 1] == max(log.track_indices):
-            break
-
-
-def track_number(log, index, track_pattern):
-    """Parse track number and style the line."""
-    if log.all_tracks and log.full_contents[index].startswith('All Tracks'):
-        return (0, substitute(log.full_contents[index], '(.*)', 'log5'))
-    track_num = parsers.get_track_number(log, index, track_pattern)
-    line = substitute(
-        log.full_contents[index], r'{} +(\d+)'.format(track_pattern), 'log4 log1'
-    )
-    line = substitute(line, '({}.+)'.format(track_pattern), 'log5')
-    return (track_num, line)
-
-
-def sub_crc(track, element, line, xld_colon=False):
-    """Process the CRCs for markup."""
-    re_crc = '([0-9A-F]{8})'
-    if 'test crc' not in track:
-        line = substitute(line, re_crc, 'badish')
-    elif track['test crc'] != track['copy crc']:
-        line = substitute(line, re_crc, 'bad')
+    def track_header(self, blocks, lines, spans, index):
+        """Style the header line of a track block. Returns the [track number,
+        copy CRC, test CRC] of the track and whether the line was styled.
+        """
+        line = lines[index]
+        if blocks.all_tracks and line.startswith('All Tracks'):
+            wrap_groups(spans, index, line, RE_LINE.search(line), 'log5')
+            return [0, None, None], True
+
+        count = len(spans)
+        wrap_groups(spans, index, line, self.track_number.search(line), 'log4 log1')
+        wrap_groups(spans, index, line, self.track_line.search(line), 'log5')
+        return blocks.tracks[index], len(spans) > count
+
+    def footer_block(self, blocks, lines, spans):
+        """Mark up the footer."""
+        signature = None
+        for i in block(lines, blocks.index_footer, None):
+            line = lines[i]
+            # XLD Checksum stuff goes here
+            if self.xld and line.startswith(BEGIN_SIGNATURE):
+                lines[i] = BEGIN_SIGNATURE + '\n'
+                signature = i
+                continue
+            elif self.xld and line.startswith(END_SIGNATURE):
+                lines[i] = END_SIGNATURE
+                if signature is not None:
+                    end = sum(len(lines[j]) for j in range(signature, i + 1))
+                    spans.append(Span(signature, 0, end, 'good'))
+                continue
+
+            match = self.footer.match(line.lstrip())
+            if match is not None:
+                class_, regex = match
+                wrap_groups(spans, i, line, regex.search(line), class_)
+
+
+def document_order(span):
+    """Sort key of spans in document order. Empty spans come first, then
+    enclosing spans before the spans inside them; ties keep the order the spans
+    were added in.
+    """
+    return span.line, span.start, span.end > span.start, -span.end
+
+
+def block(lines, start, end):
+    """Return the range of line numbers of a block, from a start and end which
+    may be None (as in a slice).
+    """
+    return range(*slice(start, end).indices(len(lines)))
+
+
+def wrap_groups(spans, index, line, result, class_):
+    """Add a span for each group of a match, over the first occurrence of the
+    group's text in the line.
+    """
+    if result:
+        for text in result.groups():
+            start = line.find(text)
+            spans.append(Span(index, start, start + len(text), class_))
+
+
+def sub_crc(spans, index, line, track, setting):
+    """Process the CRCs of a [track number, copy CRC, test CRC] for markup."""
+    _, copy_crc, test_crc = track
+    if test_crc is None:
+        class_ = 'badish'
+    elif test_crc != copy_crc:
+        class_ = 'bad'
     else:
-        line = substitute(line, re_crc, 'good')
-    if xld_colon:
-        return substitute(line, ' +({}.+ :)'.format(element), 'log4')
-    return substitute(line, ' +({}.+)'.format(element), 'log4',)
-
-
-def footer(log, translation):
-    """Mark up the footer."""
-    matches = (
-        xld_footer_matches() if log.ripper == 'XLD' else eac_footer_matches(translation)
-    )
-
-    for i, line in enumerate(log.full_contents[log.index_footer :]):
-        i += log.index_footer
-        for class_ in matches:
-            for element in matches[class_]:
-                if re.match(element, line.lstrip()):
-                    log.full_contents[i] = substitute(
-                        line, '({})'.format(element), class_
-                    )
-                    break
-            if log.ripper == 'XLD':
-                # XLD Checksum stuff goes here
-                if line.startswith('-----BEGIN XLD SIGNATURE-----'):
-                    log.full_contents[
-                        i
-                    ] = '<span class="good">-----BEGIN XLD SIGNATURE-----\n'
-                elif line.startswith('-----END XLD SIGNATURE-----'):
-                    log.full_contents[i] = '-----END XLD SIGNATURE-----</span>'
-
-
-def style_setting(line, class_, first_class='log5', include_colon=False):
+        class_ = 'good'
+    wrap_groups(spans, index, line, RE_CRC.search(line), class_)
+    wrap_groups(spans, index, line, setting.search(line), 'log4')
+
+
+def style_setting(
+    spans, index, line, class_, first_class='log5', include_colon=False
+):
     """Style a setting line in the log (<setting_name> +: <setting>)."""
-    if re.match(r'.+:.+', line):
+    if RE_SETTING.match(line):
         parts = line.split(':', 1)
-        setting = re.escape(
-            parts[0].lstrip() + ':' if include_colon else parts[0].lstrip()
-        )
-        data = '({})'.format(re.escape(parts[1].strip()))
-        line = substitute(line, '({})'.format(setting), first_class)
-        line = substitute(line, data, class_)
-    return line
+        setting = parts[0].lstrip() + ':' if include_colon else parts[0].lstrip()
+        span_text(spans, index, line, setting, first_class)
+        span_text(spans, index, line, parts[1].strip(), class_)
 
 
-def style_statistic(line, class_):
+def style_statistic(spans, index, line, class_):
     """Style a XLD statistic line."""
-    if re.match(r'.+:.+', line):
+    if RE_SETTING.match(line):
         parts = line.split(':', 1)
-        statistic = re.escape(parts[0].lstrip() + ':')
         occurrences = parts[1].strip()
 
         if occurrences.isdigit() and int(occurrences) == 0:
             class_ = 'good'
 
-        line = substitute(line, '({})'.format(occurrences), class_)
-        line = substitute(line, '({})'.format(statistic), 'log4')
-
-    return line
+        span_text(spans, index, line, occurrences, class_)
+        span_text(spans, index, line, parts[0].lstrip() + ':', 'log4')
 
 
-def style_95_read_mode(line, patterns):
+def style_95_read_mode(spans, index, line, patterns):
     """Style the EAC 95 read mode line."""
     # Burst mode doesn't have multiple settings in one line
     if ',' not in line:
-        return style_setting(line, 'bad')
+        return style_setting(spans, index, line, 'bad')
 
     split_line = line.split(':', 1)
-
-    read_mode = split_line[0].rstrip()
-    line = line.replace(read_mode, '<span class="log5">{}</span>'.format(read_mode), 1)
+    span_text(spans, index, line, split_line[0].rstrip(), 'log5')
 
     parts = split_line[1].lstrip().split(' ', 1)
     parts[1:] = [part.strip() for part in parts[1].split(',')]
-    num = 0
-    p = patterns['95 settings']
-    for setting in [
-        p['Read mode'],
-        p['C2 pointers'],
-        p['Accurate stream'],
-        p['Audio cache'],
-    ]:
-        if num == len(parts):
-            break
-        class_ = 'good' if setting in line else 'bad'
-        line = line.replace(
-            parts[num], '<span class="{}">{}</span>'.format(class_, parts[num]), 1
-        )
-        num += 1
-
-    return line
-
+    settings = ['Read mode', 'C2 pointers', 'Accurate stream', 'Audio cache']
+    for part, setting in zip(parts, settings):
+        class_ = 'good' if patterns['95 settings'][setting] in line else 'bad'
+        span_text(spans, index, line, part, class_)
 
-def substitute(line, regex, class_):
-    """Generate a span and put it in the line per the regex."""
-    result = re.search(regex, line)
-    if result:
-        for match in result.groups():
-            line = line.replace(
-                match, '<span class="{}">{}</span>'.format(class_, match), 1
-            )
-    return line
 
-
-def sub_strong(line, regex):
-    """Surround some patterns in <strong> tags."""
-    result = re.search(regex, line)
-    if result:
-        for match in result.groups():
-            line = line.replace(match, '<strong>{}</strong>'.format(match), 1)
-    return line
-
-
-def sub_toc(line):
-    """Substitute the HTML markup into a line of the TOC."""
-    return re.sub(
-        r'([0-9]+)( +)\|( +)([0-9:\.]+)( +)\|( +)([0-9:\.]+)( +)\|( +)'
-        r'([0-9]+)( +)\|( +)([0-9]+)',
-        r'<span class="log4">\1</span>\2<strong>|</strong>'
-        r'\3<span class="log1">\4</span>\5<strong>|</strong>'
-        r'\6<span class="log1">\7</span>\8<strong>|</strong>'
-        r'\9<span class="log1">\10</span>\11<strong>|</strong>'
-        r'\12<span class="log1">\13</span>',
-        line,
-    )
-
-
-def re_paren(line):
-    """Regex the comma. Quality docstring."""
-    return re.sub(r'\(', r'\(', line)
+def span_text(spans, index, line, text, class_):
+    """Add a span over the first occurrence of a text in the line."""
+    start = line.find(text)
+    if start != -1:
+        spans.append(Span(index, start, start + len(text), class_))
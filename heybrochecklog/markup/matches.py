@@ -31,9 +31,9 @@ def xld_track_matches():
     return {
         'full_line': [
             ['log4', 'Statistics'],
-            ['good', '-&gt;Accurately ripped'],
-            ['badish', '-&gt;Track not present in AccurateRip database'],
-            ['bad', '-&gt;Rip may not be accurate'],
+            ['good', '->Accurately ripped'],
+            ['badish', '->Track not present in AccurateRip database'],
+            ['bad', '->Rip may not be accurate'],
             ['bad', 'List of damaged sector positions +:'],
             ['badish', r'\(\d+\) \d{2}:\d{2}:\d{2}'],
             ['log3', r'\/.+\.(?:[Ff][Ll][Aa][Cc]|[Ww][Aa][Vv]|[Mm][Pp]3|[Aa][Aa][Cc])'],
@@ -109,7 +109,7 @@ def xld_ar_summary():
         'badish': [
             r'Track \d+ : NG.+',
             'Disc not found in AccurateRip DB',
-            r'-&gt;\d+ tracks? accurately ripped, \d+ tracks? not',
+            r'->\d+ tracks? accurately ripped, \d+ tracks? not',
         ],
         'log4 log5': ['AccurateRip Summary'],
     }
@@ -124,7 +124,7 @@ def generate_match_type(translation, source, matches=None, prepend='', append=''
         for line_id in source[match_type]:
             if line_id in translation:
                 match = prepend + re_paren(translation[line_id]) + append
-                matches[match_type].append(html.escape(match))
+                matches[match_type].append(match)
 
     return matches
 
@@ -0,0 +1,165 @@
+"""This module contains the ParsedLog, the serializable outcome of checking a log,
+and the scoring function which turns it into the final score and deductions.
+"""
+
+from typing import NamedTuple
+
+from heybrochecklog.resources import DEDUCTIONS
+
+# Bump when the fields of a ParsedLog change.
+PARSED_VERSION = 2
+
+
+class Finding(NamedTuple):
+    """A deduction found in a log, before it is weighed against DEDUCTIONS."""
+
+    key: str
+    multiplier: int = 1
+    track: int = None
+    extra_phrase: str = None
+    cap_10: bool = False
+
+
+class Blocks(NamedTuple):
+    """Where the blocks of a checked log (or of a part of a combined log) start,
+    as line numbers from its first line, and what its markup shows of them.
+    """
+
+    lines: int
+    index_settings: int
+    index_toc: int
+    index_tracks: int
+    index_footer: int
+    all_tracks: int
+    track_indices: list
+    # The [track number, copy CRC, test CRC] of each track header line.
+    tracks: dict
+    deductions: list
+    cdr: bool
+    unindexed_drive: bool
+
+    def has_deduction(self, deduction):
+        """Learn whether or not the log had a deduction when it was checked."""
+        return deduction in self.deductions
+
+    @classmethod
+    def from_list(cls, data):
+        """Rebuild the blocks from their JSON list."""
+        blocks = cls(*data)
+        # JSON turns the integer line numbers into strings.
+        return blocks._replace(
+            tracks={int(index): track for index, track in blocks.tracks.items()}
+        )
+
+
+class ParsedLog(NamedTuple):
+    """Everything extracted from a log by a log checker. It holds no weights or
+    points, so stored parsed logs can be scored again under new deductions.
+    """
+
+    format: int
+    unrecognized: object
+    flagged: bool
+    ripper: str
+    language: str
+    version: str
+    album: str
+    drive: str
+    range: bool
+    cdr: bool
+    htoa: bool
+    checksum: bool
+    toc: dict
+    tracks: dict
+    accuraterip: list
+    track_errors: dict
+    crc_mismatch: list
+    findings: tuple
+    contents: str
+    # The Blocks of each checked part of the log, for its markup.
+    blocks: tuple
+
+    def to_dict(self):
+        """Return a JSON-serializable dict of the parsed log."""
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a parsed log from the dict returned by to_dict."""
+        if data.get('format') != PARSED_VERSION:
+            raise ValueError(
+                'Unsupported parsed log format: {}'.format(data.get('format'))
+            )
+
+        data = dict(data)
+        # JSON turns the integer track numbers into strings.
+        data['toc'] = {int(track): entry for track, entry in data['toc'].items()}
+        data['tracks'] = {int(track): info for track, info in data['tracks'].items()}
+        data['findings'] = tuple(Finding(*finding) for finding in data['findings'])
+        data['blocks'] = tuple(Blocks.from_list(blocks) for blocks in data['blocks'])
+        return cls(**data)
+
+
+def score_parsed(parsed, deductions=DEDUCTIONS):
+    """Score a parsed log under a deductions table, returning the same dict as
+    LogFile.to_dict.
+    """
+    if parsed.unrecognized:
+        return {
+            'unrecognized': parsed.unrecognized,
+            'flagged': parsed.flagged,
+            'contents': parsed.contents,
+        }
+
+    results = [
+        describe_finding(finding, parsed.ripper, deductions)
+        for finding in parsed.findings
+    ]
+    score = 100 - sum(points for name, points in results if isinstance(points, int))
+
+    return {
+        'deductions': results,
+        'flagged': parsed.flagged,
+        'name': parsed.album,
+        'ripper': parsed.ripper,
+        'score': score,
+        'version': parsed.version,
+        'unrecognized': False,
+        'contents': parsed.contents,
+    }
+
+
+def describe_finding(finding, ripper, deductions=DEDUCTIONS):
+    """Get the [name, points] of a finding from the deductions table."""
+    name, points = get_deduction(finding.key, ripper, deductions)
+    if points:
+        multiplier = finding.multiplier
+        points = points * (min(10, multiplier) if finding.cap_10 else multiplier)
+
+    if finding.track:
+        name = 'Track {}: {}'.format(finding.track, name)
+    if finding.multiplier > 1:
+        name += ' ({} occurrences)'.format(finding.multiplier)
+    if points:
+        name += ' (-{} points)'.format(points)
+    if finding.extra_phrase:
+        name += ' ({})'.format(finding.extra_phrase)
+
+    return [name, points]
+
+
+def get_deduction(key, ripper, deductions=DEDUCTIONS):
+    """Get the deduction's name and points from the deductions table."""
+    if key not in deductions:
+        return (key, None)
+
+    deduction_entry = deductions[key]
+    # Some deductions are different per-ripper and are represented
+    # with an extra embedded dictionary.
+    if isinstance(deduction_entry, dict):
+        if ripper in deduction_entry:
+            deduction_entry = deduction_entry[ripper]
+        else:
+            deduction_entry = deduction_entry['Default']
+
+    return (deduction_entry[0], deduction_entry[1])
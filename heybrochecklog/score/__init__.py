@@ -1,23 +1,100 @@
 """This module handles the log scoring functionality of the heybrochecklog package."""
 
+import functools
 import html
+import io
+import os
+import re
+from pathlib import Path
 
 from heybrochecklog import UnrecognizedException
 from heybrochecklog.analyze import analyze_log
 from heybrochecklog.logfile import LogFile
+from heybrochecklog.markup import ANSI, Markup
+from heybrochecklog.parsed import ParsedLog, score_parsed  # noqa: F401
 from heybrochecklog.score import eac, eac95, xld
-from heybrochecklog.shared import get_log_contents, open_json
+from heybrochecklog.score.integrity import LogVerifier, verify_lines
+from heybrochecklog.score.modules import drives
+from heybrochecklog.shared import (
+    get_log_contents_from_bytes,
+    get_path,
+    load_json,
+    read_log_bytes,
+    run_parallel,
+)
 
+CHECKERS = {
+    'EAC': eac.EACChecker,
+    'EAC95': eac95.EAC95Checker,
+    'XLD': xld.XLDChecker,
+}
 
-def score_log(log_file, markup=False, integrity=False):
+
+def score_log(log_file, markup=False, integrity=False, cache=None, executor=None):
+    """Score a log file. With a ResultCache, logs whose bytes were scored
+    before with the same flags are answered from the cache. With an executor
+    (a concurrent.futures pool), the parts of a combined log are checked on it.
+    """
     try:
-        contents = get_log_contents(log_file)
-        log = LogFile(contents)
-        log = score_wrapper(log, markup, integrity)
+        raw = read_log_bytes(log_file)
+    except UnrecognizedException as exception:  # Too large to be read.
+        return score_parsed(unrecognized_log(str(exception)))
+
+    return score_log_from_bytes(raw, markup, integrity, cache, executor)
+
+
+def score_log_from_bytes(raw, markup=False, integrity=False, cache=None, executor=None):
+    """Score a log given its raw bytes (or a memoryview of them), with the same
+    encoding detection as score_log but without touching the filesystem.
+    """
+    raw = bytes(raw)
+    if cache is not None:
+        return score_cached(raw, cache, markup, integrity, executor)
+
+    return score_parsed(parse_log_from_bytes(raw, markup, integrity, executor))
+
+
+def parse_log(log_file, markup=False, integrity=False, executor=None):
+    """Check a log file and return its ParsedLog, which can be stored and scored
+    (again) with score_parsed without re-reading the log.
+    """
+    try:
+        raw = read_log_bytes(log_file)
+    except UnrecognizedException as exception:  # Too large to be read.
+        return unrecognized_log(str(exception))
+
+    return parse_log_from_bytes(raw, markup, integrity, executor)
+
+
+def parse_log_from_bytes(raw, markup=False, integrity=False, executor=None):
+    """Check a log given its raw bytes and return its ParsedLog."""
+    verifier = LogVerifier() if integrity else None
+    try:
+        log = LogFile(get_log_contents_from_bytes(bytes(raw), verifier))
+        if verifier is not None:
+            log.integrity = verifier.finalize()
+        log = score_wrapper(log, markup, integrity, executor)
     except UnicodeDecodeError:
-        log = LogFile('')
-        log.unrecognized = 'Could not decode log file.'
-    return log.to_dict()
+        return unrecognized_log('Could not decode log file.')
+    except UnrecognizedException as exception:  # Too large to be read.
+        return unrecognized_log(str(exception))
+    return log.to_parsed()
+
+
+def unrecognized_log(reason):
+    """Return the ParsedLog of a log which couldn't be read."""
+    log = LogFile('')
+    log.unrecognized = reason
+    return log.to_parsed()
+
+
+def score_cached(raw, cache, markup=False, integrity=False, executor=None):
+    """Score the raw bytes of a log through a ResultCache."""
+    result = cache.get(raw, markup, integrity)
+    if result is None:
+        result = score_log_from_bytes(raw, markup, integrity, executor=executor)
+        cache.put(raw, result, markup, integrity)
+    return result
 
 
 def score_log_from_contents(contents):
@@ -30,34 +107,118 @@ def score_log_from_contents(contents):
     return log.to_dict()
 
 
-def score_wrapper(log, markup=False, integrity=False):
+def score_logs(logs, jobs=None, markup=False, integrity=False, cache=None):
+    """Score many logs over a pool of worker processes, which have every checker
+    built before they take their first log. With a single job, the logs are
+    scored in this process, which only builds the checkers its logs need.
+
+    `logs` is an iterable of log file paths or raw log bytes. (index, result)
+    tuples are yielded as soon as each log is scored, in completion order, where
+    index is the position of the log in `logs`.
+    """
+    score = functools.partial(
+        score_any, markup=markup, integrity=integrity, cache=cache
+    )
+    yield from run_parallel(
+        score,
+        logs,
+        jobs,
+        initializer=warm_checkers,
+        initargs=(markup,),
+    )
+
+
+def score_any(log, markup=False, integrity=False, cache=None):
+    """Score a log given either its path or its raw bytes."""
+    if isinstance(log, (bytes, bytearray, memoryview)):
+        return score_log_from_bytes(log, markup, integrity, cache)
+    return score_log(Path(log), markup, integrity, cache)
+
+
+def score_wrapper(log, markup=False, integrity=False, executor=None):
     """Determine the type of log file and passes the log to the appropriate logchecker."""
 
     try:
         analyze_log(log)
     except UnrecognizedException as exception:
-        log.unrecognized = str(exception)
-        log.full_contents = [html.escape(line) for line in log.full_contents]
-        return log
+        return unrecognized(log, str(exception), markup)
 
-    if log.ripper == 'EAC':
-        info_json = open_json('eac', '{}.json'.format(log.language))
-        logchecker = eac.EACChecker(
-            info_json['patterns'], info_json['translation'], markup
-        )
-    elif log.ripper == 'XLD':
-        patterns = open_json('xld.json')
-        logchecker = xld.XLDChecker(patterns, markup=markup)
-    elif log.ripper == 'EAC95':
-        info_json = open_json('eac95', '{}.json'.format(log.language))
-        logchecker = eac95.EAC95Checker(
-            info_json['patterns'], info_json['translation'], markup
-        )
+    if integrity and log.integrity is None:
+        log.integrity = verify_lines(log.full_contents)
+
+    logchecker = get_checker(log.ripper, log.language)
 
     try:
-        log = logchecker.check(log, integrity)
+        log = logchecker.check(log, integrity, executor)
     except UnrecognizedException as exception:
-        log.unrecognized = str(exception)
-        log.full_contents = [html.escape(line) for line in log.full_contents]
+        return unrecognized(log, str(exception), markup)
+
+    if markup:
+        logchecker.mark_up(log, markup == ANSI)
+    return log
 
+
+def unrecognized(log, reason, markup=False):
+    """Mark a log as unrecognized. Its contents are escaped as HTML, unless
+    they are rendered as ANSI-colored text.
+    """
+    log.unrecognized = reason
+    if markup != ANSI:
+        log.full_contents = [html.escape(line) for line in log.full_contents]
     return log
+
+
+def render_markup(parsed):
+    """Render the Markup of a log from its ParsedLog, parsed without markup, so
+    the markup is only built when the log is displayed. Each part of the log is
+    styled from the Blocks stored in the parse, without checking it again.
+    """
+    lines = io.StringIO(parsed.contents, newline='\n').readlines()
+    if parsed.unrecognized:
+        return Markup([html.unescape(line) for line in lines], [])
+
+    checker = get_checker(parsed.ripper, parsed.language)
+    return checker.renderer.render_log(lines, parsed.blocks)
+
+
+@functools.lru_cache(maxsize=None)
+def get_checker(ripper, language='english'):
+    """Return the shared log checker for a ripper/language pair, building and
+    compiling it the first time it is requested.
+    """
+    if ripper == 'XLD':
+        checker = CHECKERS[ripper](load_json('xld.json'))
+    else:
+        info_json = load_json(ripper.lower(), '{}.json'.format(language))
+        checker = CHECKERS[ripper](
+            info_json['patterns'], info_json['translation'], language
+        )
+    checker.key = (ripper, language)
+    return checker
+
+
+def warm_checkers(markup=False):
+    """Build the checkers for every bundled ripper/language pair (and the drive
+    index, and with markup their renderers) up front.
+    """
+    drives.load_drive_index()
+    warm_checker('XLD', markup=markup)
+    for ripper in ['EAC', 'EAC95']:
+        resource_dir = os.path.join(get_path(), 'resources', ripper.lower())
+        for filename in sorted(os.listdir(resource_dir)):
+            language, ext = os.path.splitext(filename)
+            if ext != '.json':
+                continue
+            try:
+                warm_checker(ripper, language, markup)
+            except (re.error, TypeError):
+                # A few bundled translations have garbled patterns; logs in
+                # those languages fail when they are checked, not here.
+                continue
+
+
+def warm_checker(ripper, language='english', markup=False):
+    """Build a checker, and its renderer if logs are marked up."""
+    checker = get_checker(ripper, language)
+    if markup:
+        checker.renderer
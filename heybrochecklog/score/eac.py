@@ -3,61 +3,111 @@
 import re
 
 from heybrochecklog import UnrecognizedException
-from heybrochecklog.markup import markup
-from heybrochecklog.score.logchecker import LogChecker
+from heybrochecklog.score.logchecker import LogChecker, compile_items
+from heybrochecklog.score.modules.classify import found
 from heybrochecklog.score.modules import combined, parsers, validation
 from heybrochecklog.shared import format_pattern as fmt_ptn
-from heybrochecklog.score.integrity import check_integrity
+from heybrochecklog.score.integrity import LOG_NOT_OK
 
 
 class EACChecker(LogChecker):
     """This class analyzes >0.95 EAC Log Files."""
 
-    def check(self, main_log, integrity=False):
-        """Checks the EAC logs."""
+    ripper = 'EAC'
+
+    def compile_patterns(self):
+        """Compile the EAC specific regexes on top of the shared ones."""
+        regexes = super().compile_patterns()
+        tsettings = self.patterns['track settings']
+        regexes.update(
+            {
+                'version': re.compile(r'Exact Audio Copy (V.*) from (.*)'),
+                'drive': re.compile(
+                    fmt_ptn(self.patterns['drive'])
+                    + r' ?: (.*) Adapter:[ 0-9]+ID:[ 0-9]+$'
+                ),
+                'range': re.compile(fmt_ptn(self.patterns['range'])),
+                'htoa': re.compile(fmt_ptn(self.patterns['htoa'])),
+                'bad settings': compile_items(self.patterns['bad settings']),
+                'track settings': {
+                    'filename': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['filename']) + r' (.*)'
+                    ),
+                    'pregap': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['pregap']) + r' ([0-9:\.]+)'
+                    ),
+                    'peak': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['peak']) + r' ([0-9\.]+) %'
+                    ),
+                    'test crc': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['test crc']) + r' ([A-Z0-9]{8})'
+                    ),
+                    'copy crc': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['copy crc']) + r' ([A-Z0-9]{8})'
+                    ),
+                },
+                'track errors': compile_items(
+                    self.patterns['track errors'], prepend=' '
+                ),
+                'range accuraterip': compile_items(
+                    self.patterns['range accuraterip']
+                ),
+            }
+        )
+        return regexes
+
+    def check(self, main_log, integrity=False, executor=None):
+        """Checks the EAC logs. The parts of a combined log are checked on the
+        executor, if one is given.
+        """
         logs = combined.split_combined(main_log)
-        for log in logs:
-            if len(log.concat_contents) < 20:
-                raise UnrecognizedException('Cannot parse log file; log file too short')
-
-            log.version = self.check_version(log)
-            log.album = log.concat_contents[2]
-            log.drive = self.check_drive(log)
-
-            self.index_log(log)
-            self.evaluate_settings(log)
-            parsers.index_toc(log)
-            self.is_there_a_htoa(log)
-            self.check_tracks(log)
-
-            parsers.parse_checksum(
-                log, self.patterns['checksum'], 'V1.0 beta 1', 'EAC <1.0'
-            )
-            if self.markup:
-                markup(log, self.patterns, self.translation)
+        logs = self.check_segments(logs, executor)
+        # Combining the parts changes the first one, so index them for markup.
+        blocks = tuple(self.index_blocks(log) for log in logs)
 
         main_log = combined.defragment(logs)
+        main_log.blocks = blocks
         validation.validate_track_count(main_log)
         validation.validate_track_settings(main_log)
         self.deduct_and_score(main_log, integrity)
 
         return main_log
 
+    def check_segment(self, log):
+        """Check one log of a (possibly) combined log."""
+        if len(log.concat_contents) < 20:
+            raise UnrecognizedException('Cannot parse log file; log file too short')
+
+        log.version = self.check_version(log)
+        log.album = log.concat_contents[2]
+        log.drive = self.check_drive(log)
+
+        self.index_log(log)
+        self.evaluate_settings(log)
+        parsers.index_toc(log)
+        self.is_there_a_htoa(log)
+        self.check_tracks(log)
+
+        parsers.parse_checksum(log, 'V1.0 beta 1', 'EAC <1.0')
+
+        return log
+
     def check_version(self, log):
         """Check the version of the log and verify it is acceptable."""
-        regex = re.compile(r'Exact Audio Copy (V.*) from (.*)')
-        return self.verify_version(regex, log.concat_contents[0], 'EAC')
+        return self.verify_version(
+            self.regexes['version'], log.concat_contents[0], 'EAC'
+        )
 
     def check_drive(self, log):
         """Check the drive of the log and verify it is an allowed drive."""
-        regex = r' ?: (.*) Adapter:[ 0-9]+ID:[ 0-9]+$'
-        return self.get_drive(regex, log.concat_contents[3])
+        return self.get_drive(log.concat_contents[3])
 
-    def all_range_index(self, log, line):
-        """Match the Range Rip line in the log file."""
-        if log.index_tracks is None and re.match(fmt_ptn(self.patterns['range']), line):
-            return True
-        return False
+    def extra_setting_families(self):
+        """Classify the bad settings alongside the settings."""
+        return [
+            ('bad setting', sett, regex, 'match', found)
+            for sett, regex in self.regexes['bad settings']
+        ]
 
     def all_range_index_action(self, log, line_num):
         """Action to take when the range rip line is matched."""
@@ -66,10 +116,8 @@ class EACChecker(LogChecker):
 
     def check_bad_settings(self, log, line):
         """Evaluate the instant -100 point deductions."""
-        bad_settings = self.patterns['bad settings']
-        for sett, pattern in bad_settings.items():
-            if re.match(fmt_ptn(pattern), line):
-                log.add_deduction(sett)
+        for sett in line.get('bad setting'):
+            log.add_deduction(sett)
 
     def evaluate_unmatched_settings(self, log, settings):
         """Override super to account for burst mode not having some settings."""
@@ -100,7 +148,7 @@ class EACChecker(LogChecker):
 
         for line in log.contents[log.index_tracks + 1:]:
             if line.strip():
-                result = re.search(fmt_ptn(self.patterns['htoa']), line)
+                result = self.regexes['htoa'].search(line)
                 if result:
                     log.htoa = True
                     log.htoa_index = log.toc[1][0] - 1
@@ -123,29 +171,13 @@ class EACChecker(LogChecker):
         """Wrapper for the analyze_tracks method. Get track data for every track
         and check for errors.
         """
-        tsettings = self.patterns['track settings']
-        track_settings = {
-            'filename': re.compile(r'\s+' + fmt_ptn(tsettings['filename']) + r' (.*)'),
-            'pregap': re.compile(
-                r'\s+' + fmt_ptn(tsettings['pregap']) + r' ([0-9:\.]+)'
-            ),
-            'peak': re.compile(r'\s+' + fmt_ptn(tsettings['peak']) + r' ([0-9\.]+) %'),
-            'test crc': re.compile(
-                r'\s+' + fmt_ptn(tsettings['test crc']) + r' ([A-Z0-9]{8})'
-            ),
-            'copy crc': re.compile(
-                r'\s+' + fmt_ptn(tsettings['copy crc']) + r' ([A-Z0-9]{8})'
-            ),
-        }
-
-        self.analyze_tracks(log, track_settings, parsers.parse_errors_eac)
+        self.analyze_tracks(log, parsers.parse_errors_eac)
 
     def evaluate_tracks(self, log):
         """Evaluate the analyzed track data for deficiencies."""
         # AccurateRip for EAC Range Rip - AR results are at the bottom of the log.
         if log.range:
-            patterns = self.patterns['range accuraterip'].items()
-            parsers.parse_range_accuraterip(log, patterns)
+            parsers.parse_range_accuraterip(log)
 
         # HTOA doesn't need these deductions, since it's supposed to be range ripping.
         if not log.htoa:
@@ -154,12 +186,6 @@ class EACChecker(LogChecker):
             # Check AccurateRip - Mismatching AR results can indicate problems even with T&C
             validation.analyze_accuraterip(log)
 
-    def is_log_integrity_valid(self, log):
-        data = str.join("", log.contents)
-        integrity_result = check_integrity(data)
-
-        return integrity_result != "LOG_NOT_OK"
-
     def deduct_and_score(self, log, integrity=False):
         """Process the accumulated deductions and score the log file."""
         # Deduct for all the per-track accumulated deductions.
@@ -168,7 +194,7 @@ class EACChecker(LogChecker):
                 log.add_deduction(error, len(log.track_errors[error]))
 
         """When integrity fails, deduct the log file automatically by 100."""
-        if integrity and not self.is_log_integrity_valid(log):
+        if integrity and log.integrity == LOG_NOT_OK:
             log.add_deduction('Log Checksum Not Match', 1)
 
         super().deduct_and_score(log)
@@ -3,8 +3,8 @@
 import re
 
 from heybrochecklog import UnrecognizedException
-from heybrochecklog.markup import markup
-from heybrochecklog.score.logchecker import LogChecker
+from heybrochecklog.score.logchecker import LogChecker, compile_items
+from heybrochecklog.score.modules.classify import first_group, found
 from heybrochecklog.score.modules import combined, drives, parsers, validation
 from heybrochecklog.shared import format_pattern as fmt_ptn
 
@@ -12,39 +12,110 @@ from heybrochecklog.shared import format_pattern as fmt_ptn
 class EAC95Checker(LogChecker):
     """This class analyzes <=0.95 EAC Log Files."""
 
-    def check(self, main_log, integrity=False):
-        """Checks the EAC logs."""
-        logs = combined.split_combined(main_log)
-        for log in logs:
-            if len(log.concat_contents) < 12:
-                raise UnrecognizedException('Cannot parse log file; log file too short')
+    ripper = 'EAC95'
 
-            log.version = 'EAC <=0.95'
-            log.album = log.concat_contents[1]
-            log.drive = self.check_drive(log)
+    def compile_patterns(self):
+        """Compile the EAC <=0.95 specific regexes on top of the shared ones."""
+        regexes = super().compile_patterns()
+        tsettings = self.patterns['track settings']
+        regexes.update(
+            {
+                'read mode': re.compile(
+                    re.sub(' +', ' ', fmt_ptn(self.translation['1234']))
+                ),
+                'drive': re.compile(
+                    fmt_ptn(self.patterns['drive'])
+                    + r' ?: (.*) Adapter:[ 0-9]+ID:[ 0-9]+$'
+                ),
+                'range': re.compile(fmt_ptn(self.patterns['range'])),
+                'bad settings': compile_items(self.patterns['bad settings']),
+                # <=0.95 settings are matched without their values.
+                'settings': {
+                    key: re.compile(fmt_ptn(regex))
+                    for key, regex in self.patterns['settings'].items()
+                },
+                'full line settings': {
+                    key: re.compile(fmt_ptn(regex) + ' : (.*)')
+                    for key, regex in self.patterns['full line settings'].items()
+                },
+                'track settings': {
+                    'filename': re.compile(
+                        r' ' + fmt_ptn(tsettings['filename']) + r' (.*)'
+                    ),
+                    'pregap': re.compile(
+                        r' ' + fmt_ptn(tsettings['pregap']) + r' ([0-9:\.]+)'
+                    ),
+                    'peak': re.compile(
+                        r' ' + fmt_ptn(tsettings['peak']) + r' ([0-9\.])+ %'
+                    ),
+                    'test crc': re.compile(
+                        r' ' + fmt_ptn(tsettings['test crc']) + r' ([A-Z0-9]{8})'
+                    ),
+                    'copy crc': re.compile(
+                        r' ' + fmt_ptn(tsettings['copy crc']) + r' ([A-Z0-9]{8})'
+                    ),
+                },
+                'track errors': compile_items(
+                    self.patterns['track errors'], prepend=' '
+                ),
+            }
+        )
+        return regexes
 
-            self.index_log(log, ninety_five=True)
-            self.evaluate_settings(log)
-            self.check_tracks(log)
-            if self.markup:
-                markup(log, self.patterns, self.translation)
+    def check(self, main_log, integrity=False, executor=None):
+        """Checks the EAC logs. The parts of a combined log are checked on the
+        executor, if one is given.
+        """
+        logs = combined.split_combined(main_log)
+        logs = self.check_segments(logs, executor)
+        # Combining the parts changes the first one, so index them for markup.
+        blocks = tuple(self.index_blocks(log) for log in logs)
 
         main_log = combined.defragment(logs, eac95=True)
+        main_log.blocks = blocks
         validation.validate_track_settings(main_log)
         self.deduct_and_score(main_log)
 
         return main_log
 
+    def check_segment(self, log):
+        """Check one log of a (possibly) combined log."""
+        if len(log.concat_contents) < 12:
+            raise UnrecognizedException('Cannot parse log file; log file too short')
+
+        log.version = 'EAC <=0.95'
+        log.album = log.concat_contents[1]
+        log.drive = self.check_drive(log)
+
+        self.index_log(log)
+        self.evaluate_settings(log)
+        self.check_tracks(log)
+
+        return log
+
     def check_drive(self, log):
         """Check the drive of the log and verify it is an allowed drive."""
-        regex = r' ?: (.*) Adapter:[ 0-9]+ID:[ 0-9]+$'
-        return self.get_drive(regex, log.concat_contents[2])
-
-    def all_range_index(self, log, line):
-        """Match the Range Rip line in the log file."""
-        if log.index_tracks is None and re.match(fmt_ptn(self.patterns['range']), line):
-            return True
-        return False
+        return self.get_drive(log.concat_contents[2])
+
+    def line_families(self):
+        """Classify the <=0.95 settings, which are matched without their values."""
+        families = super().line_families()
+        settings = (
+            [
+                ('setting', key, regex, 'search', found)
+                for key, regex in self.regexes['settings'].items()
+            ]
+            + [
+                ('full line setting', key, regex, 'search', first_group)
+                for key, regex in self.regexes['full line settings'].items()
+            ]
+            + [
+                ('bad setting', sett, regex, 'search', found)
+                for sett, regex in self.regexes['bad settings']
+            ]
+        )
+        families['header'] = families['settings'] = settings
+        return families
 
     def all_range_index_action(self, log, line_num):
         """Action to take when the range rip line is matched."""
@@ -55,30 +126,24 @@ class EAC95Checker(LogChecker):
         """Evaluate the log for usage of proper rip settings.
         Overwriting the base class for different 0.95 behavior.
         """
-        psettings = self.patterns['settings']
-        full_psettings = self.patterns['full line settings']
-        proper_settings = self.patterns['proper settings']
-
-        # Compile regex beforehand
-        settings, full_settings = {}, {}
-        for key, regex in psettings.items():
-            settings[key] = re.compile(fmt_ptn(regex))
-        for key, regex in full_psettings.items():
-            full_settings[key] = re.compile(fmt_ptn(regex) + ' : (.*)')
+        proper_settings = self.regexes['proper settings']
+        settings = dict(self.regexes['settings'])
+        full_settings = dict(self.regexes['full line settings'])
 
         # Iterate through line in the settings, and verify each setting in `settings` dict
-        for line in log.contents[log.index_settings : log.index_tracks]:
-            for key, setting in list(settings.items()):
-                result = setting.search(line)
-                if result:
+        start = log.index_settings or 0
+        for i, line in enumerate(log.lines[start : log.index_tracks], start):
+            found_settings = line.get('setting')
+            for key in list(settings):
+                if key in found_settings:
                     if key == 'Drive offset':
-                        offset = re.search(r'.+: ([-0-9]+)', line)
+                        offset = re.search(r'.+: ([-0-9]+)', log.contents[i])
                         drives.eval_offset(log, offset.group(1))
                     del settings[key]
-            for key, setting in list(full_settings.items()):
-                result = setting.search(line)
-                if result:
-                    if not re.search(fmt_ptn(proper_settings[key]), result.group(1)):
+            found_settings = line.get('full line setting')
+            for key in list(full_settings):
+                if key in found_settings:
+                    if not proper_settings[key].search(found_settings[key]):
                         log.add_deduction(key)
                     del full_settings[key]
                     break
@@ -104,10 +169,8 @@ class EAC95Checker(LogChecker):
     def check_bad_settings(self, log, line):
         """Evaluate the instant -100 point deductions
         (destructive normalization and compression offset)."""
-        bad_settings = self.patterns['bad settings']
-        for sett, pattern in bad_settings.items():
-            if re.search(fmt_ptn(pattern), line):
-                log.add_deduction(sett)
+        for sett in line.get('bad setting'):
+            log.add_deduction(sett)
 
     def evaluate_unmatched_settings(self, log, settings):
         """Evaluate all unmatched settings and deduct for them.
@@ -119,22 +182,7 @@ class EAC95Checker(LogChecker):
 
     def check_tracks(self, log):
         """Get track data for each track and check for errors."""
-        tsettings = self.patterns['track settings']
-        track_settings = {
-            'filename': re.compile(r' ' + fmt_ptn(tsettings['filename']) + r' (.*)'),
-            'pregap': re.compile(r' ' + fmt_ptn(tsettings['pregap']) + r' ([0-9:\.]+)'),
-            'peak': re.compile(r' ' + fmt_ptn(tsettings['peak']) + r' ([0-9\.])+ %'),
-            'test crc': re.compile(
-                r' ' + fmt_ptn(tsettings['test crc']) + r' ([A-Z0-9]{8})'
-            ),
-            'copy crc': re.compile(
-                r' ' + fmt_ptn(tsettings['copy crc']) + r' ([A-Z0-9]{8})'
-            ),
-        }
-
-        self.analyze_tracks(
-            log, track_settings, parsers.parse_errors_eac, accuraterip=False
-        )
+        self.analyze_tracks(log, parsers.parse_errors_eac)
 
     def evaluate_tracks(self, log):
         """Evaluate the analyzed track data for deficiencies."""
@@ -1,8 +1,27 @@
 # Log Integrity Checker
-# Glorified modification to make use of latest pprp and python 3.9 :)
+# Glorified modification to make use of python 3.9 :)
 # Source from https://github.com/puddly/eac_logsigner/blob/master/eac.py
 
-import pprp
+from heybrochecklog.score.rijndael import BLOCK, BLOCK_SIZE, Rijndael256
+from heybrochecklog.score.xld_integrity import XLDVerifier
+
+LOG_OK = 'LOG_OK'
+LOG_NOT_OK = 'LOG_NOT_OK'
+LOG_CHECKSUM_NOT_PRESENT = 'LOG_CHECKSUM_NOT_PRESENT'
+
+CHECKSUM_MARKER = '\r\n\r\n==== Log checksum'
+# Newlines and BOMs are left out of the signed text.
+UNSIGNED_CHARACTERS = str.maketrans('', '', '\r\n\ufeff\ufffe')
+# Text kept after the checksum marker; the signature is its first word.
+MAX_CHECKSUM_LINE = 1024
+# Characters of the first line needed to tell the ripper of a log apart.
+MAX_FIRST_LINE = 4096
+
+# Rijndael-256 with a 256-bit blocksize, keyed once.
+# Probably SHA256('super secret password') but it doesn't actually matter
+CIPHER = Rijndael256(
+    bytes.fromhex('9378716cf13e4265ae55338e940b376184da389e50647726b35f6f341ee3efd9')
+)
 
 
 def eac_checksum(text):
@@ -12,52 +31,22 @@ def eac_checksum(text):
     # Fuzzing reveals BOMs are also ignored
     text = text.replace('\ufeff', '').replace('\ufffe', '')
 
-    # Setup Rijndael-256 with a 256-bit blocksize
-    cipher = pprp.crypto.rijndael(
-        # Probably SHA256('super secret password') but it doesn't actually matter
-        key=bytes.fromhex('9378716cf13e4265ae55338e940b376184da389e50647726b35f6f341ee3efd9'),
-        block_size=256 // 8
-    )
-
-    # Encode the text as UTF-16-LE
+    # Encode the text as UTF-16-LE, zero-padding the last block
     plaintext = text.encode('utf-16-le')
+    plaintext += b'\x00' * (-len(plaintext) % BLOCK_SIZE)
 
-    # The IV is all zeroes so we don't have to handle it
-    signature = b'\x00' * 32
-
-    # Process it block-by-block
-    for i in range(0, len(plaintext), 32):
-        # Zero-pad the last block, if necessary
-        plaintext_block = plaintext[i:i + 32].ljust(32, b'\x00')
-
-        # CBC mode (XOR the previous ciphertext block into the plaintext)
-        cbc_plaintext = bytes((ord_or_int(a)) ^ (ord_or_int(b)) for a, b in zip(signature, plaintext_block))
-
-        # New signature is the ciphertext.
-        signature = cipher.encrypt(cbc_plaintext)
-
-    raw_signature = bytes(signature, "utf-16-le").hex().upper()
-    signature = ""
-
-    for i in range(0, len(raw_signature), 4):
-        signature += raw_signature[i:i + 2]
+    # CBC mode with an all zero IV; the signature is the last ciphertext block
+    signature = CIPHER.encrypt_cbc(plaintext)
 
     # Textual signature is just the hex representation
-    return signature
-
-
-def ord_or_int(data):
-    if type(data) is int:
-        return data
-
-    return ord(data)
+    return BLOCK.pack(*signature).hex().upper()
 
 
 def extract_info(text):
-    if '\r\n\r\n==== Log checksum' not in text:
+    if CHECKSUM_MARKER not in text:
         signature = None
     else:
-        text, signature_parts = text.split('\r\n\r\n==== Log checksum', 1)
+        text, signature_parts = text.split(CHECKSUM_MARKER, 1)
         signature = signature_parts.split()[0].strip()
 
     return text, signature
@@ -77,13 +66,137 @@ def eac_verify(text):
 
 
 def check_integrity(text):
-    text = text.replace('\n', '\r\n')  # dunno
-    old_signature, actual_signature = eac_verify(text)
+    verifier = EACVerifier()
+    verifier.update(text)
+    return integrity_status(*verifier.finalize())
+
 
+def integrity_status(old_signature, actual_signature):
+    """Compare the signature found in a log against the one computed from it."""
     if old_signature is None:
-        return "LOG_CHECKSUM_NOT_PRESENT"
+        return LOG_CHECKSUM_NOT_PRESENT
 
     if old_signature == actual_signature:
-        return "LOG_OK"
-
-    return "LOG_NOT_OK"
+        return LOG_OK
+
+    return LOG_NOT_OK
+
+
+class EACVerifier:
+    """Verify the signature of an EAC log incrementally, fed the text of the log
+    (with \\n newlines) as it is read. The text is encrypted as it comes in, so
+    only the CBC state, a partial block and the checksum line are kept.
+    """
+
+    def __init__(self):
+        self.cbc = (0,) * 8
+        self.pending = b''
+        self.held = ''
+        self.checksum_line = None
+        self.stopped = False
+
+    def update(self, text):
+        if self.stopped:
+            return
+
+        text = text.replace('\n', '\r\n')  # dunno
+
+        # Null bytes screw it up
+        if '\x00' in text:
+            text = text[: text.index('\x00')]
+            self.stopped = True
+
+        if self.checksum_line is not None:
+            if len(self.checksum_line) < MAX_CHECKSUM_LINE:
+                self.checksum_line += text
+            return
+
+        text = self.held + text
+        index = text.find(CHECKSUM_MARKER)
+        if index != -1:
+            self.held = ''
+            self.encrypt(text[:index])
+            self.checksum_line = text[index + len(CHECKSUM_MARKER) :]
+            return
+
+        # Hold back enough text to find a marker split between two updates.
+        split = max(0, len(text) - len(CHECKSUM_MARKER) + 1)
+        self.encrypt(text[:split])
+        self.held = text[split:]
+
+    def encrypt(self, text):
+        """Encrypt the whole blocks of signed text, keeping the rest pending."""
+        data = self.pending + text.translate(UNSIGNED_CHARACTERS).encode('utf-16-le')
+        end = len(data) - len(data) % BLOCK_SIZE
+        if end:
+            self.cbc = CIPHER.encrypt_cbc(data[:end], iv=self.cbc)
+        self.pending = data[end:]
+
+    def finalize(self):
+        """Return the (signature in the log, actual signature) of the log."""
+        old_signature = None
+        if self.checksum_line is not None:
+            words = self.checksum_line.split()
+            old_signature = words[0] if words else ''
+        else:
+            self.encrypt(self.held)
+
+        # Zero-pad the last block
+        if self.pending:
+            padding = b'\x00' * (BLOCK_SIZE - len(self.pending))
+            self.cbc = CIPHER.encrypt_cbc(self.pending + padding, iv=self.cbc)
+            self.pending = b''
+
+        return old_signature, BLOCK.pack(*self.cbc).hex().upper()
+
+
+class LogVerifier:
+    """Verify the signature of an EAC or XLD log as it is read, picking the
+    verifier from the first line of the log.
+    """
+
+    def __init__(self):
+        self.verifier = None
+        self.ripper = None
+        self.first_line = ''
+
+    def update(self, text):
+        if self.verifier is not None:
+            self.verifier.update(text)
+            return
+        if self.first_line is None:
+            return
+
+        self.first_line += text
+        if '\n' in self.first_line or len(self.first_line) >= MAX_FIRST_LINE:
+            self.start()
+
+    def start(self):
+        """Pick the verifier of the log and feed it the text read so far."""
+        text, self.first_line = self.first_line, None
+        first_line = text.lstrip('\ufeff')
+        if first_line.startswith('Exact Audio Copy'):
+            self.ripper, self.verifier = 'EAC', EACVerifier()
+        elif first_line.startswith('X Lossless Decoder'):
+            self.ripper, self.verifier = 'XLD', XLDVerifier()
+        else:
+            return
+        self.verifier.update(text)
+
+    def finalize(self):
+        """Return the integrity status of the log, or None if it is neither an
+        EAC nor a XLD log.
+        """
+        if self.first_line is not None:
+            self.start()
+        if self.verifier is None:
+            return None
+        return integrity_status(*self.verifier.finalize())
+
+
+def verify_lines(lines):
+    """Return the integrity status of a log given its lines."""
+    verifier = LogVerifier()
+    for line in lines:
+        verifier.update(line)
+    return verifier.finalize()
@@ -2,21 +2,137 @@
 more specific log checkers.
 """
 
+import functools
 import re
 
 from heybrochecklog import UnrecognizedException
+from heybrochecklog.markup import MarkupRenderer
+from heybrochecklog.parsed import Blocks
 from heybrochecklog.resources import VERSIONS
 from heybrochecklog.score.modules import drives, parsers, validation
+from heybrochecklog.score.modules.classify import (
+    LineClassifier,
+    first_group,
+    found,
+    groups,
+    last_group,
+)
 from heybrochecklog.shared import format_pattern as fmt_ptn, format_pattern_for_setting_evaluation as fmt_ptn_setting
 
 
 class LogChecker:
-    """The base log checker to be subclassed by more specific log checkers."""
+    """The base log checker to be subclassed by more specific log checkers.
 
-    def __init__(self, patterns, translation=None, markup=False):
+    Checkers hold no per-log state, so a single instance (and its compiled
+    regexes) can be shared by every log of the same ripper and language.
+    """
+
+    # The ripper of the logs the checker analyzes, set in subclass.
+    ripper = None
+
+    def __init__(self, patterns, translation=None, language='english'):
         self.patterns = patterns
         self.translation = translation
-        self.markup = markup
+        self.language = language
+        self.regexes = self.compile_patterns()
+        self.classifier = LineClassifier(self.line_markers(), self.line_families())
+        # The get_checker arguments of a shared checker, set by get_checker.
+        self.key = None
+
+    def __reduce__(self):
+        """Pickle a shared checker as its get_checker arguments, so a worker
+        process uses its own (warmed up) copy instead of rebuilding the regexes.
+        """
+        if self.key is None:
+            raise TypeError('Only checkers from get_checker can be pickled')
+        from heybrochecklog.score import get_checker
+
+        return get_checker, self.key
+
+    def check_segments(self, logs, executor=None):
+        """Check each part of a combined log with check_segment, on the executor
+        if one is given. The parts are returned in log order either way.
+        """
+        if executor is None or len(logs) < 2:
+            return [self.check_segment(log) for log in logs]
+
+        futures = [executor.submit(self.check_segment, log) for log in logs]
+        return [future.result() for future in futures]
+
+    @functools.cached_property
+    def renderer(self):
+        """The markup renderer of the checker's ripper and language, built the
+        first time a log is marked up.
+        """
+        return MarkupRenderer(self.ripper, self.patterns, self.translation)
+
+    def render(self, log):
+        """Render the Markup of a checked log from the Blocks of its parts."""
+        return self.renderer.render_log(log.full_contents, log.blocks)
+
+    def mark_up(self, log, ansi=False):
+        """Replace the lines of a checked log with their HTML markup, or with
+        the lines colored with ANSI escapes.
+        """
+        markup = self.render(log)
+        log.full_contents = list(markup.ansi_lines() if ansi else markup.html_lines())
+
+    def index_blocks(self, log):
+        """Return the Blocks of a checked log (or part of a combined log), from
+        which its markup is rendered.
+        """
+        tracks = {}
+        for index in log.track_indices:
+            try:
+                track_num = parsers.get_track_number(log, index)
+            except UnrecognizedException:  # The end of the last track.
+                continue
+            track = log.tracks.get(track_num, {})
+            tracks[index] = [
+                track_num,
+                track.get('copy crc'),
+                track.get('test crc'),
+            ]
+
+        return Blocks(
+            lines=len(log.full_contents),
+            index_settings=log.index_settings,
+            index_toc=log.index_toc,
+            index_tracks=log.index_tracks,
+            index_footer=log.index_footer,
+            all_tracks=log.all_tracks,
+            track_indices=list(log.track_indices),
+            tracks=tracks,
+            deductions=list(log.deductions),
+            cdr=log.cdr,
+            unindexed_drive=log.unindexed_drive,
+        )
+
+    def compile_patterns(self):
+        """Compile the regexes used on every log once, when the checker is built."""
+        colon = r' : (.*)' if self.language == 'english' else r'(?: :)? : (.*)'
+        regexes = {
+            'read mode': re.compile(fmt_ptn(self.patterns['settings']['Read mode'])),
+            'toc': (
+                re.compile(fmt_ptn(self.patterns['toc']))
+                if 'toc' in self.patterns
+                else None
+            ),
+            'track': re.compile(fmt_ptn(self.patterns['track']) + r' ([0-9]+)$'),
+            'settings': {
+                key: re.compile(fmt_ptn_setting(setting) + colon)
+                for key, setting in self.patterns['settings'].items()
+            },
+            'proper settings': {
+                key: re.compile(fmt_ptn(setting))
+                for key, setting in self.patterns['proper settings'].items()
+            },
+        }
+        if 'accuraterip' in self.patterns:
+            regexes['accuraterip'] = compile_items(self.patterns['accuraterip'])
+        if 'checksum' in self.patterns:
+            regexes['checksum'] = re.compile(fmt_ptn(self.patterns['checksum']))
+        return regexes
 
     def verify_version(self, regex, line, ripper):
         """Verify that the version of the log is legitimate."""
@@ -27,37 +143,88 @@ class LogChecker:
                 return version
         raise UnrecognizedException('Unrecognized {} version'.format(ripper))
 
-    def get_drive(self, regex, line):
+    def get_drive(self, line):
         """Get the name of the ripping drive used."""
-        re_drive = re.compile(fmt_ptn(self.patterns['drive']) + regex)
-        result = re_drive.match(line)
+        result = self.regexes['drive'].match(line)
         if result:
             return result.group(1).strip()
         raise UnrecognizedException('Could not parse ripping drive')
 
-    def index_log(self, log, ninety_five=False):
-        """Index key line numbers inside the log."""
-        if ninety_five:
-            read_mode = re.compile(re.sub(' +', ' ', fmt_ptn(self.translation['1234'])))
-        else:
-            read_mode = re.compile(fmt_ptn(self.patterns['settings']['Read mode']))
-        toc = (
-            re.compile(fmt_ptn(self.patterns['toc']))
-            if 'toc' in self.patterns
-            else None
-        )
+    def line_markers(self):
+        """Return the structural lines which divide the log into its sections."""
+        markers = [('read mode', self.regexes['read mode'], True)]
+        if self.regexes['toc'] is not None:
+            markers.append(('toc', self.regexes['toc'], True))
+        markers.append(self.range_marker())
+        markers.append(('track', self.regexes['track'], False))
+        return markers
+
+    def range_marker(self):
+        """Return the All Tracks or Range Rip marker, depending on subclassed ripper."""
+        return ('range', self.regexes['range'], False)
+
+    def line_families(self):
+        """Return the patterns each line is classified with, per section of the log."""
+        settings = [
+            ('setting', key, regex, 'search', first_group)
+            for key, regex in self.regexes['settings'].items()
+        ] + self.extra_setting_families()
+
+        tracks = [
+            ('track setting', key, regex, 'match', first_group)
+            for key, regex in self.regexes['track settings'].items()
+        ]
+        tracks += [
+            ('accuraterip', status, regex, 'search', last_group)
+            for status, regex in self.regexes.get('accuraterip', ())
+        ]
+        tracks += self.track_error_families()
+
+        footer = []
+        if 'checksum' in self.regexes:
+            footer.append(('checksum', None, self.regexes['checksum'], 'match', found))
+        footer += [
+            ('range accuraterip', status, regex, 'search', last_group)
+            for status, regex in self.regexes.get('range accuraterip', ())
+        ]
+
+        return {
+            # Settings are searched from the top of the log if no read mode line
+            # is found, so the header is classified like the settings block.
+            'header': settings,
+            'settings': settings,
+            'toc': [('toc entry', None, parsers.RE_TOC, 'search', groups)],
+            'tracks': tracks,
+            'footer': footer,
+        }
+
+    def extra_setting_families(self):
+        """Return further patterns for the settings block, override in subclass."""
+        return []
+
+    def track_error_families(self):
+        """Return the track error patterns, override in subclass if needed."""
+        return [
+            ('track error', error, regex, 'match', found)
+            for error, regex in self.regexes['track errors']
+        ]
 
-        for i, line in enumerate(log.contents):
-            if log.index_settings is None and read_mode.match(line):
+    def index_log(self, log):
+        """Classify every line of the log and index the key line numbers."""
+        log.lines = self.classifier.classify(log.contents)
+
+        for i, line in enumerate(log.lines):
+            if line.kind == 'read mode':
                 log.index_settings = i
-            elif log.index_toc is None and 'toc' in self.patterns and toc.match(line):
+            elif line.kind == 'toc':
                 log.index_toc = i
-            elif self.all_range_index(log, line):
+            elif line.kind in ['range', 'all tracks']:
                 self.all_range_index_action(log, i)
-            elif re.match(fmt_ptn(self.patterns['track']) + r' [0-9]+$', line):
+            elif line.kind == 'track':
                 log.track_indices.append(i)
 
         self.validate_indices(log)
+        self.classifier.tag_footer(log.lines, log.contents, log.index_footer or 0)
 
     def validate_indices(self, log):
         """Validate the indices of notable lines in the log."""
@@ -76,34 +243,26 @@ class LogChecker:
         if not log.index_toc:
             log.index_toc = log.index_tracks
 
-    def all_range_index(self, log, line):
-        """Match the All Tracks or Range Rip line, depending on subclassed ripper."""
-        pass
-
     def all_range_index_action(self, log, line_num):
         """Action to take when detection of the All Tracks or Range Rip line occurs."""
         pass
 
     def evaluate_settings(self, log):
         """Evaluate the log for usage of proper rip settings."""
-        psettings = self.patterns['settings']
-        proper_settings = self.patterns['proper settings']
-
-        # Compile regex beforehand
-        settings = {}
-        colon = r' : (.*)' if log.language == 'english' else r'(?: :)? : (.*)'
-        for key, setting in psettings.items():
-            settings[key] = re.compile(fmt_ptn_setting(setting) + colon)
+        proper_settings = self.regexes['proper settings']
+        settings = dict(self.regexes['settings'])
 
         # Iterate through line in the settings, and verify each setting in `sets` dict
-        for line in log.contents[log.index_settings : log.index_toc]:
-            for key, setting in list(settings.items()):
-                result = setting.search(line)
-                if result and key == 'Drive offset':
-                    drives.eval_offset(log, result.group(1))
+        for line in log.lines[log.index_settings : log.index_toc]:
+            found_settings = line.get('setting')
+            for key in list(settings):
+                if key not in found_settings:
+                    continue
+                elif key == 'Drive offset':
+                    drives.eval_offset(log, found_settings[key])
                     del settings[key]
-                elif result:
-                    if not re.search(fmt_ptn(proper_settings[key]), result.group(1)):
+                else:
+                    if not proper_settings[key].search(found_settings[key]):
                         log.add_deduction(key)
                     del settings[key]
                     break
@@ -132,23 +291,23 @@ class LogChecker:
                     'One or more required settings could not be found'
                 )
 
-    def analyze_tracks(self, log, track_settings, parse_errors, accuraterip=True):
+    def analyze_tracks(self, log, parse_errors):
         """Get track data for each track and check for errors."""
-        ar_patterns = self.patterns['accuraterip'].items() if accuraterip else {}
-        err_patterns = self.patterns['track errors'].items()
-
         for i, index in enumerate(log.track_indices):
             track_data = {}
-            track_num = parsers.get_track_number(log, index, self.patterns['track'])
+            track_num = parsers.get_track_number(log, index)
 
-            for line in log.contents[log.track_indices[i] : log.track_indices[i + 1]]:
-                # Collect the track data using the track_settings list.
-                parsers.parse_settings(track_data, track_settings, line)
-                # Log the AccurateRip results - add AR status to log.accuraterip list.
-                if accuraterip:
-                    parsers.parse_accuraterip(log, ar_patterns, line)
-                # Ripping Errors - Loop through errors in json track errors.
-                parse_errors(log, err_patterns, track_num, line)
+            for line in log.lines[log.track_indices[i] : log.track_indices[i + 1]]:
+                for family, key, value in line.tags:
+                    # Collect the track data using the track settings.
+                    if family == 'track setting':
+                        track_data[key] = value
+                    # Log the AccurateRip results in the log.accuraterip list.
+                    elif family == 'accuraterip':
+                        log.accuraterip.append([key, value])
+                    # Ripping Errors - record the errors found in the track.
+                    elif family == 'track error':
+                        parse_errors(log, key, value, track_num)
 
             validation.check_crc_mismatch(log, track_num, track_data)
 
@@ -165,11 +324,16 @@ class LogChecker:
         pass
 
     def deduct_and_score(self, log, integrity=False):
-        """Process the accumulated deductions and score the log file."""
+        """Process the accumulated deductions. The log is scored from them by
+        score_parsed, once it is parsed.
+        """
         if log.crc_mismatch:
             log.add_deduction('CRC mismatch', len(log.crc_mismatch))
 
-        # Sum all the deductions and calculate score
-        log.score -= sum(
-            [de[1] for de in log.deductions.values() if isinstance(de[1], int)]
-        )
+
+def compile_items(patterns, prepend='', append=''):
+    """Compile a mapping of pattern lists into a tuple of (key, regex) pairs."""
+    return tuple(
+        (key, re.compile(prepend + fmt_ptn(pattern) + append))
+        for key, pattern in patterns.items()
+    )
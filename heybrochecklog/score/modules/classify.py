@@ -0,0 +1,116 @@
+"""This module contains the line classifier, which walks a log once and types
+every line for the later stages of the log checkers.
+"""
+
+from typing import NamedTuple
+
+# The section of the log each structural line starts.
+SECTIONS = {
+    'read mode': 'settings',
+    'toc': 'toc',
+    'range': 'tracks',
+    'all tracks': 'tracks',
+    'track': 'tracks',
+}
+
+
+class Line(NamedTuple):
+    """A classified line of a log.
+
+    `kind` is the structural kind of the line ('text' for most lines), `value`
+    is the data captured by the structural match (a track header's number) and
+    `tags` holds a (family, key, value) tuple for every pattern of its section
+    which matched the line.
+    """
+
+    section: str
+    kind: str
+    value: object
+    tags: tuple
+
+    def get(self, family):
+        """Return a dict of the line's key/values of a pattern family."""
+        return {key: value for fam, key, value in self.tags if fam == family}
+
+
+class LineClassifier:
+    """Classify the lines of a log in a single pass.
+
+    `markers` is a sequence of (kind, regex, once) tuples for the structural
+    lines that move the state machine into a new section, in order of precedence.
+    `families` maps each section ('header', 'settings', 'toc', 'tracks' and
+    'footer') to the (family, key, regex, method, extract) tuples tested against
+    the lines of that section.
+    """
+
+    def __init__(self, markers, families):
+        self.markers = tuple(markers)
+        self.families = {
+            section: tuple(
+                (family, key, getattr(regex, method), extract)
+                for family, key, regex, method, extract in patterns
+            )
+            for section, patterns in families.items()
+        }
+
+    def classify(self, contents):
+        """Classify each line of the (normalized) contents of a log."""
+        lines = []
+        section = 'header'
+        seen = set()
+        for line in contents:
+            kind, value = 'text', None
+            for marker, regex, once in self.markers:
+                if once and marker in seen:
+                    continue
+                result = regex.match(line)
+                if result:
+                    kind, value = marker, last_group(result)
+                    section = SECTIONS[marker]
+                    seen.add(marker)
+                    break
+
+            lines.append(Line(section, kind, value, self.tag(section, line)))
+
+        return lines
+
+    def tag_footer(self, lines, contents, start):
+        """Add the footer tags to the lines from the start of the footer onward.
+        The footer is only known once every track header has been seen.
+        """
+        for i in range(start, len(lines)):
+            tags = self.tag('footer', contents[i])
+            if tags:
+                lines[i] = lines[i]._replace(tags=lines[i].tags + tags)
+
+    def tag(self, section, line):
+        """Test a line against the pattern families of its section."""
+        if not line:
+            return ()
+
+        tags = []
+        for family, key, test, extract in self.families.get(section, ()):
+            result = test(line)
+            if result:
+                tags.append((family, key, extract(result)))
+        return tuple(tags)
+
+
+def first_group(result):
+    """Extract the first group of a match."""
+    return result.group(1)
+
+
+def last_group(result):
+    """Extract the last matched group of a match, if any."""
+    return result.group(result.lastindex) if result.lastindex else None
+
+
+def groups(result):
+    """Extract all the groups of a match."""
+    return result.groups()
+
+
+def found(result):
+    """Only record that the pattern matched."""
+    return True
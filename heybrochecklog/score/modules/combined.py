@@ -2,7 +2,7 @@
 
 import re
 
-from heybrochecklog.logfile import LogFile
+from heybrochecklog.logfile import LogFile, join_lines
 
 
 def split_combined(log):
@@ -24,9 +24,7 @@ def split_combined(log):
 
     # Split the log files. Create new log object for each log.
     for i, line in enumerate(log_indices):
-        new_log = LogFile(
-            log.full_contents[line : (log_indices[i + 1])], ripper=log.ripper
-        )
+        new_log = LogFile.segment(log, line, log_indices[i + 1])
         logs.append(new_log)
 
         # Return the array of logs if the end index of section is
@@ -42,10 +40,7 @@ def defragment(logs, eac95=False):
     if len(logs) == 1 and not logs[0].htoa:
         return logs[0]
 
-    full_contents = []
-    for log in logs:
-        full_contents += log.full_contents
-    logs[0].full_contents = full_contents
+    logs[0].full_contents = join_lines([log.full_contents for log in logs])
 
     # Make sure HTOA CRC's match if they exist.
     if not eac95:
@@ -114,11 +109,8 @@ def sub_track_errors(logs, log):
 def replace_accumulated_errors(track, logs, log):
     """Replace accumulated track errors."""
     for error in logs[0].track_errors:
-        if track in log.track_errors[error]:
-            continue
-        for i, original_track in enumerate(logs[0].track_errors[error]):
-            if track == original_track:
-                logs[0].track_errors[error].pop(i)
+        if track not in log.track_errors[error]:
+            logs[0].track_errors[error].discard(track)
 
 
 def replace_crc_mismatches(track, logs, log):
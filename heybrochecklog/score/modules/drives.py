@@ -1,12 +1,18 @@
 """This module contains the functions which deal with drives and offsets."""
 
+import functools
 import os
 import re
-import sqlite3
+import string
+from collections import defaultdict
 
 from heybrochecklog import UnrecognizedException
 from heybrochecklog.shared import get_path
 
+RE_SEPARATORS = re.compile(r'[^A-Za-z0-9]+')
+# SQLite's LIKE only folds the case of ASCII letters.
+ASCII_LOWERCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
 
 def eval_offset(log, offset):
     """Validate the offset used by the ripped drive."""
@@ -21,11 +27,11 @@ def eval_offset(log, offset):
         log.flagged = True
         return
 
-    drivestr = prep_drive_name(log)
-    if not drivestr:
+    drive_words = prep_drive_name(log)
+    if drive_words == ('',):
         return
 
-    results = drive_db_query(drivestr)
+    results = drive_db_query(drive_words)
     if not results:
         # Drive not in database
         if offset == '0':
@@ -33,7 +39,7 @@ def eval_offset(log, offset):
         log.unindexed_drive = True
         return
 
-    offsets = {row[0] for row in results}
+    offsets = set(results)
     if offset not in offsets:
         log.add_deduction(
             'Drive offset',
@@ -53,12 +59,9 @@ def check_for_virtual_drives(log):
 
 
 def prep_drive_name(log):
-    """Prepare the drive name for a DB query."""
+    """Split the drive name into the words of a DB query."""
     drive = sub_drive_names(log.drive)
-    drive_words = re.split(r'[^A-Za-z0-9]+', drive)
-    drivestr = '%" AND Name LIKE "%'.join(drive_words)
-
-    return drivestr
+    return tuple(RE_SEPARATORS.split(drive))
 
 
 def sub_drive_names(drive):
@@ -72,15 +75,60 @@ def sub_drive_names(drive):
     return drive
 
 
-def drive_db_query(drivestr):
-    """Query the SQLite3 DB for the drive offset."""
+@functools.lru_cache(maxsize=1024)
+def drive_db_query(drive_words):
+    """Get the offsets of every drive whose name contains all of the words,
+    ignoring ASCII case (as a `Name LIKE "%word%"` query for each word would).
+    """
+    offsets, index = load_drive_index()
+    rows = None
+    for word in drive_words:
+        if word:  # An empty word matches every drive.
+            matches = match_drive_word(word.translate(ASCII_LOWERCASE))
+            rows = matches if rows is None else rows & matches
+    if rows is None:
+        rows = range(len(offsets))
+
+    return tuple(offsets[row] for row in sorted(rows))
+
+
+def match_drive_word(word):
+    """Get the rows of the drives which have a name token containing the word.
+    A word is alphanumeric, so it can only occur inside a single token.
+    """
+    offsets, index = load_drive_index()
+    return index.get(word, frozenset())
+
+
+@functools.lru_cache(maxsize=None)
+def load_drive_index():
+    """Load the drives DB once, returning the offset of each row and an index
+    of the rows by every substring of the lowercased alphanumeric tokens of
+    their names. Tokens are short (a few thousand, of about 6 characters), so
+    the index of their substrings stays small, and a word is found with one
+    lookup.
+    """
+    import sqlite3  # Only needed once, so only loaded with the index.
+
     db_path = os.path.join(get_path(), 'resources', 'drives.db')
     conn = sqlite3.connect(db_path)
-
-    cursor = conn.cursor()
-    cursor.execute('SELECT Offset FROM Drives WHERE Name LIKE "%' + drivestr + '%"')
-    results = cursor.fetchall()
-
-    conn.close()
-
-    return results
+    try:
+        rows = conn.execute('SELECT Name, Offset FROM Drives').fetchall()
+    finally:
+        conn.close()
+
+    offsets = []
+    tokens = defaultdict(set)
+    for row, (name, offset) in enumerate(rows):
+        offsets.append(offset)
+        for token in RE_SEPARATORS.split(name.translate(ASCII_LOWERCASE)):
+            if token:
+                tokens[token].add(row)
+
+    index = defaultdict(set)
+    for token, token_rows in tokens.items():
+        for start in range(len(token)):
+            for end in range(start + 1, len(token) + 1):
+                index[token[start:end]] |= token_rows
+
+    return tuple(offsets), {word: frozenset(rows) for word, rows in index.items()}
@@ -4,76 +4,51 @@ import re
 
 from heybrochecklog import UnrecognizedException
 from heybrochecklog.resources import VERSIONS
-from heybrochecklog.shared import format_pattern as fmt_ptn
+
+RE_TOC = re.compile(r' ([0-9]+) \| [0-9:\.]+ \| [0-9:\.]+ \| ([0-9]+) \| ([0-9]+)')
 
 
 def index_toc(log):
     """Index the ToC data of the log."""
-    re_toc = re.compile(r' ([0-9]+) \| [0-9:\.]+ \| [0-9:\.]+ \| ([0-9]+) \| ([0-9]+)')
-    for line in log.contents[log.index_toc : log.index_tracks]:
-        result = re_toc.search(line)
-        if result:
-            log.toc[int(result.group(1))] = [int(result.group(2)), int(result.group(3))]
+    for line in log.lines[log.index_toc : log.index_tracks]:
+        for entry in line.get('toc entry').values():
+            log.toc[int(entry[0])] = [int(entry[1]), int(entry[2])]
 
 
-def get_track_number(log, index, track_word):
+def get_track_number(log, index):
     """Get the track number from the header line of a track block."""
-    result = re.search(r'{} ([0-9]+)'.format(fmt_ptn(track_word)), log.contents[index])
-    if result:
-        return int(result.group(1))
+    line = log.lines[index]
+    if line.kind == 'track':
+        return int(line.value)
     elif log.range:  # EAC range rip has no track number
         return 0
     else:
         raise UnrecognizedException('A track has an invalid block header')
 
 
-def parse_settings(track_data, track_settings, line):
-    """Loop through and parse the settings used in the rip."""
-    for setting, reg in track_settings.items():
-        result = reg.match(line)
-        if result:
-            track_data[setting] = result.group(1)
-
-
-def parse_accuraterip(log, ar_patterns, line):
-    """Parse line for an AccurateRip result."""
-    for status, re_accurip in ar_patterns:
-        result = re.search(fmt_ptn(re_accurip), line)
-        if result and isinstance(result.lastindex, int) and result.lastindex >= 1:
-            log.accuraterip.append([status, result.group(result.lastindex)])
-        elif result and result.lastindex is None:
-            log.accuraterip.append([status, None])
-
-
-def parse_range_accuraterip(log, ar_rr_patterns):
+def parse_range_accuraterip(log):
     """Parse range rip footer for AccurateRip results."""
-    for line in log.contents[log.index_footer :]:
-        parse_accuraterip(log, ar_rr_patterns, line)
+    for line in log.lines[log.index_footer :]:
+        for family, status, value in line.tags:
+            if family == 'range accuraterip':
+                log.accuraterip.append([status, value])
 
 
-def parse_errors_eac(log, err_patterns, track_num, line):
-    """Parse line of an EAC log for a ripping error."""
-    for error, re_err in err_patterns:
-        if track_num not in log.track_errors[error] and re.match(
-            r' ' + fmt_ptn(re_err), line
-        ):
-            log.track_errors[error].append(track_num)
+def parse_errors_eac(log, error, value, track_num):
+    """Record a ripping error found in a track of an EAC log."""
+    log.track_errors[error].add(track_num)
 
 
-def parse_errors_xld(log, err_patterns, track_num, line):
-    """Parse line of a XLD log for a ripping error."""
-    for error, re_err in err_patterns:
-        if track_num not in log.track_errors[error]:
-            result = re.search(r' ' + fmt_ptn(re_err) + r' : ([0-9]+)', line)
-            if result and result.group(1) != "0":
-                log.track_errors[error].append([track_num, int(result.group(1))])
+def parse_errors_xld(log, error, value, track_num):
+    """Record a ripping error found in a track of a XLD log."""
+    if value != "0":
+        log.track_errors[error].setdefault(track_num, int(value))
 
 
-def parse_checksum(log, regex, imp_version, deduc_line):
+def parse_checksum(log, imp_version, deduc_line):
     """Parse line(s) for presence of a checksum."""
-    re_checksum = re.compile(fmt_ptn(regex))
-    for line in log.contents[log.index_footer :]:
-        if re_checksum.match(line):
+    for line in log.lines[log.index_footer :]:
+        if line.get('checksum'):
             log.checksum = True
             break
     else:  # If checksum not found
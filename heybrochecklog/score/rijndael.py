@@ -0,0 +1,196 @@
+"""A table-driven Rijndael encryption with 256-bit blocks and keys, the variant
+(not part of AES) that EAC signs its logs with.
+
+The state is held as eight 32-bit big-endian column words. Every round but the
+last is four T-table lookups per column, and the key schedule is expanded once
+per key.
+"""
+
+import struct
+
+BLOCK_SIZE = 32
+ROUNDS = 14
+# Rows 1-3 of a 256-bit block are shifted left by 1, 3 and 4 columns.
+SHIFTS = (1, 3, 4)
+
+BLOCK = struct.Struct('>8I')
+
+
+def _xtime(byte):
+    """Multiply a byte by x (0x02) in GF(2^8)."""
+    byte <<= 1
+    return byte ^ 0x11B if byte & 0x100 else byte
+
+
+def _build_sbox():
+    """Build the S-box from the multiplicative inverses in GF(2^8)."""
+    # Walk the field with generator 3 to get log/antilog tables.
+    antilog, log = [0] * 255, [0] * 256
+    value = 1
+    for power in range(255):
+        antilog[power] = value
+        log[value] = power
+        value ^= _xtime(value)
+
+    sbox = [0x63] * 256
+    for byte in range(1, 256):
+        inverse = antilog[(255 - log[byte]) % 255]
+        result = inverse
+        for shift in range(1, 5):
+            result ^= ((inverse << shift) | (inverse >> (8 - shift))) & 0xFF
+        sbox[byte] = result ^ 0x63
+    return sbox
+
+
+def _build_tables(sbox):
+    """Build the four T-tables, which merge SubBytes and MixColumns."""
+    t0 = []
+    for byte in sbox:
+        double = _xtime(byte)
+        t0.append((double << 24) | (byte << 16) | (byte << 8) | (double ^ byte))
+    t1 = [((word >> 8) | (word << 24)) & 0xFFFFFFFF for word in t0]
+    t2 = [((word >> 8) | (word << 24)) & 0xFFFFFFFF for word in t1]
+    t3 = [((word >> 8) | (word << 24)) & 0xFFFFFFFF for word in t2]
+    return t0, t1, t2, t3
+
+
+SBOX = _build_sbox()
+T0, T1, T2, T3 = _build_tables(SBOX)
+# The last round has no MixColumns; these place the S-box byte in each row.
+S0 = [byte << 24 for byte in SBOX]
+S1 = [byte << 16 for byte in SBOX]
+S2 = [byte << 8 for byte in SBOX]
+
+
+def expand_key(key):
+    """Expand a 256-bit key into the round keys, one tuple of 8 words per round."""
+    if len(key) != 32:
+        raise ValueError('Rijndael-256 keys are 32 bytes long')
+
+    words = list(BLOCK.unpack(key))
+    rcon = 1
+    for i in range(8, 8 * (ROUNDS + 1)):
+        temp = words[i - 1]
+        if i % 8 == 0:
+            # RotWord, SubWord and the round constant.
+            temp = (
+                (SBOX[(temp >> 16) & 0xFF] << 24)
+                | (SBOX[(temp >> 8) & 0xFF] << 16)
+                | (SBOX[temp & 0xFF] << 8)
+                | SBOX[temp >> 24]
+            ) ^ (rcon << 24)
+            rcon = _xtime(rcon)
+        elif i % 8 == 4:
+            temp = (
+                (SBOX[temp >> 24] << 24)
+                | (SBOX[(temp >> 16) & 0xFF] << 16)
+                | (SBOX[(temp >> 8) & 0xFF] << 8)
+                | SBOX[temp & 0xFF]
+            )
+        words.append(words[i - 8] ^ temp)
+
+    return tuple(tuple(words[i : i + 8]) for i in range(0, len(words), 8))
+
+
+class Rijndael256:
+    """Rijndael with 256-bit blocks and a 256-bit key, encryption only."""
+
+    def __init__(self, key):
+        self.round_keys = expand_key(key)
+
+    def encrypt(self, block):
+        """Encrypt one 32-byte block."""
+        return BLOCK.pack(*self.encrypt_words(BLOCK.unpack(block)))
+
+    def encrypt_words(self, words):
+        """Encrypt one block given as 8 big-endian words, returning 8 words."""
+        rk = self.round_keys
+        k = rk[0]
+        s0, s1, s2, s3, s4, s5, s6, s7 = (
+            words[0] ^ k[0],
+            words[1] ^ k[1],
+            words[2] ^ k[2],
+            words[3] ^ k[3],
+            words[4] ^ k[4],
+            words[5] ^ k[5],
+            words[6] ^ k[6],
+            words[7] ^ k[7],
+        )
+        t0, t1, t2, t3 = T0, T1, T2, T3
+
+        for r in range(1, ROUNDS):
+            k = rk[r]
+            s0, s1, s2, s3, s4, s5, s6, s7 = (
+                t0[s0 >> 24]
+                ^ t1[(s1 >> 16) & 0xFF]
+                ^ t2[(s3 >> 8) & 0xFF]
+                ^ t3[s4 & 0xFF]
+                ^ k[0],
+                t0[s1 >> 24]
+                ^ t1[(s2 >> 16) & 0xFF]
+                ^ t2[(s4 >> 8) & 0xFF]
+                ^ t3[s5 & 0xFF]
+                ^ k[1],
+                t0[s2 >> 24]
+                ^ t1[(s3 >> 16) & 0xFF]
+                ^ t2[(s5 >> 8) & 0xFF]
+                ^ t3[s6 & 0xFF]
+                ^ k[2],
+                t0[s3 >> 24]
+                ^ t1[(s4 >> 16) & 0xFF]
+                ^ t2[(s6 >> 8) & 0xFF]
+                ^ t3[s7 & 0xFF]
+                ^ k[3],
+                t0[s4 >> 24]
+                ^ t1[(s5 >> 16) & 0xFF]
+                ^ t2[(s7 >> 8) & 0xFF]
+                ^ t3[s0 & 0xFF]
+                ^ k[4],
+                t0[s5 >> 24]
+                ^ t1[(s6 >> 16) & 0xFF]
+                ^ t2[(s0 >> 8) & 0xFF]
+                ^ t3[s1 & 0xFF]
+                ^ k[5],
+                t0[s6 >> 24]
+                ^ t1[(s7 >> 16) & 0xFF]
+                ^ t2[(s1 >> 8) & 0xFF]
+                ^ t3[s2 & 0xFF]
+                ^ k[6],
+                t0[s7 >> 24]
+                ^ t1[(s0 >> 16) & 0xFF]
+                ^ t2[(s2 >> 8) & 0xFF]
+                ^ t3[s3 & 0xFF]
+                ^ k[7],
+            )
+
+        k = rk[ROUNDS]
+        sb = SBOX
+        return (
+            S0[s0 >> 24] | S1[(s1 >> 16) & 0xFF] | S2[(s3 >> 8) & 0xFF] | sb[s4 & 0xFF]
+        ) ^ k[0], (
+            S0[s1 >> 24] | S1[(s2 >> 16) & 0xFF] | S2[(s4 >> 8) & 0xFF] | sb[s5 & 0xFF]
+        ) ^ k[1], (
+            S0[s2 >> 24] | S1[(s3 >> 16) & 0xFF] | S2[(s5 >> 8) & 0xFF] | sb[s6 & 0xFF]
+        ) ^ k[2], (
+            S0[s3 >> 24] | S1[(s4 >> 16) & 0xFF] | S2[(s6 >> 8) & 0xFF] | sb[s7 & 0xFF]
+        ) ^ k[3], (
+            S0[s4 >> 24] | S1[(s5 >> 16) & 0xFF] | S2[(s7 >> 8) & 0xFF] | sb[s0 & 0xFF]
+        ) ^ k[4], (
+            S0[s5 >> 24] | S1[(s6 >> 16) & 0xFF] | S2[(s0 >> 8) & 0xFF] | sb[s1 & 0xFF]
+        ) ^ k[5], (
+            S0[s6 >> 24] | S1[(s7 >> 16) & 0xFF] | S2[(s1 >> 8) & 0xFF] | sb[s2 & 0xFF]
+        ) ^ k[6], (
+            S0[s7 >> 24] | S1[(s0 >> 16) & 0xFF] | S2[(s2 >> 8) & 0xFF] | sb[s3 & 0xFF]
+        ) ^ k[7]
+
+    def encrypt_cbc(self, data, iv=(0,) * 8):
+        """CBC-encrypt data (a multiple of 32 bytes long), returning the words of
+        the last ciphertext block. EAC signatures only need the last block.
+        """
+        c0, c1, c2, c3, c4, c5, c6, c7 = iv
+        encrypt = self.encrypt_words
+        for p0, p1, p2, p3, p4, p5, p6, p7 in BLOCK.iter_unpack(data):
+            c0, c1, c2, c3, c4, c5, c6, c7 = encrypt(
+                (p0 ^ c0, p1 ^ c1, p2 ^ c2, p3 ^ c3, p4 ^ c4, p5 ^ c5, p6 ^ c6, p7 ^ c7)
+            )
+        return c0, c1, c2, c3, c4, c5, c6, c7
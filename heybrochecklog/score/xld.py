@@ -3,21 +3,72 @@
 import re
 
 from heybrochecklog import UnrecognizedException
-from heybrochecklog.markup import markup
-from heybrochecklog.score.logchecker import LogChecker
+from heybrochecklog.score.logchecker import LogChecker, compile_items
+from heybrochecklog.score.modules.classify import first_group, found
 from heybrochecklog.score.modules import parsers, validation
 from heybrochecklog.shared import format_pattern as fmt_ptn
-from heybrochecklog.score.xld_integrity import xld_verify
+from heybrochecklog.score.integrity import LOG_OK
 
 
 class XLDChecker(LogChecker):
     """This class analyzes XLD Log Files."""
 
-    def check(self, log, integrity=False):
-        """Checks the XLD logs."""
+    ripper = 'XLD'
+
+    def compile_patterns(self):
+        """Compile the XLD specific regexes on top of the shared ones."""
+        regexes = super().compile_patterns()
+        tsettings = self.patterns['track settings']
+        regexes.update(
+            {
+                'version': re.compile(
+                    r'X Lossless Decoder version ([0-9abc]+) \(([0-9\.]+)\)'
+                ),
+                'drive': re.compile(
+                    fmt_ptn(self.patterns['drive'])
+                    + r' *: (.*)?(?: +\(revision [A-Z0-9\.]\))?$'
+                ),
+                'disc type': re.compile(
+                    fmt_ptn(self.patterns['disc type']) + r' : (.*)'
+                ),
+                'all tracks': re.compile(fmt_ptn(self.patterns['All Tracks'])),
+                'htoa': re.compile(r'Gap status +: Analyzed, Appended$'),
+                'track settings': {
+                    'filename': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['filename']) + r' : (.*?\/.*?\..*)'
+                    ),
+                    'pregap': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['pregap']) + r' : ([0-9:\.]+)'
+                    ),
+                    'gain': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['gain']) + r' : ([A-Za-z0-9\.-]+)'
+                    ),
+                    'peak': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['peak']) + r' : ([0-9\.]+)'
+                    ),
+                    'test crc': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['test crc']) + r' : ([A-Z0-9]{8})'
+                    ),
+                    'copy crc': re.compile(
+                        r'\s+' + fmt_ptn(tsettings['copy crc']) + r' : ([A-Z0-9]{8})'
+                    ),
+                },
+                'track errors': compile_items(
+                    self.patterns['track errors'], prepend=' ', append=r' : ([0-9]+)'
+                ),
+            }
+        )
+        return regexes
+
+    def check(self, log, integrity=False, executor=None):
+        """Checks the XLD logs. They are never combined, so there is nothing to
+        hand to the executor.
+        """
         if len(log.contents) < 25:
             raise UnrecognizedException('Cannot parse log file; log file too short')
 
+        # XLD errors are counted per track.
+        log.track_errors = {error: {} for error in log.track_errors}
         log.version = self.check_version(log)
         log.album = log.concat_contents[2]
         log.drive = self.check_drive(log)
@@ -30,31 +81,26 @@ class XLDChecker(LogChecker):
         self.is_there_a_htoa(log)
         validation.validate_track_count(log)
         validation.validate_track_settings(log, xld=True)
-        parsers.parse_checksum(
-            log, self.patterns['checksum'], '20121222', 'XLD pre-142.2'
-        )
+        parsers.parse_checksum(log, '20121222', 'XLD pre-142.2')
 
         self.deduct_and_score(log, integrity)
-        if self.markup:
-            markup(log, self.patterns, self.translation)
+        log.blocks = (self.index_blocks(log),)
 
         return log
 
     def check_version(self, log):
         """Check the version of the log and verify it is acceptable."""
-        regex = re.compile(r'X Lossless Decoder version ([0-9abc]+) \(([0-9\.]+)\)')
-        return self.verify_version(regex, log.concat_contents[0], 'XLD')
+        return self.verify_version(
+            self.regexes['version'], log.concat_contents[0], 'XLD'
+        )
 
     def check_drive(self, log):
         """Check the drive of the log and verify it is an allowed drive."""
-        regex = r' *: (.*)?(?: +\(revision [A-Z0-9\.]\))?$'
-        return self.get_drive(regex, log.concat_contents[3])
+        return self.get_drive(log.concat_contents[3])
 
     def check_cdr(self, log):
         """Check the log to see if CD-R is flagged."""
-        result = re.search(
-            fmt_ptn(self.patterns['disc type']) + r' : (.*)', log.concat_contents[4],
-        )
+        result = self.regexes['disc type'].search(log.concat_contents[4])
         if result:
             if result.group(1) == 'Pressed CD':
                 return
@@ -65,13 +111,20 @@ class XLDChecker(LogChecker):
             else:
                 raise UnrecognizedException('Unknown disc type')
 
-    def all_range_index(self, log, line):
-        """Match the Range Rip line in the log file."""
-        if log.all_tracks is None and re.match(
-            fmt_ptn(self.patterns['All Tracks']), line
-        ):
-            return True
-        return False
+    def range_marker(self):
+        """Return the All Tracks line marker."""
+        return ('all tracks', self.regexes['all tracks'], True)
+
+    def extra_setting_families(self):
+        """Classify the appended gap status used to detect HTOA."""
+        return [('gap status', 'HTOA', self.regexes['htoa'], 'match', found)]
+
+    def track_error_families(self):
+        """XLD track errors are counted, so keep the number of occurrences."""
+        return [
+            ('track error', error, regex, 'search', first_group)
+            for error, regex in self.regexes['track errors']
+        ]
 
     def all_range_index_action(self, log, line_num):
         """Action to take when the range rip line is matched."""
@@ -83,40 +136,20 @@ class XLDChecker(LogChecker):
         # appended to the first track. It is then split from the first track with
         # Audacity/Audition.
         if len(log.tracks) == 1 and log.toc[list(log.toc)[0]][0] >= 450:
-            for line in log.contents[log.index_settings : log.index_toc]:
-                if re.match(r'Gap status +: Analyzed, Appended$', line):
+            for line in log.lines[log.index_settings : log.index_toc]:
+                if line.get('gap status'):
                     log.add_deduction('HTOA extracted')
                     break
 
     def check_tracks(self, log):
         """Get track data for each track and check for errors."""
-        tsettings = self.patterns['track settings']
-        track_settings = {
-            'filename': re.compile(
-                r'\s+' + fmt_ptn(tsettings['filename']) + r' : (.*?\/.*?\..*)'
-            ),
-            'pregap': re.compile(
-                r'\s+' + fmt_ptn(tsettings['pregap']) + r' : ([0-9:\.]+)'
-            ),
-            'gain': re.compile(
-                r'\s+' + fmt_ptn(tsettings['gain']) + r' : ([A-Za-z0-9\.-]+)'
-            ),
-            'peak': re.compile(r'\s+' + fmt_ptn(tsettings['peak']) + r' : ([0-9\.]+)'),
-            'test crc': re.compile(
-                r'\s+' + fmt_ptn(tsettings['test crc']) + r' : ([A-Z0-9]{8})'
-            ),
-            'copy crc': re.compile(
-                r'\s+' + fmt_ptn(tsettings['copy crc']) + r' : ([A-Z0-9]{8})'
-            ),
-        }
-
         if log.all_tracks:
-            for i in range(log.all_tracks, min(log.track_indices)):
-                if re.match(track_settings['filename'], log.contents[i]):
+            for line in log.lines[log.all_tracks : min(log.track_indices)]:
+                if 'filename' in line.get('track setting'):
                     log.range = True
                     break
 
-        self.analyze_tracks(log, track_settings, parsers.parse_errors_xld)
+        self.analyze_tracks(log, parsers.parse_errors_xld)
 
     def evaluate_tracks(self, log):
         """Evaluate the analyzed track data for deficiencies (actually split off the
@@ -139,13 +172,10 @@ class XLDChecker(LogChecker):
         # accumulated deductions are deducted by an occurrence basis, we are
         # splitting deductions into one deduction per track, capped at 10%.
         for error in log.track_errors:
-            for each in log.track_errors[error]:
-                log.add_deduction(error, multiplier=each[1], track=each[0], cap_10=True)
-
-        if integrity:
-            log_text = str.join("", log.full_contents)
-            data, version, old_signature, actual_signature = xld_verify(log_text)
-            if actual_signature != old_signature:
-                log.add_deduction('Log Checksum Not Match', 1)
+            for track, count in log.track_errors[error].items():
+                log.add_deduction(error, multiplier=count, track=track, cap_10=True)
+
+        if integrity and log.integrity != LOG_OK:
+            log.add_deduction('Log Checksum Not Match', 1)
 
         super().deduct_and_score(log)
@@ -1,77 +1,231 @@
 # Source from https://github.com/OPSnet/xld_logchecker.py/blob/master/xld_logchecker.py
 
 import base64
-
-
-def rotate_left(n, k):
-    return ((n << k) & 0xFFFFFFFF) | (n >> (32 - k))
-
-
-def rotate_right(n, k):
-    return rotate_left(n, 32 - k)
+import ctypes
+import ctypes.util
+import functools
+import hashlib
+import struct
+
+MASK = 0xFFFFFFFF
+
+# Non-standard initial state
+INITIAL_STATE = (
+    0x1D95E3A4, 0x06520EF5, 0x3A9CFB75, 0x6104BCAE,
+    0x09CEDA82, 0xBA55E60B, 0xEAEC16C6, 0xEB19AF15,
+)  # fmt: skip
+
+# Standard initial state, used to check the OpenSSL context layout
+STANDARD_STATE = (
+    0x6A09E667, 0xBB67AE85, 0x3C6EF372, 0xA54FF53A,
+    0x510E527F, 0x9B05688C, 0x1F83D9AB, 0x5BE0CD19,
+)  # fmt: skip
+
+# Standard round constants
+ROUND_CONSTANTS = (
+    0x428A2F98, 0x71374491, 0xB5C0FBCF, 0xE9B5DBA5, 0x3956C25B, 0x59F111F1, 0x923F82A4,
+    0xAB1C5ED5, 0xD807AA98, 0x12835B01, 0x243185BE, 0x550C7DC3, 0x72BE5D74, 0x80DEB1FE,
+    0x9BDC06A7, 0xC19BF174, 0xE49B69C1, 0xEFBE4786, 0x0FC19DC6, 0x240CA1CC, 0x2DE92C6F,
+    0x4A7484AA, 0x5CB0A9DC, 0x76F988DA, 0x983E5152, 0xA831C66D, 0xB00327C8, 0xBF597FC7,
+    0xC6E00BF3, 0xD5A79147, 0x06CA6351, 0x14292967, 0x27B70A85, 0x2E1B2138, 0x4D2C6DFC,
+    0x53380D13, 0x650A7354, 0x766A0ABB, 0x81C2C92E, 0x92722C85, 0xA2BFE8A1, 0xA81A664B,
+    0xC24B8B70, 0xC76C51A3, 0xD192E819, 0xD6990624, 0xF40E3585, 0x106AA070, 0x19A4C116,
+    0x1E376C08, 0x2748774C, 0x34B0BCB5, 0x391C0CB3, 0x4ED8AA4A, 0x5B9CCA4F, 0x682E6FF3,
+    0x748F82EE, 0x78A5636F, 0x84C87814, 0x8CC70208, 0x90BEFFFA, 0xA4506CEB, 0xBEF9A3F7,
+    0xC67178F2,
+)  # fmt: skip
+
+MAGIC_CONSTANTS = (
+    0x99036946, 0xE99DB8E7, 0xE3AE2FA7, 0xA339740,
+    0xF06EB6A9, 0x92FF9B65, 0x28F7873, 0x9070E316,
+)  # fmt: skip
+
+STATE = struct.Struct('>8I')
+
+SIGNATURE_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz._'
+BEGIN_SIGNATURE = '\n-----BEGIN XLD SIGNATURE-----\n'
+END_SIGNATURE = '\n-----END XLD SIGNATURE-----\n'
+# Text kept after the signature marker; the signature block is far shorter.
+MAX_SIGNATURE_BLOCK = 4096
 
 
 def sha256(data, initial_state):
-    # Non-standard initial state
-    state = initial_state
-
-    # Standard round constants
-    round_constants = (
-        0x428A2F98, 0x71374491, 0xB5C0FBCF, 0xE9B5DBA5, 0x3956C25B, 0x59F111F1, 0x923F82A4, 0xAB1C5ED5, 0xD807AA98,
-        0x12835B01, 0x243185BE, 0x550C7DC3, 0x72BE5D74, 0x80DEB1FE, 0x9BDC06A7, 0xC19BF174, 0xE49B69C1, 0xEFBE4786,
-        0x0FC19DC6, 0x240CA1CC, 0x2DE92C6F, 0x4A7484AA, 0x5CB0A9DC, 0x76F988DA, 0x983E5152, 0xA831C66D, 0xB00327C8,
-        0xBF597FC7, 0xC6E00BF3, 0xD5A79147, 0x06CA6351, 0x14292967, 0x27B70A85, 0x2E1B2138, 0x4D2C6DFC, 0x53380D13,
-        0x650A7354, 0x766A0ABB, 0x81C2C92E, 0x92722C85, 0xA2BFE8A1, 0xA81A664B, 0xC24B8B70, 0xC76C51A3, 0xD192E819,
-        0xD6990624, 0xF40E3585, 0x106AA070, 0x19A4C116, 0x1E376C08, 0x2748774C, 0x34B0BCB5, 0x391C0CB3, 0x4ED8AA4A,
-        0x5B9CCA4F, 0x682E6FF3, 0x748F82EE, 0x78A5636F, 0x84C87814, 0x8CC70208, 0x90BEFFFA, 0xA4506CEB, 0xBEF9A3F7,
-        0xC67178F2)
-
-    # Pad the data with a single 1 bit, enough zeroes, and the original message bit length
-    L = 8 * len(data)
-    K = next(i for i in range(0, 512) if (L + 1 + i + 64) % 512 == 0)
-
-    data += b'\x80' + (b'\x00' * ((K - 7) // 8)) + L.to_bytes(8, 'big')
-
-    for start in range(0, len(data), 64):
-        # Process chunks of 64 bytes
-        chunk = data[start:start + 64]
-        round_state = 4 * [int.from_bytes(chunk[i:i + 4], 'big') for i in range(0, len(chunk), 4)]
-
+    """SHA256 with a non-standard initial state, through OpenSSL if it can be
+    loaded and in pure Python otherwise.
+    """
+    sha = SHA256(initial_state)
+    sha.update(data)
+    return sha.hexdigest()
+
+
+class SHA256Context(ctypes.Structure):
+    """OpenSSL's SHA256_CTX, whose hash state can be overwritten after init."""
+
+    _fields_ = [
+        ('h', ctypes.c_uint32 * 8),
+        ('Nl', ctypes.c_uint32),
+        ('Nh', ctypes.c_uint32),
+        ('data', ctypes.c_uint32 * 16),
+        ('num', ctypes.c_uint),
+        ('md_len', ctypes.c_uint),
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def load_libcrypto():
+    """Load OpenSSL's libcrypto for its low-level SHA256 functions, returning
+    None if it can't be found or doesn't hash like hashlib.
+    """
+    names = [ctypes.util.find_library('crypto')]
+    names += ['libcrypto.so.3', 'libcrypto.so.1.1', 'libcrypto.dylib']
+    for name in names:
+        if not name:
+            continue
+        try:
+            libcrypto = ctypes.CDLL(name)
+            for function in ['SHA256_Init', 'SHA256_Update', 'SHA256_Final']:
+                getattr(libcrypto, function).restype = ctypes.c_int
+        except (OSError, AttributeError):
+            continue
+
+        libcrypto.SHA256_Init.argtypes = [ctypes.POINTER(SHA256Context)]
+        libcrypto.SHA256_Update.argtypes = [
+            ctypes.POINTER(SHA256Context),
+            ctypes.c_char_p,
+            ctypes.c_size_t,
+        ]
+        libcrypto.SHA256_Final.argtypes = [
+            ctypes.c_char_p,
+            ctypes.POINTER(SHA256Context),
+        ]
+
+        # Make sure the context layout matches, with the standard initial state.
+        digest = sha256_openssl(libcrypto, b'abc', STANDARD_STATE)
+        if digest == hashlib.sha256(b'abc').hexdigest():
+            return libcrypto
+
+    return None
+
+
+def sha256_openssl(libcrypto, data, initial_state):
+    """SHA256 with a non-standard initial state, through OpenSSL."""
+    context = SHA256Context()
+    libcrypto.SHA256_Init(ctypes.byref(context))
+    context.h[:] = initial_state
+    libcrypto.SHA256_Update(ctypes.byref(context), data, len(data))
+
+    digest = ctypes.create_string_buffer(32)
+    libcrypto.SHA256_Final(digest, ctypes.byref(context))
+    return digest.raw.hex()
+
+
+def sha256_python(data, initial_state):
+    """SHA256 with a non-standard initial state, in pure Python."""
+    return STATE.pack(*compress(initial_state, pad(data, len(data)))).hex()
+
+
+def pad(data, length):
+    """Pad the last data of a message with a single 1 bit, enough zeroes, and the
+    original message bit length.
+    """
+    padding = b'\x00' * (-(length + 9) % 64)
+    return data + b'\x80' + padding + (8 * length).to_bytes(8, 'big')
+
+
+def compress(state, data):
+    """Run the SHA256 compression function over whole 64-byte chunks of data."""
+    h0, h1, h2, h3, h4, h5, h6, h7 = state
+    for chunk in struct.iter_unpack('>16I', data):
+        # Extend the 16 words of the chunk into the 64 word message schedule.
+        # Rotations are left unmasked; the high bits drop off in the final mask.
+        w = list(chunk)
         for i in range(16, 64):
-            s0 = rotate_right(round_state[i - 15], 7) ^ rotate_right(round_state[i - 15], 18) ^ (
-                    round_state[i - 15] >> 3)
-            s1 = rotate_right(round_state[i - 2], 17) ^ rotate_right(round_state[i - 2], 19) ^ (
-                    round_state[i - 2] >> 10)
-
-            round_state[i] = (round_state[i - 16] + s0 + round_state[i - 7] + s1) & 0xFFFFFFFF
-
-        a, b, c, d, e, f, g, h = state
-
-        for i in range(64):
-            s0 = rotate_right(a, 2) ^ rotate_right(a, 13) ^ rotate_right(a, 22)
-            maj = (a & b) ^ (a & c) ^ (b & c)
-            t2 = s0 + maj
-
-            s1 = rotate_right(e, 6) ^ rotate_right(e, 11) ^ rotate_right(e, 25)
-            ch = (e & f) ^ ((~e) & g)
-            t1 = h + s1 + ch + round_constants[i] + round_state[i]
-
+            x = w[i - 15]
+            y = w[i - 2]
+            w.append(
+                (
+                    w[i - 16]
+                    + (((x >> 7) | (x << 25)) ^ ((x >> 18) | (x << 14)) ^ (x >> 3))
+                    + w[i - 7]
+                    + (((y >> 17) | (y << 15)) ^ ((y >> 19) | (y << 13)) ^ (y >> 10))
+                )
+                & MASK
+            )
+
+        a, b, c, d, e, f, g, h = h0, h1, h2, h3, h4, h5, h6, h7
+        for k, word in zip(ROUND_CONSTANTS, w):
+            s1 = (
+                ((e >> 6) | (e << 26))
+                ^ ((e >> 11) | (e << 21))
+                ^ ((e >> 25) | (e << 7))
+            )
+            t1 = h + s1 + ((e & f) ^ (~e & g)) + k + word
+            s0 = (
+                ((a >> 2) | (a << 30))
+                ^ ((a >> 13) | (a << 19))
+                ^ ((a >> 22) | (a << 10))
+            )
+            t2 = s0 + ((a & b) ^ (a & c) ^ (b & c))
             h = g
             g = f
             f = e
-            e = (d + t1) & 0xFFFFFFFF
+            e = (d + t1) & MASK
             d = c
             c = b
             b = a
-            a = (t1 + t2) & 0xFFFFFFFF
-
-        state = [(x + y) & 0xFFFFFFFF for x, y in zip(state, [a, b, c, d, e, f, g, h])]
-
-    return b''.join([i.to_bytes(4, 'big') for i in state[:8]]).hex()
+            a = (t1 + t2) & MASK
+
+        h0 = (h0 + a) & MASK
+        h1 = (h1 + b) & MASK
+        h2 = (h2 + c) & MASK
+        h3 = (h3 + d) & MASK
+        h4 = (h4 + e) & MASK
+        h5 = (h5 + f) & MASK
+        h6 = (h6 + g) & MASK
+        h7 = (h7 + h) & MASK
+
+    return h0, h1, h2, h3, h4, h5, h6, h7
+
+
+class SHA256:
+    """Incremental SHA256 with a non-standard initial state, through OpenSSL if
+    it can be loaded and in pure Python otherwise.
+    """
+
+    def __init__(self, initial_state):
+        self.libcrypto = load_libcrypto()
+        if self.libcrypto is not None:
+            self.context = SHA256Context()
+            self.libcrypto.SHA256_Init(ctypes.byref(self.context))
+            self.context.h[:] = initial_state
+        else:
+            self.state = tuple(initial_state)
+            self.buffer = b''
+            self.length = 0
+
+    def update(self, data):
+        if self.libcrypto is not None:
+            self.libcrypto.SHA256_Update(ctypes.byref(self.context), data, len(data))
+            return
+
+        self.length += len(data)
+        data = self.buffer + data
+        end = len(data) - len(data) % 64
+        self.state = compress(self.state, data[:end])
+        self.buffer = data[end:]
+
+    def hexdigest(self):
+        if self.libcrypto is not None:
+            digest = ctypes.create_string_buffer(32)
+            self.libcrypto.SHA256_Final(digest, ctypes.byref(self.context))
+            return digest.raw.hex()
+
+        state = compress(self.state, pad(self.buffer, self.length))
+        return STATE.pack(*state).hex()
 
 
 def scramble(data):
-    MAGIC_CONSTANTS = [0x99036946, 0xE99DB8E7, 0xE3AE2FA7, 0xA339740, 0xF06EB6A9, 0x92FF9B65, 0x28F7873, 0x9070E316]
+    k0, k1, k2, k3, k4, k5, k6, k7 = MAGIC_CONSTANTS
 
     # Split off the unaligned part
     unaligned_chunk = b''
@@ -88,31 +242,37 @@ def scramble(data):
     X = 0x6479B873
     Y = 0x48853AFC
 
-    for offset in range(0, len(data), 8):
-        # Read off two 32-bit integers
-        X ^= int.from_bytes(data[offset:offset + 4], 'big')
-        Y ^= int.from_bytes(data[offset + 4:offset + 8], 'big')
+    # Read off two 32-bit integers at a time
+    for x, y in struct.iter_unpack('>2I', data):
+        X ^= x
+        Y ^= y
 
-        # Scramble them around
+        # Scramble them around; both halves of each round are written out with
+        # their constants, and the left rotations are inlined.
         for _ in range(4):
-            for i in range(2):
-                Y ^= X
-
-                a = (MAGIC_CONSTANTS[4 * i + 0] + Y) & 0xFFFFFFFF
-                b = (a - 1 + rotate_left(a, 1)) & 0xFFFFFFFF
-
-                X ^= b ^ rotate_left(b, 4)
-
-                c = (MAGIC_CONSTANTS[4 * i + 1] + X) & 0xFFFFFFFF
-                d = (c + 1 + rotate_left(c, 2)) & 0xFFFFFFFF
-
-                e = (MAGIC_CONSTANTS[4 * i + 2] + (d ^ rotate_left(d, 8))) & 0xFFFFFFFF
-                f = (rotate_left(e, 1) - e) & 0xFFFFFFFF
-
-                Y ^= (X | f) ^ rotate_left(f, 16)
-
-                g = (MAGIC_CONSTANTS[4 * i + 3] + Y) & 0xFFFFFFFF
-                X ^= (g + 1 + rotate_left(g, 2)) & 0xFFFFFFFF
+            Y ^= X
+            a = (k0 + Y) & MASK
+            b = (a - 1 + (((a << 1) & MASK) | (a >> 31))) & MASK
+            X ^= b ^ (((b << 4) & MASK) | (b >> 28))
+            c = (k1 + X) & MASK
+            d = (c + 1 + (((c << 2) & MASK) | (c >> 30))) & MASK
+            e = (k2 + (d ^ (((d << 8) & MASK) | (d >> 24)))) & MASK
+            f = ((((e << 1) & MASK) | (e >> 31)) - e) & MASK
+            Y ^= (X | f) ^ (((f << 16) & MASK) | (f >> 16))
+            g = (k3 + Y) & MASK
+            X ^= (g + 1 + (((g << 2) & MASK) | (g >> 30))) & MASK
+
+            Y ^= X
+            a = (k4 + Y) & MASK
+            b = (a - 1 + (((a << 1) & MASK) | (a >> 31))) & MASK
+            X ^= b ^ (((b << 4) & MASK) | (b >> 28))
+            c = (k5 + X) & MASK
+            d = (c + 1 + (((c << 2) & MASK) | (c >> 30))) & MASK
+            e = (k6 + (d ^ (((d << 8) & MASK) | (d >> 24)))) & MASK
+            f = ((((e << 1) & MASK) | (e >> 31)) - e) & MASK
+            Y ^= (X | f) ^ (((f << 16) & MASK) | (f >> 16))
+            g = (k7 + Y) & MASK
+            X ^= (g + 1 + (((g << 2) & MASK) | (g >> 30))) & MASK
 
         output.append(X.to_bytes(4, 'big') + Y.to_bytes(4, 'big'))
 
@@ -141,11 +301,11 @@ def extract_info(data):
     else:
         version = version.split()[4]
 
-    if '\n-----BEGIN XLD SIGNATURE-----\n' not in data:
+    if BEGIN_SIGNATURE not in data:
         signature = None
     else:
-        data, signature_parts = data.split('\n-----BEGIN XLD SIGNATURE-----\n', 1)
-        signature = signature_parts.split('\n-----END XLD SIGNATURE-----\n')[0].strip()
+        data, signature_parts = data.split(BEGIN_SIGNATURE, 1)
+        signature = signature_parts.split(END_SIGNATURE)[0].strip()
 
     return data, version, signature
 
@@ -153,16 +313,56 @@ def extract_info(data):
 def xld_verify(data):
     data, version, old_signature = extract_info(data)
 
-    INITIAL_STATE = (0x1D95E3A4, 0x06520EF5, 0x3A9CFB75, 0x6104BCAE, 0x09CEDA82, 0xBA55E60B, 0xEAEC16C6, 0xEB19AF15)
-
     # SHA256 with a different initial state
-    checksum = sha256(data.encode('utf-8'), INITIAL_STATE).encode('ascii')
+    checksum = sha256(data.encode('utf-8'), INITIAL_STATE)
+    return data, version, old_signature, xld_signature(checksum)
+
 
+def xld_signature(checksum):
+    """Turn the hex digest of the log text into its XLD signature."""
     # A fixed version string is appended to the hex digest of the log text
-    scrambled = scramble(checksum + b'\nVersion=0001')
+    scrambled = scramble(checksum.encode('ascii') + b'\nVersion=0001')
 
     # No padding bytes
-    signature = nonstandard_base64_encode(scrambled, '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz._').rstrip('=')
-
-    return data, version, old_signature, signature
-
+    return nonstandard_base64_encode(scrambled, SIGNATURE_ALPHABET).rstrip('=')
+
+
+class XLDVerifier:
+    """Verify the signature of a XLD log incrementally, fed the text of the log
+    (with \\n newlines) as it is read. Only the hash state, a few held back
+    characters and the signature block are kept.
+    """
+
+    def __init__(self):
+        self.hash = SHA256(INITIAL_STATE)
+        self.held = ''
+        self.signature = None
+
+    def update(self, text):
+        if self.signature is not None:
+            if len(self.signature) < MAX_SIGNATURE_BLOCK:
+                self.signature += text
+            return
+
+        text = self.held + text
+        index = text.find(BEGIN_SIGNATURE)
+        if index != -1:
+            self.held = ''
+            self.hash.update(text[:index].encode('utf-8'))
+            self.signature = text[index + len(BEGIN_SIGNATURE) :]
+            return
+
+        # Hold back enough text to find a marker split between two updates.
+        split = max(0, len(text) - len(BEGIN_SIGNATURE) + 1)
+        self.hash.update(text[:split].encode('utf-8'))
+        self.held = text[split:]
+
+    def finalize(self):
+        """Return the (signature in the log, actual signature) of the log."""
+        old_signature = None
+        if self.signature is not None:
+            old_signature = self.signature.split(END_SIGNATURE)[0].strip()
+        else:
+            self.hash.update(self.held.encode('utf-8'))
+
+        return old_signature, xld_signature(self.hash.hexdigest())
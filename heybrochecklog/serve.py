@@ -0,0 +1,311 @@
+"""This module contains the long-running log scoring server, which keeps warmed
+checkers in memory and answers length-prefixed requests.
+
+Every request is a frame of a 4-byte big-endian length followed by that many
+bytes: a one byte kind, then the payload. Kind `P` is followed by the UTF-8 path
+of a log file, kind `B` by the raw bytes of a log. Every response is a frame of a
+4-byte big-endian length followed by the UTF-8 JSON of the result, sent in the
+order the requests were received. Failed requests get {"error": "..."}.
+"""
+
+import argparse
+import functools
+import json
+import os
+import queue
+import signal
+import socketserver
+import struct
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from heybrochecklog.cache import ResultCache
+from heybrochecklog.score import score_any, warm_checkers
+
+HEADER = struct.Struct('>I')
+KIND_PATH = b'P'
+KIND_BYTES = b'B'
+DEFAULT_MAX_SIZE = 16 * 1024 * 1024
+
+
+def parse_args(argv=None):
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        prog='heybrochecklog serve',
+        description='Score logs sent as length-prefixed requests, '
+        'over stdin/stdout or a Unix domain socket.',
+    )
+    parser.add_argument(
+        '--socket',
+        help='listen on a Unix domain socket at this path',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of worker processes (0 for one per CPU)',
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        '--max-pending',
+        help='requests in flight per connection before reading stops',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--max-queued',
+        help='requests in flight over all connections before reading stops',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--max-size',
+        help='largest request accepted, in bytes',
+        type=int,
+        default=DEFAULT_MAX_SIZE,
+    )
+    parser.add_argument(
+        '-m', '--markup', help='return marked up log contents', action='store_true'
+    )
+    parser.add_argument(
+        '-ei',
+        '--experimental-integrity',
+        help='Enable Log Integrity Checking (Experimental, EAC & XLD only)',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--cache',
+        help='cache scores in an SQLite database at this path',
+        metavar='PATH',
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the server until its input is closed or it is interrupted."""
+    args = parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+    max_pending = args.max_pending or jobs * 2
+    slots = threading.BoundedSemaphore(args.max_queued or jobs * 4)
+    score = functools.partial(
+        score_any,
+        markup=args.markup,
+        integrity=args.experimental_integrity,
+        cache=ResultCache(args.cache) if args.cache else None,
+    )
+
+    signal.signal(signal.SIGTERM, stop)
+    with make_executor(jobs, args.markup) as executor:
+        serve = functools.partial(
+            serve_stream,
+            executor=executor,
+            score=score,
+            max_pending=max_pending,
+            max_size=args.max_size,
+            slots=slots,
+        )
+        try:
+            if args.socket:
+                serve_socket(args.socket, serve)
+            else:
+                serve(sys.stdin.buffer, sys.stdout.buffer)
+        except KeyboardInterrupt:
+            pass
+
+
+def stop(signum, frame):
+    """Shut down on SIGTERM as on Ctrl-C, so the socket is cleaned up."""
+    raise KeyboardInterrupt
+
+
+def make_executor(jobs, markup=False):
+    """Create the pool which scores the logs, with its checkers warmed up. A
+    single job is scored on one thread of the server process.
+    """
+    if jobs == 1:
+        warm_checkers(markup)
+        return ThreadPoolExecutor(1)
+    return WorkerPool(jobs, markup)
+
+
+def init_worker(markup=False):
+    """Set up a worker process. Workers inherit the SIGTERM handler of the
+    server, but only the server should turn SIGTERM into a clean shutdown.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    warm_checkers(markup)
+
+
+class WorkerPool:
+    """A pool of worker processes which is started again when it breaks, e.g.
+    when the OOM killer takes one of its workers. The requests in flight at
+    the time fail, but every later request is scored.
+    """
+
+    def __init__(self, jobs, markup=False):
+        self.jobs = jobs
+        self.markup = markup
+        self.lock = threading.Lock()
+        self.executor = self.start()
+
+    def start(self):
+        return ProcessPoolExecutor(
+            self.jobs, initializer=init_worker, initargs=(self.markup,)
+        )
+
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            try:
+                return self.executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                self.executor.shutdown(wait=False)
+                self.executor = self.start()
+                return self.executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def serve_socket(path, serve):
+    """Serve every connection to a Unix domain socket on its own thread."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve(self.rfile, self.wfile)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def serve_stream(rfile, wfile, executor, score, max_pending, max_size, slots=None):
+    """Answer the requests of one stream. Requests are read only while fewer
+    than `max_pending` are waiting on their response, so a client which sends
+    faster than the logs are scored is held back by the stream itself.
+
+    `slots` is a semaphore shared by every stream of the server, which bounds
+    the requests in flight over all of them.
+    """
+    if slots is None:
+        slots = threading.BoundedSemaphore(max_pending)
+    pending = queue.Queue(max_pending)
+    writer = threading.Thread(target=write_responses, args=(pending, wfile, slots))
+    writer.start()
+    try:
+        for kind, payload in read_requests(rfile, max_size):
+            slots.acquire()
+            pending.put(submit(executor, score, kind, payload))
+    finally:
+        pending.put(None)
+        writer.join()
+
+
+def read_requests(rfile, max_size=DEFAULT_MAX_SIZE):
+    """Yield the (kind, payload) of each request frame until the stream ends."""
+    while True:
+        header = rfile.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+
+        (length,) = HEADER.unpack(header)
+        if length > max_size:
+            if not skip(rfile, length):
+                return
+            yield None, 'Request is larger than {} bytes'.format(max_size)
+            continue
+
+        frame = rfile.read(length)
+        if len(frame) < length:
+            return
+        yield frame[:1], frame[1:]
+
+
+def skip(rfile, length):
+    """Discard the payload of a rejected request."""
+    while length:
+        chunk = rfile.read(min(length, 65536))
+        if not chunk:
+            return False
+        length -= len(chunk)
+    return True
+
+
+def submit(executor, score, kind, payload):
+    """Hand a request to the pool, returning the future of its result."""
+    if kind == KIND_PATH:
+        return executor.submit(score, payload.decode('utf-8', 'surrogateescape'))
+    elif kind == KIND_BYTES:
+        return executor.submit(score, payload)
+
+    future = Future()
+    if kind is None:
+        future.set_result({'error': payload})
+    else:
+        future.set_result({'error': 'Unknown request kind: {!r}'.format(kind)})
+    return future
+
+
+def write_responses(pending, wfile, slots):
+    """Write the result of each pending request, in request order, freeing its
+    slot once it is written.
+    """
+    broken = False
+    while True:
+        future = pending.get()
+        if future is None:
+            return
+
+        try:
+            result = future.result()
+        except Exception as exception:
+            result = {'error': '{}: {}'.format(type(exception).__name__, exception)}
+
+        try:
+            if not broken:  # Keep draining, so the reader is never blocked.
+                wfile.write(encode_response(result))
+                wfile.flush()
+        except OSError:
+            broken = True
+        finally:
+            slots.release()
+
+
+def encode_request(log):
+    """Build the request frame of a log, given its path or its raw bytes."""
+    if isinstance(log, (bytes, bytearray, memoryview)):
+        frame = KIND_BYTES + bytes(log)
+    else:
+        frame = KIND_PATH + os.fsencode(log)
+    return HEADER.pack(len(frame)) + frame
+
+
+def encode_response(result):
+    """Build the response frame of a result."""
+    body = json.dumps(result).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+
+def read_response(rfile):
+    """Read a response frame, returning the decoded result or None at the end
+    of the stream.
+    """
+    header = rfile.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    return json.loads(rfile.read(length).decode('utf-8'))
@@ -1,24 +1,112 @@
 """This module contains shared functions between the various top-level modules."""
 
 import codecs
+import functools
+import io
 import json
 import os
+import sys
+from pathlib import Path
+from types import MappingProxyType
 
 import cchardet
 import chardet
 
+from heybrochecklog import UnrecognizedException
 
-def get_log_contents(log_file):
-    """Open a log file and return its contents."""
-    encoding = get_log_encoding(log_file)
-    with log_file.open(encoding=encoding) as log:
-        contents = log.readlines()
+# Bytes at the start of a log which the chardet libraries look at.
+SAMPLE_SIZE = 64 * 1024
+# Larger logs are refused before they are decoded.
+MAX_LOG_SIZE = 16 * 1024 * 1024
+# Bytes decoded at once when a log is fed to a verifier.
+CHUNK_SIZE = 64 * 1024
 
-    return contents
+
+def get_log_contents(log_file, verifier=None, max_size=MAX_LOG_SIZE):
+    """Read a log file once and return its contents. A verifier (with an update
+    method) is fed the text of the log as it is decoded.
+    """
+    raw = read_log_bytes(log_file, max_size)
+    return get_log_contents_from_bytes(raw, verifier, max_size)
+
+
+def get_log_contents_from_bytes(raw, verifier=None, max_size=MAX_LOG_SIZE):
+    """Decode the raw bytes of a log file and return its contents."""
+    check_log_size(len(raw), max_size)
+    encoding, text = detect_encoding(raw)
+    if text is None and verifier is not None:
+        chunks = []
+        for chunk in decode_chunks(raw, encoding):
+            verifier.update(chunk)
+            chunks.append(chunk)
+        return io.StringIO(''.join(chunks), newline='\n').readlines()
+
+    if text is None:
+        text = codecs.decode(raw, encoding)
+    # Read the lines like a file opened in text mode would (universal newlines).
+    contents = io.StringIO(text, newline=None)
+    if verifier is not None:
+        # UTF-8 logs were decoded whole when their encoding was detected.
+        verifier.update(contents.getvalue())
+    return contents.readlines()
+
+
+def decode_chunks(raw, encoding, chunk_size=CHUNK_SIZE):
+    """Decode the raw bytes of a log a chunk at a time, translating newlines as
+    a file opened in text mode would, and yield the text of each chunk.
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(), translate=True
+    )
+    for start in range(0, len(raw), chunk_size):
+        text = decoder.decode(raw[start : start + chunk_size])
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def read_log_bytes(log_file, max_size=MAX_LOG_SIZE):
+    """Read the raw bytes of a log file, refusing files larger than max_size
+    before reading them.
+    """
+    with log_file.open('rb') as log:
+        check_log_size(os.fstat(log.fileno()).st_size, max_size)
+        # The file may grow after it was measured.
+        raw = log.read(-1 if max_size is None else max_size + 1)
+    check_log_size(len(raw), max_size)
+    return raw
+
+
+def check_log_size(size, max_size=MAX_LOG_SIZE):
+    """Raise an UnrecognizedException for logs larger than max_size bytes."""
+    if max_size is not None and size > max_size:
+        raise UnrecognizedException(
+            'Log file is larger than {} bytes'.format(max_size)
+        )
+
+
+# Detections below this confidence fall back to the next detector.
+MIN_CONFIDENCE = 0.7
+
+# Logs start with one of these lines, which tells UTF-16 logs without a BOM apart.
+LOG_HEADERS = ('Exact Audio Copy V', 'EAC extraction logfile', 'X Lossless Decoder')
+UTF16_HEADERS = tuple(
+    (header.encode(encoding), encoding)
+    for header in LOG_HEADERS
+    for encoding in ['utf-16-le', 'utf-16-be']
+)
 
 
 def detect_chardet(log_data):
+    """Detect the encoding with cchardet, only asking the far slower chardet
+    when cchardet isn't confident.
+    """
     cchardet_detection = cchardet.detect(log_data)
+    if (cchardet_detection['confidence'] or 0) > MIN_CONFIDENCE:
+        return cchardet_detection
+
     chardet_detection = chardet.detect(log_data)
 
     """In cases chardet spews out Windows-1252 as encoding, switch over to cchardet."""
@@ -33,13 +121,52 @@ def detect_chardet(log_data):
 
 
 def get_log_encoding(log_file):
-    """Get the encoding of the log file with the chardet library."""
-    raw = log_file.read_bytes()
+    """Get the encoding of the log file."""
+    return get_encoding(read_log_bytes(log_file))
+
+
+def get_encoding(raw, sample_size=SAMPLE_SIZE):
+    """Get the encoding of the raw bytes of a log, from the cheapest check to
+    the most expensive: BOMs, the header of UTF-16 logs without a BOM, strict
+    UTF-8, and lastly the chardet libraries, which only get the first
+    sample_size bytes.
+    """
+    return detect_encoding(raw, sample_size)[0]
+
+
+def detect_encoding(raw, sample_size=SAMPLE_SIZE):
+    """Get the encoding of the raw bytes of a log as get_encoding does, along
+    with their text if they were decoded to check for UTF-8 (None otherwise),
+    so UTF-8 logs aren't decoded twice.
+    """
     if raw.startswith(codecs.BOM_UTF8):
-        return 'utf-8-sig'
-    else:
-        result = detect_chardet(raw)
-        return result['encoding'] if (result['confidence'] or 0) > 0.7 else 'utf-8-sig'
+        return 'utf-8-sig', None
+    if raw.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+        return 'utf-32', None
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16', None
+
+    # ASCII UTF-16 is valid UTF-8 too, so it has to be ruled out first.
+    for header, encoding in UTF16_HEADERS:
+        if raw.startswith(header):
+            return encoding, None
+
+    text = decode_utf8(raw)
+    if text is not None:
+        return 'utf-8', text
+
+    result = detect_chardet(bytes(raw[:sample_size]))
+    if (result['confidence'] or 0) > MIN_CONFIDENCE:
+        return result['encoding'], None
+    return 'utf-8-sig', None
+
+
+def decode_utf8(raw):
+    """Decode the raw bytes as strict UTF-8, or return None if they aren't."""
+    try:
+        return codecs.decode(raw, 'utf-8')
+    except UnicodeDecodeError:
+        return None
 
 
 def format_pattern(pattern, append=None):
@@ -61,6 +188,95 @@ def open_json(*paths):
     return language_data
 
 
+@functools.lru_cache(maxsize=None)
+def load_json(*paths):
+    """Open a resource JSON file once per process and return a read-only copy of it."""
+    return freeze(open_json(*paths))
+
+
+def freeze(data):
+    """Recursively turn dicts into read-only mappings and lists into frozen lists."""
+    if isinstance(data, dict):
+        return MappingProxyType({key: freeze(value) for key, value in data.items()})
+    elif isinstance(data, list):
+        return FrozenList(freeze(value) for value in data)
+    return data
+
+
+class FrozenList(tuple):
+    """A read-only list. It keeps the list repr, since some patterns are
+    built by formatting the JSON lists straight into a string.
+    """
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 def get_path():
     """Get the filepath for the heybrochecklog package directory."""
     return os.path.abspath(os.path.dirname(__file__))
+
+
+def find_logs(paths, recursive=False, errors=sys.stdout):
+    """Yield the log files to check, walking directories if recursive."""
+    for log_path in paths:
+        if recursive and os.path.isdir(log_path):
+            for root, dirs, files in os.walk(log_path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith('.log'):
+                        yield os.path.join(root, filename)
+        elif not Path(log_path).is_file():
+            print('{} does not exist.'.format(log_path), file=errors)
+        else:
+            yield log_path
+
+
+def run_parallel(func, items, jobs=None, initializer=None, initargs=()):
+    """Call func on each item over a pool of worker processes, yielding
+    (index, result) tuples as the calls finish. Only a few items per worker are
+    in flight at once, so items can be a lazy iterable of any length.
+    With a single job, everything runs in the current process, and the
+    initializer of the worker processes isn't run.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for i, item in enumerate(items):
+            yield i, func(item)
+        return
+
+    # Only loaded when logs are spread over processes.
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    executor = ProcessPoolExecutor(jobs, initializer=initializer, initargs=initargs)
+    try:
+        pending = set()
+        for i, item in enumerate(items):
+            if len(pending) >= jobs * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(call_indexed, func, i, item))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def call_indexed(func, index, item):
+    """Call func on an item and pair the result with the item's index."""
+    return index, func(item)
+
+
+def in_order(results):
+    """Re-order (index, result) tuples from run_parallel into input order."""
+    buffered = {}
+    next_index = 0
+    for index, result in results:
+        buffered[index] = result
+        while next_index in buffered:
+            yield next_index, buffered.pop(next_index)
+            next_index += 1
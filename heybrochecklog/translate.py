@@ -3,24 +3,55 @@ This module handles the log translation functionality of
 the heybrochecklog package
 ."""
 
+import functools
 import html
 import re
-from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
 
 from heybrochecklog import UnrecognizedException
 from heybrochecklog.analyze import analyze_log
 from heybrochecklog.logfile import LogFile
-from heybrochecklog.shared import get_log_contents, open_json
+from heybrochecklog.shared import (
+    get_log_contents_from_bytes,
+    load_json,
+    read_log_bytes,
+    run_parallel,
+)
 
 
 def translate_log(log_file):
     """Initialize and capture all logs."""
     try:
-        contents = get_log_contents(log_file)
-        log = LogFile(contents)
+        raw = read_log_bytes(log_file)
+    except UnrecognizedException as exception:  # Too large to be read.
+        return {'unrecognized': str(exception)}
+    return translate_log_from_bytes(raw)
+
+
+def translate_log_from_bytes(raw):
+    """Translate a log given its raw bytes (or a memoryview of them), with the
+    same encoding detection as translate_log.
+    """
+    try:
+        log = LogFile(get_log_contents_from_bytes(bytes(raw)))
         return translate_wrapper(log)
     except UnicodeDecodeError:
         return {'unrecognized': 'Could not decode log'}
+    except UnrecognizedException as exception:  # Too large to be read.
+        return {'unrecognized': str(exception)}
+
+
+def translate_logs(logs, jobs=None):
+    """Translate many logs over a pool of worker processes, yielding
+    (index, result) tuples in completion order.
+    """
+    yield from run_parallel(translate_path, logs, jobs)
+
+
+def translate_path(log_path):
+    """Translate the log file at a path."""
+    return translate_log(Path(log_path))
 
 
 def translate_log_from_contents(contents):
@@ -52,21 +83,62 @@ def translate_wrapper(log):
     return sub_english(log)
 
 
-def sub_english(log):
-    """Translate the log file and return a dict of info and log."""
-    english = open_json('eac', 'english.json')['translation']
-    foreign = open_json('eac', '{}.json'.format(log.language))['translation']
+class Translation:
+    """The phrases of a language and their English translations. Every phrase
+    of a line is found in one scan, by a single alternation of all the phrases,
+    and replaced in the same pass. It is never changed once built, so one is
+    shared by every thread translating logs of its language.
+    """
+
+    def __init__(self, foreign, english):
+        # Phrases are matched case-insensitively, by their lowercase text.
+        phrases = {}
+        for key, values in foreign.items():
+            for phrase in values:
+                phrases.setdefault(phrase.lower(), english[key][0])
+        self.phrases = MappingProxyType(phrases)
+
+        # Longest first, so a phrase wins over the shorter phrases it starts with.
+        pattern = '|'.join(
+            re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True)
+        )
+        # Literal alternatives are much faster to scan for without IGNORECASE,
+        # so lines are lowercased instead.
+        self.regex = re.compile(pattern)
+        self.regex_ignorecase = re.compile(pattern, flags=re.IGNORECASE)
+
+    def sub(self, line):
+        """Replace every phrase of a line with its English translation."""
+        lowered = line.lower()
+        if len(lowered) != len(line):  # The matches wouldn't line up with line.
+            return self.regex_ignorecase.sub(self.replace, line)
+
+        parts = []
+        position = 0
+        for match in self.regex.finditer(lowered):
+            parts.append(line[position : match.start()])
+            parts.append(self.phrases[match.group()])
+            position = match.end()
+        parts.append(line[position:])
+        return ''.join(parts)
+
+    def replace(self, match):
+        return self.phrases.get(match.group().lower(), match.group())
+
+
+@functools.lru_cache(maxsize=None)
+def get_translation(language):
+    """Return the shared Translation of a language, building and compiling it
+    the first time it is requested.
+    """
+    english = load_json('eac', 'english.json')['translation']
+    foreign = load_json('eac', '{}.json'.format(language))['translation']
+    return Translation(foreign, english)
 
-    # Sort foreign lines from longest to shortest
-    foreign = OrderedDict(
-        sorted(foreign.items(), key=lambda t: len(t[1][0]), reverse=True)
-    )
 
-    # Compile all the regex now instead of repeating.
-    for key, value in foreign.items():
-        for i, v in enumerate(value):
-            value[i] = re.escape(v)
-        foreign[key] = re.compile('|'.join(value), flags=re.IGNORECASE)
+def sub_english(log):
+    """Translate the log file and return a dict of info and log."""
+    translation = get_translation(log.language)
 
     # Iterate through each line and find/replace each string.
     new_log = []
@@ -74,11 +146,7 @@ def sub_english(log):
         if not line:  # No use wasting time here.
             new_log.append('')
         else:
-            for key, regex in foreign.items():
-                if regex.search(line):
-                    for value in english[key]:
-                        line = regex.sub(value, line)
-            new_log.append(line)
+            new_log.append(translation.sub(line))
 
     re_space_settings(new_log)
     new_log = ''.join(new_log)
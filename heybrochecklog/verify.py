@@ -0,0 +1,196 @@
+"""This module checks the signatures of EAC and XLD logs without scoring them."""
+
+import argparse
+import io
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from heybrochecklog import UnrecognizedException
+from heybrochecklog.score.integrity import (
+    LOG_CHECKSUM_NOT_PRESENT,
+    LOG_NOT_OK,
+    LOG_OK,
+    LogVerifier,
+)
+from heybrochecklog.shared import (
+    check_log_size,
+    decode_chunks,
+    detect_encoding,
+    find_logs,
+    in_order,
+    read_log_bytes,
+    run_parallel,
+)
+
+OK = 'OK'
+NOT_OK = 'NOT_OK'
+NOT_PRESENT = 'NOT_PRESENT'
+
+STATUSES = {LOG_OK: OK, LOG_NOT_OK: NOT_OK, LOG_CHECKSUM_NOT_PRESENT: NOT_PRESENT}
+
+
+def parse_args(argv=None):
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        prog='heybrochecklog verify',
+        description='Check the signatures of EAC and XLD logs, without scoring them.',
+    )
+    parser.add_argument('log', help='log file to verify.', nargs='+')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of logs to verify at once (0 for one per CPU)',
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '-r',
+        '--recursive',
+        help='verify every .log file inside directories given as log',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-f',
+        '--format',
+        help='output format; ndjson prints each result as one line of JSON',
+        choices=['text', 'ndjson'],
+        default='text',
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Verify logs, printing a status per log and the throughput at the end.
+    Returns 1 if any signature did not match, 0 otherwise.
+    """
+    args = parse_args(argv)
+
+    # Keep stdout to one JSON object per line when printing ndjson.
+    errors = sys.stderr if args.format == 'ndjson' else sys.stdout
+    output = ndjson_ if args.format == 'ndjson' else text_
+
+    log_paths = {}
+
+    def track_paths():
+        for i, log_path in enumerate(find_logs(args.log, args.recursive, errors)):
+            log_paths[i] = log_path
+            yield log_path
+
+    start = time.perf_counter()
+    statuses = Counter()
+    size = 0
+    results = verify_logs(track_paths(), args.jobs)
+    if args.format == 'text':
+        # ndjson lines carry their path, so they are printed once they are ready.
+        results = in_order(results)
+    for i, result in results:
+        output(log_paths.pop(i), result)
+        statuses[result['status'] or 'unrecognized'] += 1
+        size += result['size']
+
+    print(format_stats(statuses, size, time.perf_counter() - start), file=errors)
+    return 1 if statuses[NOT_OK] else 0
+
+
+def verify_log(log_file):
+    """Verify the signature of a log file."""
+    try:
+        raw = read_log_bytes(log_file)
+    except UnrecognizedException as exception:
+        return {
+            'ripper': None,
+            'status': None,
+            'unrecognized': str(exception),
+            'size': log_file.stat().st_size,
+        }
+    return verify_log_from_bytes(raw)
+
+
+def verify_log_from_bytes(raw):
+    """Verify the signature of the raw bytes (or a memoryview of them) of a log.
+
+    Returns a dict of the ripper ('EAC', 'XLD' or None), the status (OK, NOT_OK,
+    NOT_PRESENT, or None for logs which can't be verified), the reason a log
+    was unrecognized (or False) and the size of the log in bytes.
+    """
+    raw = bytes(raw)
+    result = {'ripper': None, 'status': None, 'unrecognized': False, 'size': len(raw)}
+    verifier = LogVerifier()
+    try:
+        check_log_size(len(raw))
+        encoding, text = detect_encoding(raw)
+        if text is not None:
+            # Detecting UTF-8 already decoded the log, newlines and all.
+            verifier.update(io.StringIO(text, newline=None).getvalue())
+        else:
+            # Otherwise the text is never kept whole, only fed to the verifier.
+            for chunk in decode_chunks(raw, encoding):
+                verifier.update(chunk)
+    except UnicodeDecodeError:
+        result['unrecognized'] = 'Could not decode log file.'
+        return result
+    except UnrecognizedException as exception:
+        result['unrecognized'] = str(exception)
+        return result
+
+    status = verifier.finalize()
+    if status is None:
+        result['unrecognized'] = 'Not an EAC or XLD log'
+        return result
+
+    result['ripper'] = verifier.ripper
+    result['status'] = STATUSES[status]
+    return result
+
+
+def verify_any(log):
+    """Verify a log given either its path or its raw bytes."""
+    if isinstance(log, (bytes, bytearray, memoryview)):
+        return verify_log_from_bytes(log)
+    return verify_log(Path(log))
+
+
+def verify_logs(logs, jobs=None):
+    """Verify many logs over a pool of worker processes.
+
+    `logs` is an iterable of log file paths or raw log bytes. (index, result)
+    tuples are yielded in completion order, where index is the position of the
+    log in `logs`.
+    """
+    yield from run_parallel(verify_any, logs, jobs)
+
+
+def text_(log_path, result):
+    try:
+        print(format_result(log_path, result))
+    except UnicodeEncodeError as error:
+        print('Cannot encode logpath: {}'.format(error))
+
+
+def ndjson_(log_path, result):
+    print(json.dumps(dict(result, path=str(log_path))), flush=True)
+
+
+def format_result(log_path, result):
+    """Turn a verification result into a line of text."""
+    if result['unrecognized']:
+        return '{}: unrecognized ({})'.format(log_path, result['unrecognized'])
+    return '{}: {} ({})'.format(log_path, result['status'], result['ripper'])
+
+
+def format_stats(statuses, size, elapsed):
+    """Summarize the statuses and throughput of a verification run."""
+    count = sum(statuses.values())
+    elapsed = max(elapsed, 1e-9)
+    megabytes = size / (1024 * 1024)
+    counts = ', '.join(
+        '{}: {}'.format(status, statuses[status])
+        for status in [OK, NOT_OK, NOT_PRESENT, 'unrecognized']
+    )
+    return (
+        '\nVerified {} logs ({:.1f} MiB) in {:.2f}s: {:.1f} logs/s, {:.1f} MiB/s\n{}'
+    ).format(count, megabytes, elapsed, count / elapsed, megabytes / elapsed, counts)
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from heybrochecklog.score import (
+    get_checker,
+    parse_log,
+    score_log,
+    score_log_from_bytes,
+    score_logs,
+    warm_checkers,
+)
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+LOGS = [
+    os.path.join(LOGS_DIR, 'EAC', 'perf-hunid.log'),
+    os.path.join(LOGS_DIR, 'EAC', 'shitty.log'),
+    os.path.join(LOGS_DIR, 'EAC', 'bad-htoa.log'),
+    os.path.join(LOGS_DIR, 'EAC95', 'burst.log'),
+    os.path.join(LOGS_DIR, 'XLD', 'ripping-error.log'),
+    os.path.join(LOGS_DIR, 'unrecognized', 'eac-wrong-date.log'),
+]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_score_logs_paths(jobs):
+    results = dict(score_logs(LOGS, jobs=jobs))
+    assert sorted(results) == list(range(len(LOGS)))
+    for i, log_path in enumerate(LOGS):
+        assert results[i] == score_log(Path(log_path))
+
+
+def test_score_logs_one_job_is_lazy():
+    get_checker.cache_clear()
+    dict(score_logs(LOGS[:2], jobs=1))
+    # Only the checker of the language of the (English EAC) logs is built.
+    assert get_checker.cache_info().currsize == 1
+
+
+def test_score_logs_bytes():
+    raw_logs = (Path(log_path).read_bytes() for log_path in LOGS)
+    results = dict(score_logs(raw_logs, jobs=2))
+    for i, log_path in enumerate(LOGS):
+        assert results[i] == score_log(Path(log_path))
+
+
+@pytest.mark.parametrize('log_path', LOGS)
+def test_score_log_from_bytes(log_path):
+    raw = Path(log_path).read_bytes()
+    result = score_log(Path(log_path), integrity=True)
+    assert score_log_from_bytes(raw, integrity=True) == result
+    assert score_log_from_bytes(memoryview(raw), integrity=True) == result
+
+
+COMBINED_LOGS = [
+    os.path.join(LOGS_DIR, 'EAC', 'hella-aborted.log'),
+    os.path.join(LOGS_DIR, 'EAC', 'badcombo.log'),
+    os.path.join(LOGS_DIR, 'EAC', 'bad-htoa.log'),
+]
+
+
+@pytest.mark.parametrize('pool', [ThreadPoolExecutor, ProcessPoolExecutor])
+@pytest.mark.parametrize('markup', [False, True])
+def test_parse_log_segments_executor(pool, markup):
+    with pool(2, initializer=warm_checkers, initargs=(markup,)) as executor:
+        for log_path in COMBINED_LOGS:
+            expected = parse_log(Path(log_path), markup)
+            assert parse_log(Path(log_path), markup, executor=executor) == expected
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+from heybrochecklog import score
+from heybrochecklog.cache import ResultCache, connect
+from heybrochecklog.score import score_log
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+LOGS = [
+    os.path.join(LOGS_DIR, 'EAC', 'perf-hunid.log'),
+    os.path.join(LOGS_DIR, 'EAC95', 'burst.log'),
+    os.path.join(LOGS_DIR, 'XLD', 'ripping-error.log'),
+    os.path.join(LOGS_DIR, 'unrecognized', 'eac-wrong-date.log'),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield ResultCache(tmp_path / 'cache.db')
+    connect.cache_clear()
+
+
+@pytest.mark.parametrize('log_path', LOGS)
+@pytest.mark.parametrize('markup', [False, True])
+def test_cache_hit(cache, monkeypatch, log_path, markup):
+    expected = score_log(Path(log_path), markup)
+    assert score_log(Path(log_path), markup, cache=cache) == expected
+
+    def fail(*args, **kwargs):
+        raise AssertionError('log was scored again')
+
+    monkeypatch.setattr(score, 'parse_log_from_bytes', fail)
+    assert score_log(Path(log_path), markup, cache=cache) == expected
+
+
+def test_cache_flags(cache):
+    raw = Path(LOGS[0]).read_bytes()
+    cache.put(raw, {'score': 1}, markup=False)
+    assert cache.get(raw, markup=True) is None
+    assert cache.get(raw, markup='ansi') is None
+    assert cache.get(raw, markup=False) == {'score': 1}
+
+
+def test_cache_eviction(cache):
+    cache.max_size = 30
+    cache.put(b'first', {'score': 1})
+    cache.put(b'second', {'score': 2})
+    cache.get(b'first')
+    cache.put(b'third', {'score': 3})
+    assert cache.get(b'first') == {'score': 1}
+    assert cache.get(b'second') is None
+    assert cache.get(b'third') == {'score': 3}
+
+
+def test_cache_size_counter(cache):
+    cache.max_size = 30
+    cache.put(b'first', {'score': 1})
+    cache.put(b'first', {'score': 10})
+    cache.put(b'second', {'score': 2})
+    cache.put(b'third', {'score': 3})
+
+    query = "SELECT value FROM meta WHERE key = 'size'"
+    (total,) = cache.conn.execute(query).fetchone()
+    (actual,) = cache.conn.execute('SELECT SUM(size) FROM results').fetchone()
+    assert int(total) == actual <= cache.max_size
+    assert cache.get(b'first') is None
+
+
+def test_cache_rules_changed(cache):
+    cache.put(b'log', {'score': 1})
+    conn = sqlite3.connect(cache.path)
+    with conn:
+        conn.execute("UPDATE meta SET value = 'old' WHERE key = 'fingerprint'")
+    conn.close()
+
+    connect.cache_clear()
+    assert cache.get(b'log') is None
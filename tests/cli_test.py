@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import heybrochecklog
+from heybrochecklog import find_logs, format_ndjson, markup_target, parse_args
+from heybrochecklog.score import score_log
+from heybrochecklog.translate import translate_log
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+
+@pytest.mark.parametrize('contents', [True, False])
+def test_format_ndjson_score(contents):
+    log_path = os.path.join(LOGS_DIR, 'EAC', 'perf-hunid.log')
+    log = score_log(Path(log_path))
+    line = format_ndjson(log_path, log, contents)
+    assert '\n' not in line
+
+    result = json.loads(line)
+    assert result.pop('path') == log_path
+    if not contents:
+        assert 'contents' not in result
+        del log['contents']
+    assert result == json.loads(json.dumps(log))
+
+
+def test_format_ndjson_translation():
+    log_path = os.path.join(LOGS_DIR, 'EAC', 'russian1.log')
+    line = format_ndjson(log_path, translate_log(Path(log_path)), False)
+    result = json.loads(line)
+    assert result['language'] == 'russian'
+    assert 'log' not in result
+
+
+def test_find_logs_recursive():
+    logs = list(find_logs([os.path.join(LOGS_DIR, 'XLD')], recursive=True))
+    assert logs == sorted(logs)
+    assert logs and all(log.endswith('.log') for log in logs)
+
+
+@pytest.mark.parametrize(
+    'argv, tty, target',
+    [
+        ([], True, False),
+        (['-m'], True, 'ansi'),
+        (['-m'], False, True),
+        (['-m', '--color', 'always'], False, 'ansi'),
+        (['-m', '--color', 'never'], True, True),
+        (['-m', '-f', 'ndjson'], True, True),
+    ],
+)
+def test_markup_target(monkeypatch, argv, tty, target):
+    monkeypatch.setattr('sys.argv', ['heybrochecklog', *argv, 'a.log'])
+    monkeypatch.setattr('sys.stdout.isatty', lambda: tty)
+    assert markup_target(parse_args()) == target
+
+
+def test_ndjson_completion_order(monkeypatch, capsys):
+    logs = [os.path.join(LOGS_DIR, 'EAC', name) for name in ['abort.log', 'fast.log']]
+
+    def score_logs(log_paths, *args):
+        list(log_paths)
+        yield 1, {'score': 1}
+        yield 0, {'score': 0}
+
+    monkeypatch.setattr(heybrochecklog, 'score_logs', score_logs)
+    monkeypatch.setattr('sys.argv', ['heybrochecklog', '-f', 'ndjson', *logs])
+    heybrochecklog.runner()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines == [{'score': 1, 'path': logs[1]}, {'score': 0, 'path': logs[0]}]
+
+
+def test_help_lists_modes(monkeypatch, capsys):
+    monkeypatch.setattr('sys.argv', ['heybrochecklog', '-h'])
+    with pytest.raises(SystemExit):
+        parse_args()
+    output = capsys.readouterr().out
+    assert '\n  serve ' in output and '\n  verify ' in output
+
+
+@pytest.mark.parametrize('argv', [['--', 'serve'], ['./serve']])
+def test_log_named_like_a_mode(monkeypatch, capsys, tmp_path, argv):
+    log = Path(tmp_path, 'serve')
+    log.write_bytes(Path(LOGS_DIR, 'EAC', 'perf-hunid.log').read_bytes())
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('sys.argv', ['heybrochecklog', '-s', *argv])
+    heybrochecklog.runner()
+    assert capsys.readouterr().out == '100\n'
+
+
+def test_import_is_light():
+    code = (
+        'import sys, heybrochecklog; '
+        'print([m for m in ["heybrochecklog.serve", "heybrochecklog.verify", '
+        '"heybrochecklog.cache", "socketserver", "sqlite3"] if m in sys.modules])'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+
+import pytest
+from heybrochecklog.score.modules.drives import drive_db_query
+from heybrochecklog.shared import get_path
+
+QUERIES = [
+    ('PLEXTOR', 'DVDR', 'PX', '716A'),
+    ('LG', 'Electronics', 'DVDRAM', 'GH24NS95'),
+    ('MATSHITA', 'DVD', 'RAM', 'UJ8A0AS'),
+    ('Optiarc', 'DVD', 'RW', 'AD', '7200S'),
+    ('hl', 'dt', 'st'),
+    ('24ns9',),
+    ('', 'ASUS', ''),
+    ('', ''),
+    ('NoSuchDrive',),
+]
+
+
+@pytest.mark.parametrize('drive_words', QUERIES)
+def test_drive_db_query(drive_words):
+    conn = sqlite3.connect(os.path.join(get_path(), 'resources', 'drives.db'))
+    query = 'SELECT Offset FROM Drives WHERE Name LIKE "%{}%"'.format(
+        '%" AND Name LIKE "%'.join(drive_words)
+    )
+    expected = tuple(row[0] for row in conn.execute(query))
+    conn.close()
+    assert drive_db_query(drive_words) == expected
@@ -0,0 +1,147 @@
+import hashlib
+import os
+
+from pathlib import Path
+
+import pytest
+from heybrochecklog.score import score_log, xld_integrity
+from heybrochecklog.score.integrity import (
+    EACVerifier,
+    check_integrity,
+    eac_checksum,
+    integrity_status,
+    verify_lines,
+)
+from heybrochecklog.score.rijndael import Rijndael256
+from heybrochecklog.score.xld_integrity import (
+    INITIAL_STATE,
+    SHA256,
+    STANDARD_STATE,
+    XLDVerifier,
+    load_libcrypto,
+    sha256_openssl,
+    sha256_python,
+    xld_verify,
+)
+from heybrochecklog.shared import get_log_contents
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+XLD_DIR = os.path.join(LOGS_DIR, 'XLD')
+
+STREAMED_LOGS = [
+    ('EAC', '1.3-good.log'),
+    ('EAC', 'perf-hunid.log'),
+    ('EAC', 'badcombo.log'),
+    ('EAC95', 'burst.log'),
+    ('XLD', 'htoa.log'),
+    ('XLD', 'cdparanoia.log'),
+]
+
+BLOCKS = [
+    (
+        bytes(32),
+        bytes(32),
+        'c6227e7740b7e53b5cb77865278eab0726f62366d9aabad908936123a1fc8af3',
+    ),
+    (
+        bytes(range(32)),
+        bytes(range(32)),
+        '623d2bd4ca3796dc3d02ecf2f37fb637fd3da58509cebb67ab9265b04db51e7d',
+    ),
+]
+
+CHECKSUMS = [
+    (
+        'Exact Audio Copy V1.0 beta 3 from 29. August 2011\r\n\r\n'
+        'EAC extraction logfile',
+        '70855DD5840BC9591B641B8BE4996514CF6BF18A4F6CB9CBD662D98350376DC9',
+    ),
+    ('x' * 1000, 'E327402A1C44C95EFF31654EE727FE7FB5A050809367A1DC5A016205B3C5653E'),
+]
+
+
+@pytest.mark.parametrize('key, block, ciphertext', BLOCKS)
+def test_rijndael256(key, block, ciphertext):
+    assert Rijndael256(key).encrypt(block).hex() == ciphertext
+
+
+@pytest.mark.parametrize('text, signature', CHECKSUMS)
+def test_eac_checksum(text, signature):
+    assert eac_checksum(text) == signature
+
+
+@pytest.mark.parametrize('length', [0, 1, 55, 56, 64, 1000])
+def test_sha256_python(length):
+    data = bytes(range(256)) * 4
+    data = data[:length]
+    assert sha256_python(data, STANDARD_STATE) == hashlib.sha256(data).hexdigest()
+    if load_libcrypto() is not None:
+        assert sha256_openssl(load_libcrypto(), data, INITIAL_STATE) == (
+            sha256_python(data, INITIAL_STATE)
+        )
+
+
+@pytest.mark.parametrize(
+    'filename', ['100-percent-new.log', 'htoa.log', 'ripping-error.log']
+)
+def test_xld_verify(filename):
+    with open(os.path.join(XLD_DIR, filename), encoding='utf-8') as log:
+        data, version, old_signature, signature = xld_verify(log.read())
+    assert old_signature == signature
+
+
+@pytest.mark.parametrize('openssl', [True, False])
+def test_sha256_incremental(monkeypatch, openssl):
+    if not openssl:
+        monkeypatch.setattr(xld_integrity, 'load_libcrypto', lambda: None)
+    data = bytes(range(256)) * 4
+    sha = SHA256(INITIAL_STATE)
+    for i in range(0, len(data), 37):
+        sha.update(data[i : i + 37])
+    assert sha.hexdigest() == sha256_python(data, INITIAL_STATE)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1000])
+@pytest.mark.parametrize('folder, filename', STREAMED_LOGS)
+def test_streaming_verifiers(folder, filename, chunk_size):
+    text = ''.join(get_log_contents(Path(LOGS_DIR, folder, filename)))
+    eac, xld = EACVerifier(), XLDVerifier()
+    for i in range(0, len(text), chunk_size):
+        eac.update(text[i : i + chunk_size])
+        xld.update(text[i : i + chunk_size])
+
+    assert integrity_status(*eac.finalize()) == check_integrity(text)
+    data, version, old_signature, signature = xld_verify(text)
+    assert xld.finalize() == (old_signature, signature)
+
+
+@pytest.mark.parametrize(
+    'folder, filename, status',
+    [
+        ('EAC', '1.3-good.log', 'LOG_OK'),
+        ('EAC', 'perf-hunid.log', 'LOG_NOT_OK'),
+        ('EAC95', 'burst.log', None),
+        ('XLD', 'htoa.log', 'LOG_OK'),
+        ('XLD', 'cdparanoia.log', 'LOG_CHECKSUM_NOT_PRESENT'),
+    ],
+)
+def test_verify_lines(folder, filename, status):
+    assert verify_lines(get_log_contents(Path(LOGS_DIR, folder, filename))) == status
+
+
+@pytest.mark.parametrize(
+    'folder, filename, deducted',
+    [
+        ('EAC', '1.3-good.log', False),
+        ('EAC', 'perf-hunid.log', True),
+        ('EAC', 'russian1.log', False),
+        ('XLD', 'htoa.log', False),
+        ('XLD', 'cdparanoia.log', True),
+    ],
+)
+def test_integrity_deduction(folder, filename, deducted):
+    log = score_log(Path(LOGS_DIR, folder, filename), integrity=True)
+    names = [name for name, points in log['deductions']]
+    assert any(name.startswith('Log checksum does not match') for name in names) == (
+        deducted
+    )
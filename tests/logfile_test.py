@@ -0,0 +1,84 @@
+import re
+
+import pytest
+from heybrochecklog.logfile import LineView, LogFile, join_lines, normalize_line
+from heybrochecklog.score.modules.combined import split_combined
+
+CONTENTS = ['Exact Audio Copy\n', '\n', 'Read  mode ：  Secure\n']
+
+
+def test_lazy_views():
+    log = LogFile(CONTENTS)
+    assert log.contents == ['Exact Audio Copy', '', 'Read mode : Secure']
+    assert log.concat_contents == ['Exact Audio Copy', 'Read mode : Secure']
+
+    # The views are built from the lines the log was created with.
+    log = LogFile(CONTENTS)
+    log.full_contents = ['replaced\n']
+    assert log.contents[0] == 'Exact Audio Copy'
+
+
+def test_slots():
+    log = LogFile(CONTENTS)
+    with pytest.raises(AttributeError):
+        log.not_an_attribute = True
+
+
+def test_track_errors_parsed():
+    log = LogFile(CONTENTS)
+    log.track_errors['Read error'].update([3, 1, 3])
+    log.track_errors['Aborted copy'] = {2: 5, 1: 4}
+    track_errors = log.to_parsed().track_errors
+    assert track_errors['Read error'] == [1, 3]
+    assert track_errors['Aborted copy'] == [[1, 4], [2, 5]]
+
+
+@pytest.mark.parametrize(
+    'line',
+    [
+        '',
+        ' \t\n',
+        '  Read mode\t\t: Secure\r\n',
+        '\u3000使用驱动器\u3000：\u3000PLEXTOR\n',
+        'Track，  01\xa0\xa0：x，',
+    ],
+)
+def test_normalize_line(line):
+    expected = re.sub(r'\s+', ' ', line.rstrip())
+    expected = expected.replace('：', ':').replace('，', ', ')
+    assert normalize_line(line) == expected
+
+
+def test_line_view():
+    lines = [str(i) for i in range(10)]
+    view = LineView.of(lines, 2, 8)
+    assert list(view) == lines[2:8]
+    assert len(view) == 6
+    assert view[0] == '2' and view[-1] == '7'
+    assert view[1:4] == ['3', '4', '5']
+    assert view[::2] == ['2', '4', '6']
+    assert list(LineView.of(view, 1, 3)) == ['3', '4']
+    assert list(LineView.of(lines, 12, 14)) == []
+    assert LineView.of(lines, 0, 10) is lines
+    with pytest.raises(IndexError):
+        view[6]
+
+
+def test_join_lines():
+    lines = [str(i) for i in range(10)]
+    parts = [LineView.of(lines, 0, 4), LineView.of(lines, 4, 10)]
+    assert join_lines(parts) is lines
+    parts = [LineView.of(lines, 0, 4), ['x'], LineView.of(lines, 4, 6)]
+    assert join_lines(parts) == lines[:4] + ['x'] + lines[4:6]
+
+
+def test_split_combined():
+    contents = CONTENTS + ['\n', '-' * 60 + '\n', '\n'] + CONTENTS
+    log = LogFile(contents)
+    logs = split_combined(log)
+    assert [list(part.full_contents) for part in logs] == [contents[:6], contents[6:]]
+    assert [list(part.contents) for part in logs] == [
+        log.contents[:6],
+        log.contents[6:],
+    ]
+    assert all(part.full_contents.lines is contents for part in logs)
@@ -0,0 +1,123 @@
+import json
+import os
+import re
+from pathlib import Path
+
+import pytest
+from heybrochecklog.markup import ANSI, Markup, Span
+from heybrochecklog.score import (
+    CHECKERS,
+    ParsedLog,
+    parse_log,
+    render_markup,
+    score_log,
+)
+
+
+def test_html_nesting():
+    markup = Markup(
+        ['Copy CRC 1234ABCD\n', 'Peak & gain\n'],
+        [
+            Span(0, 0, 0, 'bad'),
+            Span(0, 0, 17, 'log4'),
+            Span(0, 9, 17, 'good'),
+            Span(1, 5, 6, 'strong'),
+        ],
+    )
+    assert list(markup.html_lines()) == [
+        '<span class="bad"></span><span class="log4">Copy CRC '
+        '<span class="good">1234ABCD</span></span>\n',
+        'Peak <strong>&amp;</strong> gain\n',
+    ]
+
+
+def test_html_span_over_lines():
+    lines = ['-----BEGIN-----\n', 'signature\n', '-----END-----']
+    markup = Markup(lines, [Span(0, 0, sum(len(line) for line in lines), 'good')])
+    assert list(markup.html_lines()) == [
+        '<span class="good">-----BEGIN-----\n',
+        'signature\n',
+        '-----END-----</span>',
+    ]
+
+
+def test_ansi_nesting():
+    markup = Markup(
+        ['Copy CRC 1234ABCD\n', 'Peak & gain\n'],
+        [
+            Span(0, 0, 0, 'bad'),
+            Span(0, 0, 17, 'log4'),
+            Span(0, 9, 17, 'good'),
+            Span(1, 5, 6, 'strong'),
+        ],
+    )
+    styles = {'log4': '<4>', 'good': '<g>', 'strong': '<s>'}
+    assert list(markup.ansi_lines(styles)) == [
+        '<4>Copy CRC <g>1234ABCD\x1b[0m\n',
+        'Peak <s>&\x1b[0m gain\n',
+    ]
+
+
+def test_ansi_span_over_lines():
+    lines = ['BEGIN\n', 'signature\n', 'END']
+    end = sum(len(line) for line in lines)
+    markup = Markup(lines, [Span(0, 0, end, 'good log5'), Span(1, 0, 4, 'bad')])
+    styles = {'good': '<g>', 'log5': '<5>', 'bad': '<b>'}
+    assert list(markup.ansi_lines(styles)) == [
+        '<g><5>BEGIN\x1b[0m\n',
+        '<g><5><b>sign\x1b[0m<g><5>ature\x1b[0m\n',
+        '<g><5>END\x1b[0m',
+    ]
+
+
+def test_join():
+    first = Markup(['a\n', 'b\n'], [Span(1, 0, 1, 'good')])
+    second = Markup(['c\n'], [Span(0, 0, 1, 'bad')])
+    assert Markup.join([first, second]) == Markup(
+        ['a\n', 'b\n', 'c\n'], [Span(1, 0, 1, 'good'), Span(2, 0, 1, 'bad')]
+    )
+
+
+LOGS = [
+    ('XLD', 'crc-mismatch.log'),
+    ('EAC', 'perf-hunid.log'),
+    ('EAC', 'hella-aborted.log'),
+    ('EAC', 'bad-htoa.log'),
+    ('EAC95', 'burst.log'),
+    ('unrecognized', 'eac-wrong-date.log'),
+]
+
+
+@pytest.mark.parametrize('ripper, filename', LOGS)
+def test_render_markup(ripper, filename, monkeypatch):
+    log_path = Path(os.path.join(os.path.dirname(__file__), 'logs', ripper, filename))
+    parsed = parse_log(log_path)
+    # Parsing never marks the log up.
+    assert '<span' not in parsed.contents
+
+    stored = json.loads(json.dumps(parsed.to_dict()))
+    # The log is styled from the stored blocks, without checking it again.
+    with monkeypatch.context() as patch:
+        for checker in CHECKERS.values():
+            patch.setattr(checker, 'check', None)
+        markup = render_markup(ParsedLog.from_dict(stored))
+    assert markup.to_html() == score_log(log_path, markup=True)['contents']
+
+    data = json.loads(json.dumps(markup.to_json()))
+    assert Markup.from_json(data) == markup
+
+    # Colors only add escapes to the text of the log.
+    assert re.sub('\x1b\\[[0-9;]*m', '', markup.to_ansi()) == ''.join(markup.lines)
+
+
+def test_ansi_unrecognized():
+    log_path = Path(
+        os.path.dirname(__file__),
+        'logs',
+        'unrecognized',
+        'eac-edited-at-top-extra-spaces.log',
+    )
+    contents = score_log(log_path, markup=ANSI)['contents']
+    # Terminal text is not escaped as HTML.
+    assert contents == log_path.read_text(encoding='utf-8-sig')
+    assert contents == render_markup(parse_log(log_path)).to_ansi()
@@ -0,0 +1,46 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from heybrochecklog.resources import DEDUCTIONS
+from heybrochecklog.score import ParsedLog, parse_log, score_log, score_parsed
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+LOGS = [
+    os.path.join(LOGS_DIR, 'EAC', 'perf-hunid.log'),
+    os.path.join(LOGS_DIR, 'EAC', 'hella-aborted.log'),
+    os.path.join(LOGS_DIR, 'EAC', 'bad-htoa.log'),
+    os.path.join(LOGS_DIR, 'EAC95', 'burst.log'),
+    os.path.join(LOGS_DIR, 'XLD', 'ripping-error.log'),
+    os.path.join(LOGS_DIR, 'unrecognized', 'eac-wrong-date.log'),
+]
+
+
+@pytest.mark.parametrize('log_path', LOGS)
+@pytest.mark.parametrize('markup', [False, True])
+def test_parsed_round_trip(log_path, markup):
+    parsed = parse_log(Path(log_path), markup)
+    stored = json.loads(json.dumps(parsed.to_dict()))
+    assert ParsedLog.from_dict(stored) == parsed
+    assert score_parsed(ParsedLog.from_dict(stored)) == score_log(
+        Path(log_path), markup
+    )
+
+
+def test_rescore_with_new_deductions():
+    parsed = parse_log(Path(LOGS_DIR, 'EAC', 'hella-aborted.log'))
+    deductions = dict(DEDUCTIONS, **{'Test & Copy': ['Test & Copy was not used', 5]})
+
+    original = score_parsed(parsed)
+    rescored = score_parsed(parsed, deductions)
+    assert rescored['score'] == original['score'] + 15
+    assert ['Test & Copy was not used (-5 points)', 5] in rescored['deductions']
+
+
+def test_unsupported_format():
+    parsed = parse_log(Path(LOGS[0])).to_dict()
+    parsed['format'] = 0
+    with pytest.raises(ValueError):
+        ParsedLog.from_dict(parsed)
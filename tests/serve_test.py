@@ -0,0 +1,110 @@
+import functools
+import io
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+from heybrochecklog.score import score_any, score_log
+from heybrochecklog.serve import (
+    WorkerPool,
+    encode_request,
+    read_response,
+    serve_socket,
+    serve_stream,
+)
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+LOGS = [
+    os.path.join(LOGS_DIR, 'EAC', 'perf-hunid.log'),
+    os.path.join(LOGS_DIR, 'EAC95', 'burst.log'),
+    os.path.join(LOGS_DIR, 'XLD', 'ripping-error.log'),
+]
+
+
+def read_responses(rfile):
+    responses = []
+    while True:
+        response = read_response(rfile)
+        if response is None:
+            return responses
+        responses.append(response)
+
+
+def serve(executor, max_size=1024 * 1024, slots=None):
+    return functools.partial(
+        serve_stream,
+        executor=executor,
+        score=score_any,
+        max_pending=2,
+        max_size=max_size,
+        slots=slots,
+    )
+
+
+def test_serve_stream():
+    requests = [encode_request(log_path) for log_path in LOGS]
+    requests += [encode_request(Path(log_path).read_bytes()) for log_path in LOGS]
+    requests.append(encode_request(os.path.join(LOGS_DIR, 'missing.log')))
+    requests.append(b'\x00\x00\x00\x02Zz')
+    max_size = max(os.path.getsize(log_path) for log_path in LOGS) + 1
+    requests.append(encode_request(b'x' * max_size))
+
+    wfile = io.BytesIO()
+    slots = threading.BoundedSemaphore(3)
+    with ThreadPoolExecutor(2) as executor:
+        serve(executor, max_size, slots)(io.BytesIO(b''.join(requests)), wfile)
+    # Every slot was given back, and only once (or release would raise).
+    for _ in range(3):
+        assert slots.acquire(blocking=False)
+
+    responses = read_responses(io.BytesIO(wfile.getvalue()))
+    expected = [score_log(Path(log_path)) for log_path in LOGS]
+    assert responses[:6] == expected + expected
+    assert responses[6]['error'].startswith('FileNotFoundError')
+    assert responses[7] == {'error': "Unknown request kind: b'Z'"}
+    assert responses[8] == {
+        'error': 'Request is larger than {} bytes'.format(max_size)
+    }
+
+
+def test_serve_socket(tmp_path):
+    path = str(tmp_path / 'hbcl.sock')
+    with ThreadPoolExecutor(1) as executor:
+        server = threading.Thread(
+            target=serve_socket, args=(path, serve(executor)), daemon=True
+        )
+        server.start()
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.01)
+
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+            rfile = client.makefile('rb')
+            # Responses are sent as soon as they are ready, not on disconnect.
+            for log_path in LOGS:
+                client.sendall(encode_request(log_path))
+                assert read_response(rfile) == score_log(Path(log_path))
+
+
+def test_worker_pool_restarts():
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    try:
+        with WorkerPool(2) as pool:
+            # Workers don't keep the SIGTERM handler of the server.
+            assert pool.submit(signal.getsignal, signal.SIGTERM).result() == (
+                signal.SIG_DFL
+            )
+            with pytest.raises(BrokenProcessPool):
+                pool.submit(os._exit, 1).result()
+            assert pool.submit(abs, -1).result() == 1
+    finally:
+        signal.signal(signal.SIGTERM, previous)
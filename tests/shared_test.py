@@ -0,0 +1,119 @@
+import codecs
+import io
+import os
+
+from pathlib import Path
+
+import pytest
+from heybrochecklog import UnrecognizedException
+from heybrochecklog.shared import (
+    decode_chunks,
+    get_encoding,
+    get_log_contents,
+    get_log_contents_from_bytes,
+    read_log_bytes,
+)
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+HEADER = 'Exact Audio Copy V1.0 beta 3 from 29. August 2011\r\n'
+
+
+@pytest.mark.parametrize(
+    'raw, encoding',
+    [
+        (codecs.BOM_UTF8 + HEADER.encode('utf-8'), 'utf-8-sig'),
+        (HEADER.encode('utf-16'), 'utf-16'),
+        (codecs.BOM_UTF16_BE + HEADER.encode('utf-16-be'), 'utf-16'),
+        (HEADER.encode('utf-16-le'), 'utf-16-le'),
+        (HEADER.encode('utf-16-be'), 'utf-16-be'),
+        ((HEADER + 'Ünïcödé').encode('utf-8'), 'utf-8'),
+        (b'', 'utf-8'),
+    ],
+)
+def test_get_encoding(raw, encoding):
+    assert get_encoding(raw) == encoding
+
+
+@pytest.mark.parametrize(
+    'filename, encoding',
+    [
+        ('bad-russian-099.log', 'WINDOWS-1251'),
+        ('mac-roman-charset.log', 'MacRoman'),
+    ],
+)
+def test_get_encoding_chardet(filename, encoding):
+    with open(os.path.join(LOGS_DIR, 'EAC', filename), 'rb') as log:
+        assert get_encoding(log.read()) == encoding
+
+
+def test_get_encoding_sample():
+    # Only the sample is handed to the chardet libraries.
+    raw = 'é'.encode('latin-1') + b'a' * 100000 + 'é'.encode('latin-1')
+    assert get_encoding(raw) == get_encoding(raw[:65536])
+
+
+@pytest.mark.parametrize(
+    'folder, filename',
+    [('EAC', '1.3-good.log'), ('EAC', 'bad-russian-099.log'), ('XLD', 'htoa.log')],
+)
+def test_get_log_contents(folder, filename):
+    log_path = Path(LOGS_DIR, folder, filename)
+    contents = get_log_contents(log_path)
+    with log_path.open(encoding=get_encoding(log_path.read_bytes())) as log:
+        assert contents == log.readlines()
+
+
+@pytest.mark.parametrize(
+    'raw, encoding',
+    [
+        ('a\r\nb\rc\n\r\n'.encode('utf-8'), 'utf-8'),
+        ('ä\r\nö\r'.encode('utf-16'), 'utf-16'),
+        (Path(LOGS_DIR, 'EAC', 'bad-russian-099.log').read_bytes(), None),
+    ],
+)
+@pytest.mark.parametrize('chunk_size', [1, 3, 65536])
+def test_decode_chunks(raw, encoding, chunk_size):
+    encoding = encoding or get_encoding(raw)
+    text = io.StringIO(raw.decode(encoding), newline=None).read()
+    assert ''.join(decode_chunks(raw, encoding, chunk_size)) == text
+
+
+class TextVerifier:
+    def __init__(self):
+        self.text = ''
+
+    def update(self, text):
+        self.text += text
+
+
+@pytest.mark.parametrize(
+    'raw',
+    ['ä\r\nö\rü\n'.encode('utf-8'), 'ä\r\nö\rü\n'.encode('utf-16')],
+)
+def test_decode_once(raw, monkeypatch):
+    decodes = []
+    decode = codecs.decode
+    monkeypatch.setattr(
+        codecs, 'decode', lambda *args: decodes.append(args) or decode(*args)
+    )
+    verifier = TextVerifier()
+    assert get_log_contents_from_bytes(raw, verifier) == ['ä\n', 'ö\n', 'ü\n']
+    assert verifier.text == 'ä\nö\nü\n'
+    assert len(decodes) <= 1
+
+    decodes.clear()
+    assert get_log_contents_from_bytes(raw) == ['ä\n', 'ö\n', 'ü\n']
+    assert len(decodes) == 1
+
+
+def test_max_log_size(tmp_path):
+    log_path = tmp_path / 'large.log'
+    log_path.write_bytes(b'x' * 101)
+    assert read_log_bytes(log_path, max_size=101) == b'x' * 101
+    with pytest.raises(UnrecognizedException):
+        read_log_bytes(log_path, max_size=100)
+    with pytest.raises(UnrecognizedException):
+        get_log_contents(log_path, max_size=100)
+    with pytest.raises(UnrecognizedException):
+        get_log_contents_from_bytes(b'x' * 101, max_size=100)
@@ -2,10 +2,17 @@ import os
 from pathlib import Path
 
 import pytest
-from heybrochecklog.translate import translate_log
+from heybrochecklog import shared, translate
+from heybrochecklog.translate import (
+    Translation,
+    get_translation,
+    translate_log,
+    translate_log_from_bytes,
+)
 
 LOGS = [
     ('french-big-calm.log'),
+    ('swedish-timing-problems.log'),
 ]
 
 
@@ -26,3 +33,39 @@ def test_translation(filename):
         translated_contents = translated_file.read()
 
     assert log['log'] == translated_contents
+
+
+@pytest.mark.parametrize('filename', LOGS)
+def test_translation_from_bytes(filename):
+    log_path = os.path.join(os.path.dirname(__file__), 'logs', 'translations', filename)
+    raw = Path(log_path).read_bytes()
+    assert translate_log_from_bytes(memoryview(raw)) == translate_log(Path(log_path))
+
+
+def test_translation_one_pass():
+    translation = Translation(
+        {'1': ['Januari'], '2': ['Ja'], '3': ['Nej'], '4': ['Jaa']},
+        {'1': ['January'], '2': ['Yes'], '3': ['No'], '4': ['Yeah']},
+    )
+    # Longer phrases win, and translated text is never translated again.
+    assert translation.sub('26. januari: JA, nej, jaa\n') == (
+        '26. January: Yes, No, Yeah\n'
+    )
+    # Lowercasing İ adds a character, so the line is matched as it is.
+    assert translation.sub('İ ja\n') == 'İ Yes\n'
+
+
+def test_translation_cached(monkeypatch):
+    log_path = Path(os.path.dirname(__file__), 'logs', 'EAC', 'russian1.log')
+    expected = translate_log(log_path)
+    assert get_translation('russian') is get_translation('russian')
+
+    def fail(*args, **kwargs):
+        raise AssertionError('translation table was built again')
+
+    monkeypatch.setattr(shared, 'open_json', fail)
+    monkeypatch.setattr(translate, 'Translation', fail)
+    assert translate_log(log_path) == expected
+
+    with pytest.raises(TypeError):
+        get_translation('russian').phrases['да'] = 'No'
@@ -0,0 +1,48 @@
+import os
+from pathlib import Path
+
+import pytest
+from heybrochecklog.verify import main, verify_log_from_bytes, verify_log, verify_logs
+
+LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+LOGS = [
+    ('EAC', '1.3-good.log', 'EAC', 'OK'),
+    ('EAC', 'perf-hunid.log', 'EAC', 'NOT_OK'),
+    ('EAC', 'russian1.log', 'EAC', 'NOT_PRESENT'),
+    ('XLD', 'htoa.log', 'XLD', 'OK'),
+    ('XLD', 'cdparanoia.log', 'XLD', 'NOT_PRESENT'),
+    ('EAC95', 'burst.log', None, None),
+]
+
+
+@pytest.mark.parametrize('folder, filename, ripper, status', LOGS)
+def test_verify_log(folder, filename, ripper, status):
+    log_path = Path(LOGS_DIR, folder, filename)
+    result = verify_log(log_path)
+    assert result['ripper'] == ripper
+    assert result['status'] == status
+    assert bool(result['unrecognized']) == (status is None)
+    assert result['size'] == log_path.stat().st_size
+
+
+def test_verify_log_from_bytes_tampered():
+    raw = Path(LOGS_DIR, 'XLD', 'htoa.log').read_bytes()
+    assert verify_log_from_bytes(memoryview(raw))['status'] == 'OK'
+    tampered = raw.replace(b'Track 01', b'Track 02', 1)
+    assert verify_log_from_bytes(tampered)['status'] == 'NOT_OK'
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_verify_logs(jobs):
+    log_paths = [os.path.join(LOGS_DIR, log[0], log[1]) for log in LOGS]
+    results = dict(verify_logs(log_paths, jobs))
+    assert [results[i]['status'] for i in range(len(LOGS))] == [
+        status for *_, status in LOGS
+    ]
+
+
+def test_main(capsys):
+    assert main([os.path.join(LOGS_DIR, 'XLD', 'htoa.log')]) == 0
+    assert main([os.path.join(LOGS_DIR, 'EAC', 'perf-hunid.log')]) == 1
+    assert 'NOT_OK (EAC)' in capsys.readouterr().out